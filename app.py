@@ -1,4 +1,5 @@
 ﻿import threading
+import multiprocessing
 import re
 import os
 import time
@@ -13,6 +14,7 @@ import hmac
 import secrets
 import json
 import copy
+import bisect
 import urllib.error
 from zoneinfo import ZoneInfo
 from datetime import date, datetime
@@ -29,13 +31,21 @@ from formularios.induccion_organizacional import induccion_organizacional
 from formularios.induccion_operativa import induccion_operativa
 from formularios.sensibilizacion import sensibilizacion
 from formularios.seguimientos import seguimientos
+from formularios.seguimientos import portfolio as seguimientos_portfolio
+from formularios.cedula_catalog import get_cedula_catalog
+from formularios import draft_store
+from formularios.excel_backend import com_thread
+from formularios.form_records import set_session_profesional
 from formularios.common import (
     _supabase_upsert,
     _supabase_enqueue_upsert,
     _supabase_upsert_with_queue,
     _supabase_patch_with_queue,
     _supabase_ping,
+    _supabase_get,
     _supabase_get_paged,
+    _atomic_write_json,
+    _flush_cache_writes,
     _get_supabase_write_queue_stats,
     _get_supabase_write_queue_snapshot,
     _get_supabase_failed_writes_snapshot,
@@ -83,8 +93,31 @@ DEFAULT_EMPRESA_ESTADOS = [
 ]
 _MOJIBAKE_PATTERNS = ("Ã", "Â", "â€", "ï¿½", "\ufffd", "Ð", "Ñ")
 _ENCODING_CHECK_DONE = False
-DRAFTS_FILE_NAME = "form_drafts_il.json"
 OFFLINE_AUTH_FILE_NAME = "offline_auth_users.json"
+ASSIGNED_COMPANIES_FILE_NAME = "assigned_companies_il.json"
+COMPANIES_SORT_MODES = ("Empresa A-Z", "Empresa Z-A", "NIT menor-mayor", "NIT mayor-menor")
+COMPANIES_SEARCH_DEBOUNCE_MS = 120
+VIRTUAL_LIST_MARGIN_ROWS = 100
+VIRTUAL_LIST_ROW_HEIGHT = 20
+VIRTUAL_LIST_MIN_VISIBLE_ROWS = 30
+VIRTUAL_LIST_PREFETCH_FRACTION = 0.9
+CEDULA_SUGGESTIONS_LIMIT = 50
+AUTOCOMPLETE_DEBOUNCE_MS = 250
+AUTOCOMPLETE_MIN_CHARS = 2
+AUTOSAVE_INTERVAL_MS = 30000
+CASE_CONFLICT_POLL_MS = 5000
+AUTOSAVE_FOCUS_DELAY_MS = 1500
+AUTOSAVE_DIRTY_EVENTS = ("<KeyRelease>", "<<ComboboxSelected>>", "<<DateEntrySelected>>")
+ASSIGNED_COMPANIES_FULL_REFRESH_SECONDS = 6 * 60 * 60
+ASSIGNED_COMPANIES_ID_CHUNK = 200
+PROFESIONAL_PARTIAL_ALIAS_MIN = 7
+EMPRESAS_VIEW_ALL_LOGINS = {"test", "sanpac", "sarzam", "sarzambrano"}
+EMPRESAS_VIEW_ALL_NAMES = ("sandra pachon", "sara zambrano")
+EMPRESAS_SELECT_CANDIDATES = (
+    "id,nombre_empresa,nit_empresa,ciudad_empresa,profesional_asignado,estado,comentarios_empresas",
+    "id,nombre_empresa,nit_empresa,ciudad_empresa,profesional_asignado,estado,comentarios_empresas,comentarios",
+    "id,nombre_empresa,nit_empresa,ciudad_empresa,profesional_asignado",
+)
 FORM_MODULE_MAP = {
     "presentacion_programa": presentacion_programa,
     "evaluacion_accesibilidad": evaluacion_accesibilidad,
@@ -118,10 +151,6 @@ def _get_local_cache_dir():
     return base
 
 
-def _get_drafts_path():
-    return os.path.join(_get_local_cache_dir(), DRAFTS_FILE_NAME)
-
-
 def _get_offline_auth_path():
     return os.path.join(_get_local_cache_dir(), OFFLINE_AUTH_FILE_NAME)
 
@@ -149,8 +178,12 @@ def _save_offline_auth_store(data):
         json.dump(data, handle, ensure_ascii=False, indent=2)
 
 
-def _load_drafts_store():
-    path = _get_drafts_path()
+def _get_assigned_companies_path():
+    return os.path.join(_get_local_cache_dir(), ASSIGNED_COMPANIES_FILE_NAME)
+
+
+def _load_assigned_companies_store():
+    path = _get_assigned_companies_path()
     if not os.path.exists(path):
         return {"version": 1, "users": {}}
     try:
@@ -167,9 +200,49 @@ def _load_drafts_store():
     return data
 
 
-def _save_drafts_store(data):
-    with open(_get_drafts_path(), "w", encoding="utf-8") as handle:
-        json.dump(data, handle, ensure_ascii=False, indent=2)
+def _save_assigned_companies_store(data):
+    _atomic_write_json(_get_assigned_companies_path(), data)
+
+
+def _ilike_accent_pattern(text):
+    # ilike no ignora tildes: cada vocal/ñ se vuelve comodin de un caracter ("perez" -> "p_r_z").
+    return re.sub(r"[aeioun]", "_", str(text or ""))
+
+
+def _ilike_words_pattern(words):
+    # Entre palabras cualquier tramo: el asignado puede traer espacios dobles o
+    # simbolos (\/:*?"<>|) que _normalize_ascii_text vuelve un solo espacio.
+    return "*" + "*".join(_ilike_accent_pattern(word) for word in words) + "*"
+
+
+def _build_profesional_or_filter(aliases, column="profesional_asignado"):
+    """
+    Construye el filtro PostgREST `or=(...)` que reduce en servidor las empresas
+    de un profesional. Cada clausula es un superconjunto de los asignados que
+    `_is_profesional_match` acepta por ser iguales al alias o contenerlo. Los
+    que acepta por estar contenidos en un alias largo (p.ej. "laura p") no se
+    pueden expresar con ilike: el llamador los completa con
+    `_profesional_needs_fragment_scan`.
+    """
+    clauses = []
+    seen = set()
+    for alias in sorted(aliases or ()):
+        words = [w for w in str(alias).split() if w]
+        if not words:
+            continue
+        clause = f'{column}.ilike."{_ilike_words_pattern(words)}"'
+        if clause in seen:
+            continue
+        seen.add(clause)
+        clauses.append(clause)
+    if not clauses:
+        return ""
+    return f"({','.join(clauses)})"
+
+
+def _profesional_needs_fragment_scan(aliases):
+    """True si algun alias admite asignados parciales (ver `_is_profesional_match`)."""
+    return any(len(alias) >= PROFESIONAL_PARTIAL_ALIAS_MIN for alias in aliases or ())
 
 
 def _extract_draft_company_name(cache_snapshot):
@@ -209,18 +282,52 @@ def _resolve_form_meta(form_id):
     return {"id": str(form_id or ""), "name": str(form_id or "")}
 
 
-def _iter_widget_paths(root):
-    def _walk(node, prefix=""):
-        children = list(node.winfo_children())
-        for idx, child in enumerate(children):
-            path = f"{prefix}.{idx}" if prefix else str(idx)
-            yield path, child
-            yield from _walk(child, path)
+# Atributos de Tk en el __dict__ de cada widget; no son campos del formulario.
+_FIELD_REGISTRY_SKIP_ATTRS = {"children", "master", "tk", "widgetName"}
+_FIELD_REGISTRY_MAX_DEPTH = 4
+
+
+def _is_field_object(value):
+    return isinstance(value, (tk.Text, ttk.Combobox, tk.Entry, DateEntry, tk.Variable))
+
+
+def _build_field_registry(window):
+    """
+    {field_id: widget o variable} con los campos que la ventana guarda en sus
+    atributos (self.fields, self.section2_1_fields[...], self.section4_level_var...).
+    El id sale de los nombres y claves ("section2_1_fields.<id>.observaciones"),
+    asi no depende de la posicion del widget en el arbol. Recorre solo los
+    atributos, no todos los widgets.
+    """
+    registry = {}
+    seen = set()
+
+    def _visit(field_id, value, depth):
+        if _is_field_object(value):
+            if isinstance(value, tk.Variable) or value.winfo_exists():
+                registry[field_id] = value
+            return
+        if depth >= _FIELD_REGISTRY_MAX_DEPTH or id(value) in seen:
+            return
+        if isinstance(value, dict):
+            seen.add(id(value))
+            for key, item in value.items():
+                if isinstance(key, (str, int)):
+                    _visit(f"{field_id}.{key}", item, depth + 1)
+        elif isinstance(value, (list, tuple)):
+            seen.add(id(value))
+            for idx, item in enumerate(value):
+                _visit(f"{field_id}.{idx}", item, depth + 1)
 
-    yield from _walk(root)
+    for name, value in list(vars(window).items()):
+        if name.startswith("_") or name in _FIELD_REGISTRY_SKIP_ATTRS:
+            continue
+        _visit(name, value, 0)
+    return registry
 
 
 def _widget_from_path(root, path):
+    """Widget por posicion en el arbol; solo para snapshots guardados antes del registro."""
     node = root
     if not path:
         return None
@@ -233,19 +340,12 @@ def _widget_from_path(root, path):
         return None
 
 
-def _is_descendant_of(widget, ancestor):
-    if not widget or not ancestor:
-        return False
-    node = widget
-    while node is not None:
-        if node == ancestor:
-            return True
-        node = getattr(node, "master", None)
-    return False
-
-
 def _get_widget_value_for_snapshot(widget):
     try:
+        if isinstance(widget, tk.BooleanVar):
+            return "1" if widget.get() else "0"
+        if isinstance(widget, tk.Variable):
+            return str(widget.get())
         if isinstance(widget, tk.Text):
             return widget.get("1.0", tk.END).rstrip("\n")
         if isinstance(widget, ttk.Combobox):
@@ -262,6 +362,9 @@ def _get_widget_value_for_snapshot(widget):
 
 def _set_widget_value_from_snapshot(widget, value):
     try:
+        if isinstance(widget, tk.Variable):
+            widget.set(value if value is not None else "")
+            return True
         if isinstance(widget, tk.Text):
             widget.delete("1.0", tk.END)
             widget.insert("1.0", str(value or ""))
@@ -282,17 +385,14 @@ def _set_widget_value_from_snapshot(widget, value):
 
 
 def _collect_visible_input_snapshot(window):
-    sticky_bar = getattr(window, "_sticky_actions_bar", None)
     rows = []
-    for path, widget in _iter_widget_paths(window):
-        if sticky_bar and _is_descendant_of(widget, sticky_bar):
-            continue
+    for field_id, widget in _build_field_registry(window).items():
         value = _get_widget_value_for_snapshot(widget)
         if value is None:
             continue
         rows.append(
             {
-                "path": path,
+                "field": field_id,
                 "class": widget.__class__.__name__,
                 "value": value,
             }
@@ -301,20 +401,81 @@ def _collect_visible_input_snapshot(window):
 
 
 def _apply_input_snapshot(window, snapshot_rows):
+    """
+    Aplica el snapshot por id de campo. Los campos de secciones que aun no se
+    construyen quedan pendientes y se aplican al mostrar la seccion
+    (_apply_pending_snapshot). Las filas con "path" son de borradores viejos.
+    """
     if not isinstance(snapshot_rows, list):
         return 0
+    pending = getattr(window, "_pending_snapshot", None)
+    if pending is None:
+        pending = {}
+        window._pending_snapshot = pending
     applied = 0
     for row in snapshot_rows:
         if not isinstance(row, dict):
             continue
+        if row.get("field"):
+            pending[str(row["field"])] = row.get("value")
+            continue
         widget = _widget_from_path(window, row.get("path"))
-        if not widget:
+        if widget and _set_widget_value_from_snapshot(widget, row.get("value")):
+            applied += 1
+    return applied + _apply_pending_snapshot(window)
+
+
+def _register_row_adder(window, attr, adder):
+    """
+    Registra la funcion que agrega una fila a la lista `attr` (asistentes,
+    oferentes...). Las filas solo se agregan o quitan al final, asi el indice
+    en el id ("section8_rows.5.1") es estable y el snapshot puede recrear las
+    filas que faltan antes de aplicarse.
+    """
+    adders = getattr(window, "_row_adders", None)
+    if adders is None:
+        adders = {}
+        window._row_adders = adders
+    adders[attr] = adder
+
+
+def _grow_rows_for_pending(window, pending):
+    for attr, adder in (getattr(window, "_row_adders", None) or {}).items():
+        rows = getattr(window, attr, None)
+        if not isinstance(rows, list):
+            continue
+        prefix = f"{attr}."
+        needed = 0
+        for field_id in pending:
+            if field_id.startswith(prefix):
+                token = field_id[len(prefix):].split(".", 1)[0]
+                if token.isdigit():
+                    needed = max(needed, int(token) + 1)
+        while len(rows) < needed:
+            before = len(rows)
+            adder()
+            if len(rows) == before:
+                break
+
+
+def _apply_pending_snapshot(window):
+    pending = getattr(window, "_pending_snapshot", None)
+    if not pending:
+        return 0
+    _grow_rows_for_pending(window, pending)
+    applied = 0
+    for field_id, widget in _build_field_registry(window).items():
+        if field_id not in pending:
             continue
-        if _set_widget_value_from_snapshot(widget, row.get("value")):
+        if _set_widget_value_from_snapshot(widget, pending.pop(field_id)):
             applied += 1
     return applied
 
 
+def _is_legacy_snapshot(snapshot_rows):
+    return any(isinstance(row, dict) and not row.get("field") and row.get("path") for row in snapshot_rows)
+
+
 def _get_draft_save_command(window):
     save_cmd = getattr(window, "_save_draft_command", None)
     if callable(save_cmd):
@@ -445,6 +606,22 @@ def _bind_name_entry(entry):
     entry.bind("<FocusOut>", _on_focus_out)
 
 
+def _load_cedula_suggestions(limit=CEDULA_SUGGESTIONS_LIMIT):
+    try:
+        return get_cedula_catalog().search("", limit=limit)
+    except Exception:
+        return []
+
+
+def _filter_cedula_combobox(widget, limit=CEDULA_SUGGESTIONS_LIMIT):
+    catalog = get_cedula_catalog(load=False)
+    if not catalog.loaded:
+        return []
+    values = catalog.search(widget.get(), limit=limit)
+    widget.configure(values=values)
+    return values
+
+
 def _set_readonly_entry_value(entry, value):
     entry.configure(state="normal")
     entry.delete(0, tk.END)
@@ -756,15 +933,21 @@ def _return_to_hub(window):
         return
 
 
-def _finalize_export_flow(window, loading, output_path, form_name, company_name, form_id=None):
-    _finish_with_loading(
-        loading,
-        f"Formulario completado.\nArchivo: {output_path}",
-        output_path,
-    )
+def _finalize_export_flow(window, loading, output_path, form_name, company_name, form_id=None, extra_paths=()):
+    extra_paths = [path for path in extra_paths or () if path and path != output_path]
+    if extra_paths:
+        files = "\n".join([output_path, *extra_paths])
+        message = f"Formulario completado en {len(extra_paths) + 1} archivos.\n{files}"
+    else:
+        message = f"Formulario completado.\nArchivo: {output_path}"
+    _finish_with_loading(loading, message, output_path)
 
     hub = window.master if isinstance(window.master, HubWindow) else None
     if hub and output_path and os.path.exists(output_path):
+        stop_autosave = getattr(window, "_autosave_stop", None)
+        if callable(stop_autosave):
+            # El formulario ya quedo en Excel: el borrador del autoguardado sobra.
+            stop_autosave(discard=True)
         if form_id:
             hub.track_form_finished(form_id)
         target_path = _build_shared_drive_excel_path(output_path, company_name=company_name)
@@ -773,7 +956,87 @@ def _finalize_export_flow(window, loading, output_path, form_name, company_name,
             company_name,
             path_formato=os.path.dirname(target_path),
         )
-        hub.start_drive_upload(output_path, cleanup_local=False, company_name=company_name)
+        for path in [output_path, *extra_paths]:
+            if os.path.exists(path):
+                hub.start_drive_upload(path, cleanup_local=False, company_name=company_name)
+
+
+EXPORT_PROGRESS_START = 5
+EXPORT_PROGRESS_END = 90
+EXPORT_PROGRESS_SYNC = 92
+
+
+def _run_export_job(window, loading, export, on_done, sync=None, sections=None):
+    """
+    Ejecuta `export(progress_callback)` y despues `sync()` en un hilo de
+    trabajo. El avance por seccion, los errores y `on_done(output_path)`
+    vuelven al hilo de Tk con window.after, asi la ventana sigue respondiendo.
+    """
+    sections = list(sections or [])
+    state = {"step": 0}
+
+    def _post(callback, *args):
+        try:
+            window.after(0, callback, *args)
+        except (RuntimeError, tk.TclError):
+            pass
+
+    def _alive():
+        try:
+            return bool(loading.window.winfo_exists())
+        except tk.TclError:
+            return False
+
+    def _show_section(section_id):
+        if not _alive():
+            return
+        state["step"] += 1
+        step = sections.index(section_id) + 1 if section_id in sections else state["step"]
+        total = max(len(sections), step)
+        span = EXPORT_PROGRESS_END - EXPORT_PROGRESS_START
+        loading.set_status(f"Guardando {str(section_id).replace('_', ' ')}...")
+        loading.set_progress(EXPORT_PROGRESS_START + int(step / total * span))
+
+    def _show_sync():
+        if _alive():
+            loading.set_status("Guardando en Supabase...")
+            loading.set_progress(EXPORT_PROGRESS_SYNC)
+
+    def _fail(message):
+        if _alive():
+            loading.close()
+        messagebox.showerror("Error", message)
+
+    def _worker():
+        # COM vive todo el hilo. El error se atrapa dentro del bloque para
+        # que el traceback (y los proxies de hojas en sus frames) se suelte
+        # antes de CoUninitialize.
+        error = None
+        with com_thread():
+            try:
+                output_path = export(lambda section_id: _post(_show_section, section_id))
+            except Exception as exc:
+                error = str(exc)
+        if error is not None:
+            _post(_fail, error)
+            return
+        if sync is not None:
+            _post(_show_sync)
+            try:
+                sync()
+            except Exception as exc:
+                _post(_fail, f"No se pudo guardar en Supabase.\n{exc}")
+                return
+        _post(on_done, output_path)
+
+    # El dialogo tiene el grab; mientras corre el hilo no se puede cerrar.
+    try:
+        loading.window.protocol("WM_DELETE_WINDOW", lambda: None)
+    except tk.TclError:
+        pass
+    loading.set_status("Preparando exportación...")
+    loading.set_progress(EXPORT_PROGRESS_START)
+    threading.Thread(target=_worker, daemon=True).start()
 
 
 def _clear_sticky_actions(window):
@@ -968,7 +1231,143 @@ def _section1_build_search(self, parent, include_tipo_visita=False):
         fg=COLOR_TEAL,
         bg=COLOR_LIGHT_BG,
     )
-    self.status_label.grid(row=current_row + 1, column=0, columnspan=3, sticky="w", pady=(6, 0))
+    self.status_label.grid(row=current_row + 1, column=0, columnspan=2, sticky="w", pady=(6, 0))
+
+    # Spinner y boton de cancelar; solo se muestran mientras hay una busqueda en curso.
+    self._company_search_box = tk.Frame(frame, bg=COLOR_LIGHT_BG)
+    self._company_search_box.grid(row=current_row + 1, column=2, sticky="w", padx=12, pady=(6, 0))
+    self._company_search_spinner = ttk.Progressbar(
+        self._company_search_box,
+        mode="indeterminate",
+        length=80,
+    )
+    self._company_search_spinner.pack(side="left")
+    ttk.Button(
+        self._company_search_box,
+        text="Cancelar",
+        command=lambda: _section1_cancel_company_search(self),
+    ).pack(side="left", padx=(8, 0))
+    self._company_search_box.grid_remove()
+
+
+def _section1_set_company_searching(self, active):
+    continue_btn = getattr(self, "continue_btn", None)
+    if active and continue_btn is not None:
+        # Mientras busca no se puede confirmar la empresa anterior.
+        continue_btn.config(state="disabled")
+    box = getattr(self, "_company_search_box", None)
+    spinner = getattr(self, "_company_search_spinner", None)
+    if box is None or spinner is None:
+        return
+    if active:
+        box.grid()
+        spinner.start(12)
+    else:
+        spinner.stop()
+        box.grid_remove()
+
+
+def _section1_search_company(self, mode, lookup):
+    """
+    Busca la empresa en un hilo aparte. Cada busqueda nueva invalida la
+    anterior y solo el resultado de la ultima se aplica a los campos.
+    """
+    nit = self.fields["nit_empresa"].get().strip()
+    nombre = self.fields.get("nombre_busqueda").get().strip() if self.fields.get("nombre_busqueda") else ""
+    if mode == "nit":
+        if not nit:
+            messagebox.showerror("Error", "Ingresa un NIT.")
+            return
+    elif mode == "nombre":
+        if not nombre:
+            messagebox.showerror("Error", "Ingresa el nombre de la empresa.")
+            return
+    else:
+        messagebox.showerror("Error", "Tipo de búsqueda no válido.")
+        return
+
+    self._company_search_seq = getattr(self, "_company_search_seq", 0) + 1
+    seq = self._company_search_seq
+    self._company_search_lookup = lookup
+    self.company_data = None
+    self.status_label.config(text="Buscando empresa...")
+    _section1_set_company_searching(self, True)
+
+    def _worker():
+        company = None
+        error = None
+        try:
+            if mode == "nombre":
+                company = lookup.get_empresa_by_nombre(nombre)
+            else:
+                company = lookup.get_empresa_by_nit(nit)
+        except Exception as exc:
+            error = exc
+
+        def _done():
+            if seq != getattr(self, "_company_search_seq", 0):
+                return
+            try:
+                if not self.winfo_exists():
+                    return
+            except tk.TclError:
+                return
+            _section1_set_company_searching(self, False)
+            _section1_apply_company_result(self, mode, company, error, lookup)
+
+        try:
+            self.after(0, _done)
+        except (RuntimeError, tk.TclError):
+            pass
+
+    threading.Thread(target=_worker, daemon=True).start()
+
+
+def _section1_clear_company(self, lookup):
+    # Sin empresa confirmada no quedan datos de la anterior ni se puede continuar.
+    self.company_data = None
+    if getattr(self, "continue_btn", None) is not None:
+        self.continue_btn.config(state="disabled")
+    section_map = getattr(lookup, "SECTION_1_SUPABASE_MAP", presentacion_programa.SECTION_1_SUPABASE_MAP)
+    for key in section_map.keys():
+        self._set_readonly_value(key, "")
+
+
+def _section1_cancel_company_search(self):
+    self._company_search_seq = getattr(self, "_company_search_seq", 0) + 1
+    _section1_set_company_searching(self, False)
+    _section1_clear_company(self, getattr(self, "_company_search_lookup", None))
+    self.status_label.config(text="Búsqueda cancelada.")
+
+
+def _section1_apply_company_result(self, mode, company, error, lookup):
+    if error is not None:
+        self.status_label.config(text="")
+        _section1_clear_company(self, lookup)
+        messagebox.showerror("Error", str(error))
+        return
+
+    if not company:
+        msg = "No se encontró empresa para ese nombre." if mode == "nombre" else "No se encontró empresa para ese NIT."
+        self.status_label.config(text=msg)
+        _section1_clear_company(self, lookup)
+        return
+
+    if mode == "nombre":
+        nit_value = company.get("nit_empresa")
+        if nit_value:
+            entry = self.fields.get("nit_empresa")
+            if entry:
+                entry.delete(0, tk.END)
+                entry.insert(0, nit_value)
+
+    self.company_data = company
+    self.status_label.config(text="Empresa encontrada.")
+    if getattr(self, "continue_btn", None) is not None:
+        self.continue_btn.config(state="normal")
+    section_map = getattr(lookup, "SECTION_1_SUPABASE_MAP", presentacion_programa.SECTION_1_SUPABASE_MAP)
+    for key in section_map.keys():
+        self._set_readonly_value(key, company.get(key))
 
 
 def _section1_build_groups(self, parent, groups, labels, modalidad_options=None):
@@ -1150,6 +1549,303 @@ class LoadingDialog:
         self.window.destroy()
 
 
+class CompanySearchIndex:
+    """
+    Indice en memoria de la lista de empresas del HUB.
+
+    Precalcula el texto normalizado de busqueda y una permutacion ordenada por
+    cada modo de orden, de modo que filtrar al teclear no vuelve a normalizar
+    ni a ordenar. Si la consulta nueva extiende la anterior, solo se revisan
+    los resultados previos.
+    """
+
+    def __init__(self, rows, normalize):
+        self.rows = rows
+        self.iids = []
+        self.rows_by_iid = {}
+        self._haystacks = []
+        name_keys = []
+        nit_keys = []
+        for pos, row in enumerate(rows):
+            iid = str(row.get("id") or "") or f"row_{pos}"
+            if iid in self.rows_by_iid:
+                iid = f"{iid}_{pos}"
+            self.iids.append(iid)
+            self.rows_by_iid[iid] = row
+            nit = (row.get("nit_empresa") or "").strip()
+            empresa = (row.get("nombre_empresa") or "").strip()
+            profesional = (row.get("profesional_asignado") or "").strip()
+            self._haystacks.append(normalize(f"{nit} {empresa} {profesional}"))
+            name_keys.append(normalize(empresa))
+            nit_keys.append(normalize(nit))
+        positions = range(len(rows))
+        by_name = sorted(positions, key=name_keys.__getitem__)
+        by_nit = sorted(positions, key=nit_keys.__getitem__)
+        self._orders = {
+            "Empresa A-Z": by_name,
+            "Empresa Z-A": sorted(positions, key=name_keys.__getitem__, reverse=True),
+            "NIT menor-mayor": by_nit,
+            "NIT mayor-menor": sorted(positions, key=nit_keys.__getitem__, reverse=True),
+        }
+        self._ranks = {}
+        self._last_term = ""
+        self._last_matches = list(positions)
+
+    def _rank(self, mode):
+        rank = self._ranks.get(mode)
+        if rank is None:
+            rank = [0] * len(self.rows)
+            for pos, idx in enumerate(self._orders[mode]):
+                rank[idx] = pos
+            self._ranks[mode] = rank
+        return rank
+
+    def _match(self, term):
+        if not term:
+            matches = list(range(len(self.rows)))
+        elif self._last_term and term.startswith(self._last_term):
+            # La consulta se extendio: basta con reducir el resultado anterior.
+            haystacks = self._haystacks
+            matches = [idx for idx in self._last_matches if term in haystacks[idx]]
+        else:
+            matches = [idx for idx, text in enumerate(self._haystacks) if term in text]
+        self._last_term = term
+        self._last_matches = matches
+        return matches
+
+    def search(self, term, mode):
+        """Devuelve las posiciones de las filas que contienen `term`, en el orden de `mode`."""
+        if mode not in self._orders:
+            mode = "Empresa A-Z"
+        matches = self._match(term)
+        order = self._orders[mode]
+        if len(matches) == len(self.rows):
+            return list(order)
+        if len(matches) * 8 < len(self.rows):
+            return sorted(matches, key=self._rank(mode).__getitem__)
+        selected = bytearray(len(self.rows))
+        for idx in matches:
+            selected[idx] = 1
+        return [idx for idx in order if selected[idx]]
+
+
+class VirtualTreeList:
+    """
+    Lista virtual sobre un ttk.Treeview plano.
+
+    Solo se materializan las filas visibles mas un margen; al acercarse el
+    scroll al final se agregan mas. Cada `set_items` aplica sobre lo ya
+    pintado el minimo de operaciones (delete, detach/move, insert) en vez de
+    borrar y reinsertar todo.
+    """
+
+    EMPTY_IID = "__empty__"
+
+    def __init__(self, tree, scrollbar, empty_values=None, margin=VIRTUAL_LIST_MARGIN_ROWS):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.empty_values = empty_values
+        self.margin = int(margin)
+        self._iids = []
+        self._values_for = None
+        self._rendered = {}
+        self._extend_pending = False
+        tree.configure(yscrollcommand=self._on_yscroll)
+
+    @property
+    def materialized(self):
+        return len(self._rendered)
+
+    def _window_size(self):
+        try:
+            height = int(self.tree.winfo_height())
+        except Exception:
+            height = 0
+        visible = max(height // VIRTUAL_LIST_ROW_HEIGHT, VIRTUAL_LIST_MIN_VISIBLE_ROWS)
+        return visible + self.margin
+
+    def set_items(self, iids, values_for):
+        """`iids` es la lista completa ordenada; `values_for(iid)` da los valores de cada fila."""
+        self._iids = list(iids)
+        self._values_for = values_for
+        if not self._iids and self.empty_values is not None:
+            self._apply_diff([self.EMPTY_IID])
+            return
+        self._apply_diff(self._iids[: self._window_size()])
+
+    def _row_values(self, iid):
+        if iid == self.EMPTY_IID:
+            return tuple(self.empty_values or ())
+        return tuple(self._values_for(iid))
+
+    def _apply_diff(self, target):
+        tree = self.tree
+        target_pos = {iid: pos for pos, iid in enumerate(target)}
+        current = list(tree.get_children())
+        stale = [iid for iid in current if iid not in target_pos]
+        if stale:
+            tree.delete(*stale)
+            for iid in stale:
+                self._rendered.pop(iid, None)
+        kept = [iid for iid in current if iid in target_pos]
+
+        # Las filas en la subsecuencia creciente mas larga se quedan quietas; el resto se mueve.
+        stable = _longest_increasing_run([target_pos[iid] for iid in kept], kept)
+        movers = [iid for iid in kept if iid not in stable]
+        if movers:
+            tree.detach(*movers)
+
+        for pos, iid in enumerate(target):
+            values = self._row_values(iid)
+            if iid not in self._rendered:
+                tree.insert("", pos, iid=iid, values=values)
+                self._rendered[iid] = values
+                continue
+            if iid not in stable:
+                tree.move(iid, "", pos)
+            if self._rendered[iid] != values:
+                tree.item(iid, values=values)
+                self._rendered[iid] = values
+
+    def _on_yscroll(self, first, last):
+        try:
+            self.scrollbar.set(first, last)
+        except Exception:
+            pass
+        try:
+            near_end = float(last) >= VIRTUAL_LIST_PREFETCH_FRACTION
+        except (TypeError, ValueError):
+            near_end = False
+        if near_end and not self._extend_pending and self.materialized < len(self._iids):
+            self._extend_pending = True
+            try:
+                self.tree.after_idle(self._extend)
+            except Exception:
+                self._extend_pending = False
+
+    def _extend(self):
+        self._extend_pending = False
+        start = self.materialized
+        if start >= len(self._iids) or self.EMPTY_IID in self._rendered:
+            return
+        for iid in self._iids[start : start + self._window_size()]:
+            values = self._row_values(iid)
+            self.tree.insert("", "end", iid=iid, values=values)
+            self._rendered[iid] = values
+
+
+class AsyncAutocomplete:
+    """
+    Autocompletado de un Combobox con consultas fuera del hilo de Tk.
+
+    Espera AUTOCOMPLETE_DEBOUNCE_MS desde la ultima tecla antes de consultar,
+    descarta respuestas viejas y, si el texto extiende una consulta cuyo
+    resultado no venia truncado, filtra ese resultado localmente sin red.
+    `fetch(prefix, limit)` devuelve (textos, truncado), donde truncado indica
+    si el servidor llego a `limit` filas (antes de quitar repetidos).
+    """
+
+    def __init__(self, widget, fetch, limit=10, min_chars=AUTOCOMPLETE_MIN_CHARS, delay_ms=AUTOCOMPLETE_DEBOUNCE_MS):
+        self.widget = widget
+        self.fetch = fetch
+        self.limit = int(limit)
+        self.min_chars = int(min_chars)
+        self.delay_ms = int(delay_ms)
+        self._after_id = None
+        self._request_seq = 0
+        self._last_prefix = ""
+        self._last_results = []
+        self._last_truncated = False
+
+    @staticmethod
+    def _normalize(value):
+        return " ".join(str(value or "").split()).casefold()
+
+    def _cancel_pending(self):
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _apply(self, values):
+        try:
+            if self.widget.winfo_exists():
+                self.widget["values"] = list(values)
+        except tk.TclError:
+            pass
+
+    def update(self, text=None):
+        prefix = self._normalize(self.widget.get() if text is None else text)
+        self._cancel_pending()
+        # Cualquier respuesta en vuelo queda obsoleta desde esta tecla.
+        self._request_seq += 1
+        if len(prefix) < self.min_chars:
+            self._apply([])
+            return
+
+        if self._last_prefix and prefix.startswith(self._last_prefix):
+            local = [name for name in self._last_results if self._normalize(name).startswith(prefix)]
+            self._apply(local)
+            if not self._last_truncated:
+                # El resultado anterior estaba completo: el filtro local es exacto.
+                return
+
+        seq = self._request_seq
+        self._after_id = self.widget.after(self.delay_ms, lambda: self._start(prefix, seq))
+
+    def _start(self, prefix, seq):
+        self._after_id = None
+        if seq != self._request_seq:
+            return
+
+        def _worker():
+            try:
+                names, truncated = self.fetch(prefix, self.limit)
+                results = list(names or [])
+            except Exception:
+                results = None
+                truncated = True
+
+            def _done():
+                if seq != self._request_seq or results is None:
+                    return
+                self._last_prefix = prefix
+                self._last_results = results
+                self._last_truncated = bool(truncated)
+                self._apply(results)
+
+            try:
+                self.widget.after(0, _done)
+            except Exception:
+                pass
+
+        threading.Thread(target=_worker, daemon=True).start()
+
+
+def _longest_increasing_run(sequence, items):
+    """Devuelve el conjunto de `items` que forman la subsecuencia creciente mas larga de `sequence`."""
+    tails = []
+    tails_idx = []
+    parents = [-1] * len(sequence)
+    for idx, value in enumerate(sequence):
+        pos = bisect.bisect_left(tails, value)
+        if pos == len(tails):
+            tails.append(value)
+            tails_idx.append(idx)
+        else:
+            tails[pos] = value
+            tails_idx[pos] = idx
+        parents[idx] = tails_idx[pos - 1] if pos else -1
+    stable = set()
+    idx = tails_idx[-1] if tails_idx else -1
+    while idx >= 0:
+        stable.add(items[idx])
+        idx = parents[idx]
+    return stable
+
+
 def get_forms():
     return [
         presentacion_programa.register_form(),
@@ -1484,6 +2180,7 @@ class Section1Window(tk.Toplevel, FormMousewheelMixin):
         )
 
         self.section5_entries = []
+        _register_row_adder(self, "section5_entries", self._add_asistente_row)
         self.section5_frame = asistentes_frame
         for idx in range(3):
             self._add_asistente_row()
@@ -1525,32 +2222,34 @@ class Section1Window(tk.Toplevel, FormMousewheelMixin):
             messagebox.showerror("Error", str(exc))
             return
         loading = LoadingDialog(self, title="Guardando")
-        loading.set_status("Guardando Excel...")
-        loading.set_progress(30)
         cache_snapshot = presentacion_programa.get_form_cache()
-        try:
-            output_path = presentacion_programa.export_to_excel()
-        except Exception as exc:
-            loading.close()
-            messagebox.showerror("Error", str(exc))
-            return
-        cache = cache_snapshot
-        section_1 = cache.get("section_1", {})
-        visit_type = (section_1.get("tipo_visita") or "Presentacion").strip()
-        form_name = (
-            "Reactivacion Programa" if visit_type.lower() == "reactivacion" else "Presentacion Programa"
-        )
-        company_name = section_1.get("nombre_empresa")
-        _finalize_export_flow(
+
+        def _done(output_path):
+            cache = cache_snapshot
+            section_1 = cache.get("section_1", {})
+            visit_type = (section_1.get("tipo_visita") or "Presentacion").strip()
+            form_name = (
+                "Reactivacion Programa" if visit_type.lower() == "reactivacion" else "Presentacion Programa"
+            )
+            company_name = section_1.get("nombre_empresa")
+            _finalize_export_flow(
+                self,
+                loading,
+                output_path,
+                form_name,
+                company_name,
+                "presentacion_programa",
+            )
+            _return_to_hub(self)
+            self.destroy()
+
+        _run_export_job(
             self,
             loading,
-            output_path,
-            form_name,
-            company_name,
-            "presentacion_programa",
+            lambda progress: presentacion_programa.export_to_excel(progress_callback=progress),
+            _done,
+            sections=presentacion_programa.EXPORT_SECTIONS,
         )
-        _return_to_hub(self)
-        self.destroy()
 
     def _add_asistente_row(self):
         max_items = presentacion_programa.SECTION_5.get("max_items", 10)
@@ -1687,56 +2386,7 @@ class Section1Window(tk.Toplevel, FormMousewheelMixin):
         entry.configure(state="readonly")
 
     def _search_company(self, mode="nit"):
-        nit = self.fields["nit_empresa"].get().strip()
-        nombre = self.fields.get("nombre_busqueda").get().strip() if self.fields.get("nombre_busqueda") else ""
-        if mode == "nit":
-            if not nit:
-                messagebox.showerror("Error", "Ingresa un NIT.")
-                return
-        elif mode == "nombre":
-            if not nombre:
-                messagebox.showerror("Error", "Ingresa el nombre de la empresa.")
-                return
-        else:
-            messagebox.showerror("Error", "Tipo de búsqueda no válido.")
-            return
-
-        lookup = getattr(self, "_empresa_lookup", presentacion_programa)
-        try:
-            self.status_label.config(text="Buscando empresa...")
-            self.update_idletasks()
-            if mode == "nombre":
-                company = lookup.get_empresa_by_nombre(nombre)
-            else:
-                company = lookup.get_empresa_by_nit(nit)
-        except Exception as exc:
-            self.status_label.config(text="")
-            messagebox.showerror("Error", str(exc))
-            return
-
-        section_map = getattr(lookup, "SECTION_1_SUPABASE_MAP", presentacion_programa.SECTION_1_SUPABASE_MAP)
-        if not company:
-            self.company_data = None
-            msg = "No se encontró empresa para ese nombre." if mode == "nombre" else "No se encontró empresa para ese NIT."
-            self.status_label.config(text=msg)
-            self.continue_btn.config(state="disabled")
-            for key in section_map.keys():
-                self._set_readonly_value(key, "")
-            return
-
-        if mode == "nombre":
-            nit_value = company.get("nit_empresa")
-            if nit_value:
-                entry = self.fields.get("nit_empresa")
-                if entry:
-                    entry.delete(0, tk.END)
-                    entry.insert(0, nit_value)
-
-        self.company_data = company
-        self.status_label.config(text="Empresa encontrada.")
-        self.continue_btn.config(state="normal")
-        for key in section_map.keys():
-            self._set_readonly_value(key, company.get(key))
+        _section1_search_company(self, mode, getattr(self, "_empresa_lookup", presentacion_programa))
 
     def _confirm_and_continue(self):
         if not self.company_data:
@@ -1767,18 +2417,17 @@ def _section1_update_nombre_suggestions(self):
     entry = self.fields.get("nombre_busqueda")
     if not entry:
         return
-    prefix = entry.get().strip()
-    if len(prefix) < 2:
-        entry["values"] = []
-        return
-    lookup = getattr(self, "_empresa_lookup", None)
-    if not lookup or not hasattr(lookup, "get_empresas_by_nombre_prefix"):
-        return
-    try:
-        suggestions = lookup.get_empresas_by_nombre_prefix(prefix)
-    except Exception:
-        suggestions = []
-    entry["values"] = suggestions
+    controller = getattr(self, "_nombre_autocomplete", None)
+    if controller is None or controller.widget is not entry:
+        lookup = getattr(self, "_empresa_lookup", None)
+        if not lookup or not hasattr(lookup, "get_empresas_by_nombre_prefix"):
+            return
+        controller = AsyncAutocomplete(
+            entry,
+            lambda prefix, limit: lookup.get_empresas_by_nombre_prefix(prefix, limit=limit, with_truncated=True),
+        )
+        self._nombre_autocomplete = controller
+    controller.update()
 
     def _build_actions(self, parent):
         actions = tk.Frame(parent, bg=COLOR_LIGHT_BG)
@@ -1918,8 +2567,13 @@ class HubWindow(tk.Tk):
         self._companies_all = []
         self._companies_by_id = {}
         self._companies_tree = None
+        self._companies_list = None
         self._companies_search_var = None
         self._companies_sort_var = None
+        self._companies_index = None
+        self._companies_render_after_id = None
+        self._empresas_select_clause = None
+        self._empresas_has_updated_at = None
         self._version_var = tk.StringVar(value="Versión local: - | GitHub: -")
         self._version_check_thread = None
         self._drafts_btn = None
@@ -2075,6 +2729,7 @@ class HubWindow(tk.Tk):
         self._cache_offline_user_auth(user_row, password)
         self.current_user = (user_row.get("usuario_login") or username).strip()
         self.current_user_profile = user_row
+        set_session_profesional(user_row.get("nombre_profesional") or self.current_user)
         try:
             self._normalize_profesional_asignado()
         except Exception:
@@ -2420,6 +3075,7 @@ class HubWindow(tk.Tk):
                 pass
             self._net_status_after_id = None
         self._mark_app_closed()
+        _flush_cache_writes()
         self.after(250, self.destroy)
 
     def _get_colombia_now(self):
@@ -2928,7 +3584,7 @@ class HubWindow(tk.Tk):
             return True
         # Permite match parcial solo para alias suficientemente descriptivos.
         for alias in aliases:
-            if len(alias) < 7:
+            if len(alias) < PROFESIONAL_PARTIAL_ALIAS_MIN:
                 continue
             if alias in asignado_norm or asignado_norm in alias:
                 return True
@@ -2970,113 +3626,238 @@ class HubWindow(tk.Tk):
         if updates:
             _supabase_upsert_with_queue("empresas", updates, on_conflict="id")
 
-    def _get_assigned_companies(self):
+    def _can_view_all_companies(self):
         user_login = self._norm_match(self.current_user_profile.get("usuario_login") or self.current_user)
         full_name = self._norm_match(self.current_user_profile.get("nombre_profesional"))
-        can_view_all = (
-            user_login in {"test", "sanpac", "sarzam", "sarzambrano"}
-            or "sandra pachon" in full_name
-            or "sara zambrano" in full_name
+        return user_login in EMPRESAS_VIEW_ALL_LOGINS or any(
+            name in full_name for name in EMPRESAS_VIEW_ALL_NAMES
         )
 
-        def _fetch_empresas(select_clause):
-            return _supabase_get_paged(
-                "empresas",
-                {"select": select_clause},
-                page_size=1000,
-                max_pages=50,
-            )
+    def _resolve_empresas_select(self):
+        # Prueba las columnas con limit=1 en vez de re-descargar toda la tabla por cada intento.
+        if self._empresas_select_clause:
+            return self._empresas_select_clause
+        last_exc = None
+        for clause in EMPRESAS_SELECT_CANDIDATES:
+            try:
+                _supabase_get("empresas", {"select": clause, "limit": 1})
+            except Exception as exc:
+                last_exc = exc
+                continue
+            self._empresas_select_clause = clause
+            return clause
+        raise last_exc
 
-        try:
-            empresas = _fetch_empresas(
-                "id,nombre_empresa,nit_empresa,ciudad_empresa,profesional_asignado,estado,comentarios_empresas"
-            )
-        except Exception:
+    def _empresas_supports_updated_at(self):
+        supported = self._empresas_has_updated_at
+        if supported is None:
             try:
-                empresas = _fetch_empresas(
-                    "id,nombre_empresa,nit_empresa,ciudad_empresa,profesional_asignado,estado,comentarios_empresas,comentarios"
-                )
+                _supabase_get("empresas", {"select": "updated_at", "limit": 1})
+                supported = True
             except Exception:
-                empresas = _fetch_empresas(
-                    "id,nombre_empresa,nit_empresa,ciudad_empresa,profesional_asignado"
-                )
-            for row in empresas:
-                row.setdefault("estado", "")
-                row.setdefault("comentarios_empresas", "")
-                if not row.get("comentarios_empresas"):
-                    row["comentarios_empresas"] = row.get("comentarios_empresa") or row.get("comentarios") or ""
-        if can_view_all:
-            assigned = [row for row in empresas if (row.get("nombre_empresa") or "").strip()]
-            assigned.sort(key=lambda r: self._norm_match(r.get("nombre_empresa") or ""))
-            return assigned
-
-        full_name = (self.current_user_profile.get("nombre_profesional") or "").strip()
-        aliases = self._build_profesional_aliases(full_name)
-        if not aliases:
-            return []
-        assigned = []
-        for row in empresas:
-            asignado = (row.get("profesional_asignado") or "").strip()
-            if self._is_profesional_match(asignado, aliases):
-                assigned.append(row)
-        assigned.sort(key=lambda r: self._norm_match(r.get("nombre_empresa") or ""))
-        return assigned
+                supported = False
+            self._empresas_has_updated_at = supported
+        return supported
 
-    def _get_company_estado_options(self):
-        return [opt for opt in DEFAULT_EMPRESA_ESTADOS if str(opt).strip()]
+    def _normalize_company_rows(self, rows):
+        for row in rows:
+            row.setdefault("estado", "")
+            row.setdefault("comentarios_empresas", "")
+            if not row.get("comentarios_empresas"):
+                row["comentarios_empresas"] = row.get("comentarios_empresa") or row.get("comentarios") or ""
+        return rows
 
-    def _filtered_sorted_companies(self):
-        term = self._norm_match(self._companies_search_var.get() if self._companies_search_var else "")
-        items = []
-        for row in self._companies_all:
-            nit = (row.get("nit_empresa") or "").strip()
-            empresa = (row.get("nombre_empresa") or "").strip()
-            profesional = (row.get("profesional_asignado") or "").strip()
-            haystack = self._norm_match(f"{nit} {empresa} {profesional}")
-            if term and term not in haystack:
-                continue
-            items.append(row)
+    def _get_assigned_companies_cache_key(self):
+        user_login = self._get_current_user_login()
+        if not user_login:
+            return ""
+        scope = "all" if self._can_view_all_companies() else "assigned"
+        return f"{user_login}|{scope}"
 
-        mode = self._companies_sort_var.get() if self._companies_sort_var else "Empresa A-Z"
-        if mode == "Empresa Z-A":
-            items.sort(key=lambda r: self._norm_match(r.get("nombre_empresa") or ""), reverse=True)
-        elif mode == "NIT menor-mayor":
-            items.sort(key=lambda r: self._norm_match(r.get("nit_empresa") or ""))
-        elif mode == "NIT mayor-menor":
-            items.sort(key=lambda r: self._norm_match(r.get("nit_empresa") or ""), reverse=True)
+    def _load_cached_assigned_companies(self):
+        key = self._get_assigned_companies_cache_key()
+        if not key:
+            return None
+        entry = _load_assigned_companies_store().get("users", {}).get(key)
+        if not isinstance(entry, dict) or not isinstance(entry.get("rows"), list):
+            return None
+        rows = [row for row in entry["rows"] if isinstance(row, dict)]
+        rows.sort(key=lambda r: self._norm_match(r.get("nombre_empresa") or ""))
+        return rows
+
+    def _fetch_fragment_assigned_companies(self, select_clause, aliases, known_ids):
+        """
+        Empresas cuyo asignado es solo un fragmento de un alias largo ("laura p"),
+        que el filtro ilike no trae. Se revisan id y profesional de toda la tabla
+        (dos columnas) y se piden completas solo las que faltan.
+        """
+        assignees = _supabase_get_paged(
+            "empresas",
+            {"select": "id,profesional_asignado", "profesional_asignado": "not.is.null"},
+            page_size=1000,
+            max_pages=50,
+        )
+        missing_ids = [
+            str(row.get("id"))
+            for row in assignees
+            if row.get("id") is not None
+            and str(row.get("id")) not in known_ids
+            and self._is_profesional_match((row.get("profesional_asignado") or "").strip(), aliases)
+        ]
+        rows = []
+        for start in range(0, len(missing_ids), ASSIGNED_COMPANIES_ID_CHUNK):
+            chunk = missing_ids[start:start + ASSIGNED_COMPANIES_ID_CHUNK]
+            rows.extend(
+                _supabase_get_paged(
+                    "empresas",
+                    {"select": select_clause, "id": f"in.({','.join(chunk)})"},
+                    page_size=1000,
+                    max_pages=1,
+                )
+            )
+        return rows
+
+    def _get_assigned_companies(self, force_full=False):
+        view_all = self._can_view_all_companies()
+        aliases = set()
+        if not view_all:
+            full_name = (self.current_user_profile.get("nombre_profesional") or "").strip()
+            aliases = self._build_profesional_aliases(full_name)
+            if not aliases:
+                return []
+
+        def _belongs(row):
+            if not (row.get("nombre_empresa") or "").strip():
+                return False
+            if view_all:
+                return True
+            return self._is_profesional_match((row.get("profesional_asignado") or "").strip(), aliases)
+
+        select_clause = self._resolve_empresas_select()
+        incremental = self._empresas_supports_updated_at()
+        if incremental:
+            select_clause = f"{select_clause},updated_at"
+
+        cache_key = self._get_assigned_companies_cache_key()
+        store = _load_assigned_companies_store()
+        entry = store.get("users", {}).get(cache_key) if cache_key else None
+        now = time.time()
+        can_delta = (
+            not force_full
+            and incremental
+            and isinstance(entry, dict)
+            and isinstance(entry.get("rows"), list)
+            and entry.get("select") == select_clause
+            and entry.get("watermark")
+            and now - float(entry.get("full_synced_at") or 0) < ASSIGNED_COMPANIES_FULL_REFRESH_SECONDS
+        )
+
+        rows_by_id = {}
+        full_synced_at = now
+        if can_delta:
+            # Incremental: solo filas modificadas; las reasignadas a otro profesional salen del cache.
+            # Las empresas borradas en Supabase no aparecen en el delta: siguen en el
+            # cache hasta el refresco completo (cada 6 h o "Actualizar Base de Datos").
+            changed = _supabase_get_paged(
+                "empresas",
+                {"select": select_clause, "updated_at": f"gte.{entry['watermark']}"},
+                page_size=1000,
+                max_pages=50,
+            )
+            for row in entry["rows"]:
+                if isinstance(row, dict) and row.get("id") is not None:
+                    rows_by_id[str(row.get("id"))] = row
+            fetched = changed
+            for row in changed:
+                row_id = str(row.get("id") or "")
+                if not row_id:
+                    continue
+                if _belongs(row):
+                    rows_by_id[row_id] = row
+                else:
+                    rows_by_id.pop(row_id, None)
+            full_synced_at = float(entry.get("full_synced_at") or now)
         else:
-            items.sort(key=lambda r: self._norm_match(r.get("nombre_empresa") or ""))
-        return items
+            params = {"select": select_clause}
+            if not view_all:
+                params["or"] = _build_profesional_or_filter(aliases)
+            empresas = _supabase_get_paged("empresas", params, page_size=1000, max_pages=50)
+            fetched = empresas
+            for idx, row in enumerate(empresas):
+                if _belongs(row):
+                    rows_by_id[str(row.get("id") or f"row_{idx}")] = row
+            if not view_all and _profesional_needs_fragment_scan(aliases):
+                missing = self._fetch_fragment_assigned_companies(select_clause, aliases, rows_by_id)
+                fetched = fetched + missing
+                for row in missing:
+                    if _belongs(row):
+                        rows_by_id[str(row.get("id"))] = row
+
+        assigned = self._normalize_company_rows(list(rows_by_id.values()))
+        assigned.sort(key=lambda r: self._norm_match(r.get("nombre_empresa") or ""))
 
-    def _render_companies(self, *_args):
-        if not self._companies_tree:
-            return
-        for item in self._companies_tree.get_children():
-            self._companies_tree.delete(item)
-        self._companies_by_id = {}
+        if cache_key:
+            watermark = max((str(r.get("updated_at") or "") for r in fetched), default="")
+            if can_delta:
+                watermark = max(watermark, str(entry.get("watermark") or ""))
+            store.setdefault("users", {})[cache_key] = {
+                "select": select_clause,
+                "watermark": watermark,
+                "full_synced_at": full_synced_at,
+                "synced_at": now,
+                "rows": assigned,
+            }
+            try:
+                _save_assigned_companies_store(store)
+            except Exception:
+                pass
+        return assigned
 
-        items = self._filtered_sorted_companies()
-        if not items:
-            self._companies_tree.insert("", "end", iid="__empty__", values=("-", "No hay empresas para mostrar.", "-"))
-            return
+    def _get_company_estado_options(self):
+        return [opt for opt in DEFAULT_EMPRESA_ESTADOS if str(opt).strip()]
 
-        for idx, row in enumerate(items, start=1):
-            row_id = str(row.get("id") or "")
-            if not row_id:
-                row_id = f"row_{idx}"
-            if row_id in self._companies_by_id:
-                row_id = f"{row_id}_{idx}"
-            self._companies_by_id[row_id] = row
-            self._companies_tree.insert(
-                "",
-                "end",
-                iid=row_id,
-                values=(
-                    (row.get("nit_empresa") or "").strip(),
-                    (row.get("nombre_empresa") or "").strip(),
-                    (row.get("profesional_asignado") or "").strip(),
-                ),
-            )
+    def _get_companies_index(self):
+        index = self._companies_index
+        if index is None or index.rows is not self._companies_all:
+            index = CompanySearchIndex(self._companies_all, self._norm_match)
+            self._companies_index = index
+            self._companies_by_id = index.rows_by_iid
+        return index
+
+    def _filtered_sorted_company_iids(self):
+        index = self._get_companies_index()
+        term = self._norm_match(self._companies_search_var.get() if self._companies_search_var else "")
+        mode = self._companies_sort_var.get() if self._companies_sort_var else "Empresa A-Z"
+        iids = index.iids
+        return [iids[idx] for idx in index.search(term, mode)]
+
+    def _company_row_values(self, iid):
+        row = self._companies_by_id.get(iid) or {}
+        return (
+            (row.get("nit_empresa") or "").strip(),
+            (row.get("nombre_empresa") or "").strip(),
+            (row.get("profesional_asignado") or "").strip(),
+        )
+
+    def _schedule_companies_render(self, *_args):
+        if self._companies_render_after_id is not None:
+            try:
+                self.after_cancel(self._companies_render_after_id)
+            except Exception:
+                pass
+        self._companies_render_after_id = self.after(
+            COMPANIES_SEARCH_DEBOUNCE_MS,
+            self._run_scheduled_companies_render,
+        )
+
+    def _run_scheduled_companies_render(self):
+        self._companies_render_after_id = None
+        self._render_companies()
+
+    def _render_companies(self, *_args):
+        if not self._companies_tree or not self._companies_list:
+            return
+        self._companies_list.set_items(self._filtered_sorted_company_iids(), self._company_row_values)
 
     def _open_company_editor(self, company_row):
         company_id = company_row.get("id")
@@ -3200,20 +3981,23 @@ class HubWindow(tk.Tk):
         return login.lower()
 
     def _get_user_drafts(self):
+        """Metadatos de los borradores del usuario; el cache se carga al abrir uno."""
         user_login = self._get_current_user_login()
         if not user_login:
             return []
-        data = _load_drafts_store()
-        users = data.get("users", {})
-        drafts = users.get(user_login, [])
-        if not isinstance(drafts, list):
+        try:
+            return draft_store.list_drafts(user_login)
+        except Exception:
             return []
-        return [item for item in drafts if isinstance(item, dict)]
 
     def _refresh_drafts_badge(self):
         if not self._drafts_btn:
             return
-        count = len(self._get_user_drafts())
+        user_login = self._get_current_user_login()
+        try:
+            count = draft_store.count_drafts(user_login) if user_login else 0
+        except Exception:
+            count = 0
         self._drafts_btn.config(text=f"Borradores ({count})")
 
     def _clear_form_memory_caches(self):
@@ -3234,7 +4018,7 @@ class HubWindow(tk.Tk):
             rows = []
             try:
                 self._clear_form_memory_caches()
-                rows = self._get_assigned_companies()
+                rows = self._get_assigned_companies(force_full=True)
             except Exception as exc:
                 err = exc
 
@@ -3255,6 +4039,24 @@ class HubWindow(tk.Tk):
 
         threading.Thread(target=_worker, daemon=True).start()
 
+    def _sync_assigned_companies_async(self):
+        def _worker():
+            try:
+                rows = self._get_assigned_companies()
+            except Exception:
+                return
+
+            def _done():
+                self._companies_all = rows
+                self._render_companies()
+
+            try:
+                self.after(0, _done)
+            except Exception:
+                pass
+
+        threading.Thread(target=_worker, daemon=True).start()
+
     def _save_current_form_draft(self, window):
         form_id = getattr(window, "_form_id", "") or ""
         form_name = getattr(window, "_form_name", "") or form_id
@@ -3294,42 +4096,22 @@ class HubWindow(tk.Tk):
             messagebox.showerror("Guardar", "No hay una sesión activa.")
             return
 
-        data = _load_drafts_store()
-        users = data.setdefault("users", {})
-        drafts = users.setdefault(user_login, [])
-        if not isinstance(drafts, list):
-            drafts = []
-            users[user_login] = drafts
-
-        existing = None
-        for item in drafts:
-            if (
-                str(item.get("form_id") or "") == form_id
-                and str(item.get("company_key") or "") == company_key
-            ):
-                existing = item
-                break
-
-        if existing is None:
-            existing = {
-                "draft_id": str(uuid.uuid4()),
-                "form_id": form_id,
-                "form_name": form_name,
-                "company_key": company_key,
-                "company_name": company_name,
-                "created_at": now,
-            }
-            drafts.append(existing)
-
-        existing["updated_at"] = now
-        existing["last_section"] = ui_section or cache_snapshot.get("_last_section", "")
-        existing["cache"] = cache_snapshot
-        existing["company_name"] = company_name
-        existing["ui_section"] = ui_section
-        existing["ui_snapshot"] = ui_snapshot
-
+        autosave = getattr(window, "_autosave", None)
         try:
-            _save_drafts_store(data)
+            draft_id = draft_store.save_draft(
+                user_login,
+                form_id,
+                form_name,
+                company_key,
+                company_name,
+                cache_snapshot,
+                ui_section,
+                ui_snapshot,
+                now,
+                draft_id=autosave.draft_id if autosave else None,
+            )
+            if autosave:
+                autosave.adopt(draft_id)
         except Exception as exc:
             messagebox.showerror("Guardar", f"No se pudo guardar el borrador: {exc}")
             return
@@ -3343,6 +4125,11 @@ class HubWindow(tk.Tk):
         if not module:
             messagebox.showerror("Borradores", "El formulario de este borrador ya no está disponible.")
             return
+        if "cache" not in draft:
+            try:
+                draft = draft_store.load_draft(str(draft.get("draft_id") or "")) or {}
+            except Exception:
+                draft = {}
         cache_snapshot = draft.get("cache")
         if not isinstance(cache_snapshot, dict) or not cache_snapshot:
             messagebox.showerror("Borradores", "El borrador no tiene datos válidos.")
@@ -3366,9 +4153,16 @@ class HubWindow(tk.Tk):
             messagebox.showerror("Borradores", "No se encontró el formulario en el HUB.")
             return
         window = self._open_form(form_meta)
+        autosave = getattr(window, "_autosave", None) if window else None
+        if autosave and draft.get("draft_id"):
+            # La ventana sigue autoguardando en el borrador desde el que se abrio.
+            autosave.adopt(str(draft["draft_id"]))
         ui_snapshot = draft.get("ui_snapshot")
         if not window or not isinstance(ui_snapshot, list) or not ui_snapshot:
             return
+        if not _is_legacy_snapshot(ui_snapshot):
+            _apply_input_snapshot(window, ui_snapshot)
+            return
 
         def _try_apply(attempt=0):
             if not window.winfo_exists():
@@ -3469,11 +4263,11 @@ class HubWindow(tk.Tk):
             if not messagebox.askyesno("Borradores", "¿Eliminar este borrador?"):
                 return
             user_login = self._get_current_user_login()
-            data = _load_drafts_store()
-            users = data.get("users", {})
-            current = users.get(user_login, [])
-            users[user_login] = [row for row in current if str(row.get("draft_id") or "") != draft_id]
-            _save_drafts_store(data)
+            try:
+                draft_store.delete_draft(user_login, draft_id)
+            except Exception as exc:
+                messagebox.showerror("Borradores", f"No se pudo eliminar el borrador: {exc}")
+                return
             tree.delete(sel)
             draft_by_iid.pop(sel, None)
             self._refresh_drafts_badge()
@@ -3581,7 +4375,7 @@ class HubWindow(tk.Tk):
             textvariable=self._companies_sort_var,
             state="readonly",
             width=20,
-            values=["Empresa A-Z", "Empresa Z-A", "NIT menor-mayor", "NIT mayor-menor"],
+            values=list(COMPANIES_SORT_MODES),
         )
         sort_combo.pack(side="left")
 
@@ -3598,6 +4392,11 @@ class HubWindow(tk.Tk):
             yscrollcommand=scrollbar.set,
         )
         self._companies_tree = tree
+        self._companies_list = VirtualTreeList(
+            tree,
+            scrollbar,
+            empty_values=("-", "No hay empresas para mostrar.", "-"),
+        )
         tree.heading("nit", text="NIT")
         tree.heading("empresa", text="Nombre Empresa")
         tree.heading("profesional", text="Profesional Asignado")
@@ -3607,15 +4406,22 @@ class HubWindow(tk.Tk):
         tree.pack(side="left", fill="both", expand=True)
         scrollbar.config(command=tree.yview)
 
-        try:
-            self._companies_all = self._get_assigned_companies()
-        except Exception as exc:
-            self._companies_all = []
-            messagebox.showwarning("Empresas", f"Error cargando empresas: {exc}")
-        self._companies_search_var.trace_add("write", self._render_companies)
+        cached_companies = self._load_cached_assigned_companies()
+        if cached_companies is not None:
+            # Muestra el cache local de inmediato y refresca solo los cambios en segundo plano.
+            self._companies_all = cached_companies
+        else:
+            try:
+                self._companies_all = self._get_assigned_companies()
+            except Exception as exc:
+                self._companies_all = []
+                messagebox.showwarning("Empresas", f"Error cargando empresas: {exc}")
+        self._companies_search_var.trace_add("write", self._schedule_companies_render)
         sort_combo.bind("<<ComboboxSelected>>", self._render_companies)
         tree.bind("<Double-1>", self._on_company_double_click)
         self._render_companies()
+        if cached_companies is not None:
+            self._sync_assigned_companies_async()
 
     def _bind_form_runtime(self, window, form_meta):
         if not window or not form_meta:
@@ -3641,7 +4447,14 @@ class HubWindow(tk.Tk):
                 def _wrapped(*args, **kwargs):
                     section = method_name.replace("_show_", "")
                     window._current_section = section
-                    return fn(*args, **kwargs)
+                    # Cambiar de seccion suele venir de confirmar la anterior (FORM_CACHE cambio).
+                    mark_dirty = getattr(window, "_autosave_mark_dirty", None)
+                    if callable(mark_dirty):
+                        mark_dirty()
+                    result = fn(*args, **kwargs)
+                    # Los campos de la seccion recien construida toman el valor del borrador.
+                    _apply_pending_snapshot(window)
+                    return result
 
                 _wrapped._section_wrapped = True
                 return _wrapped
@@ -3653,6 +4466,127 @@ class HubWindow(tk.Tk):
                 window._current_section = str(cache.get("_last_section"))
         except Exception:
             pass
+        if window._save_draft_command:
+            self._install_autosave(window, module, form_id, form_name)
+
+        def _on_destroy(event):
+            # El cache del formulario se escribe en segundo plano: al cerrar
+            # la ventana se adelanta lo pendiente sin bloquear el HUB.
+            if event.widget is window:
+                _flush_cache_writes(wait=False)
+
+        window.bind("<Destroy>", _on_destroy, add="+")
+
+    def _install_autosave(self, window, module, form_id, form_name):
+        """
+        Autoguardado del formulario en sus borradores: cada AUTOSAVE_INTERVAL_MS
+        o al salir de un campo, si hubo cambios. En el hilo de Tk solo se copia
+        el cache y se lee la pantalla; el diff por seccion/campo y la escritura
+        van en un hilo de trabajo.
+        """
+        user_login = self._get_current_user_login()
+        if not user_login:
+            return
+        autosave = draft_store.DraftAutosave(user_login, form_id, form_name)
+        state = {"dirty": False, "busy": False, "after_id": None, "stopped": False}
+
+        def _mark_dirty(_event=None):
+            state["dirty"] = True
+
+        def _schedule(delay_ms):
+            if state["stopped"]:
+                return
+            if state["after_id"]:
+                try:
+                    window.after_cancel(state["after_id"])
+                except Exception:
+                    pass
+            try:
+                state["after_id"] = window.after(delay_ms, _tick)
+            except Exception:
+                state["after_id"] = None
+
+        def _on_focus_out(_event=None):
+            if state["dirty"] and not state["busy"]:
+                _schedule(AUTOSAVE_FOCUS_DELAY_MS)
+
+        def _tick():
+            state["after_id"] = None
+            if state["stopped"] or not window.winfo_exists():
+                return
+            if state["dirty"] and not state["busy"]:
+                try:
+                    cache = copy.deepcopy(module.get_form_cache() or {})
+                    snapshot = _collect_visible_input_snapshot(window)
+                except Exception:
+                    cache = None
+                if cache is not None:
+                    state["dirty"] = False
+                    state["busy"] = True
+                    ui_section = str(
+                        getattr(window, "_current_section", "") or cache.get("_last_section") or "section_1"
+                    ).strip()
+                    if ui_section:
+                        cache["_last_section"] = ui_section
+                    self._run_autosave(window, autosave, state, cache, snapshot, ui_section)
+            _schedule(AUTOSAVE_INTERVAL_MS)
+
+        def _stop(discard=False):
+            state["stopped"] = True
+            if state["after_id"]:
+                try:
+                    window.after_cancel(state["after_id"])
+                except Exception:
+                    pass
+            if not discard:
+                return
+
+            def _discard():
+                try:
+                    autosave.discard()
+                except Exception:
+                    return
+                try:
+                    self.after(0, self._refresh_drafts_badge)
+                except Exception:
+                    pass
+
+            threading.Thread(target=_discard, daemon=True).start()
+
+        window._autosave = autosave
+        window._autosave_mark_dirty = _mark_dirty
+        window._autosave_stop = _stop
+        for sequence in AUTOSAVE_DIRTY_EVENTS:
+            window.bind(sequence, _mark_dirty, add="+")
+        window.bind("<FocusOut>", _on_focus_out, add="+")
+        _schedule(AUTOSAVE_INTERVAL_MS)
+
+    def _run_autosave(self, window, autosave, state, cache, snapshot, ui_section):
+        company_name = _extract_draft_company_name(cache) or "Sin empresa"
+        company_key = _extract_draft_company_key(cache)
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        had_draft = autosave.draft_id is not None
+
+        def _worker():
+            try:
+                autosave.save(cache, snapshot, ui_section, company_key, company_name, now)
+                failed = False
+            except Exception:
+                failed = True
+
+            def _done():
+                state["busy"] = False
+                if failed:
+                    state["dirty"] = True
+                elif not had_draft:
+                    self._refresh_drafts_badge()
+
+            try:
+                self.after(0, _done)
+            except Exception:
+                pass
+
+        threading.Thread(target=_worker, daemon=True).start()
 
     def _open_form(self, form_meta):
         if form_meta["id"] == "presentacion_programa":
@@ -5437,6 +6371,8 @@ class EvaluacionAccesibilidadWindow(tk.Toplevel, FormMousewheelMixin):
             self.section8_entries.append((name_widget, role_widget))
             self.add_asistente_btn.grid(row=len(self.section8_entries) + 1, column=0, sticky="w", pady=(8, 0))
 
+        _register_row_adder(self, "section8_entries", add_row)
+
         self.add_asistente_btn = ttk.Button(
             table,
             text="Agregar asistente",
@@ -5479,48 +6415,37 @@ class EvaluacionAccesibilidadWindow(tk.Toplevel, FormMousewheelMixin):
             messagebox.showerror("Error", str(exc))
             return
         loading = LoadingDialog(self, title="Guardando")
-        loading.set_status("Preparando exportación...")
-        loading.set_progress(5)
-
         cache_snapshot = evaluacion_accesibilidad.get_form_cache()
-        try:
-            section_order = list(evaluacion_accesibilidad.EXCEL_MAPPING.keys())
-            total_steps = len(section_order)
-
-            def _on_progress(section_id):
-                try:
-                    idx = section_order.index(section_id) + 1
-                except ValueError:
-                    idx = 1
-                loading.set_status(f"Guardando {section_id.replace('_', ' ')}...")
-                loading.set_progress(5 + int((idx / total_steps) * 90))
 
-            output_path = evaluacion_accesibilidad.export_to_excel(progress_callback=_on_progress)
-        except Exception as exc:
-            loading.close()
-            messagebox.showerror("Error", str(exc))
-            return
+        def _done(output_path):
+            if output_path:
+                cache = cache_snapshot
+                section_1 = cache.get("section_1", {})
+                company_name = section_1.get("nombre_empresa")
+                _finalize_export_flow(
+                    self,
+                    loading,
+                    output_path,
+                    "Evaluacion Accesibilidad",
+                    company_name,
+                    "evaluacion_accesibilidad",
+                )
+            else:
+                loading.close()
+                messagebox.showerror(
+                    "Error",
+                    "No se encontró el archivo de Excel generado.",
+                )
+            _return_to_hub(self)
+            self.destroy()
 
-        if output_path:
-            cache = cache_snapshot
-            section_1 = cache.get("section_1", {})
-            company_name = section_1.get("nombre_empresa")
-            _finalize_export_flow(
-                self,
-                loading,
-                output_path,
-                "Evaluacion Accesibilidad",
-                company_name,
-                "evaluacion_accesibilidad",
-            )
-        else:
-            loading.close()
-            messagebox.showerror(
-                "Error",
-                "No se encontró el archivo de Excel generado.",
-            )
-        _return_to_hub(self)
-        self.destroy()
+        _run_export_job(
+            self,
+            loading,
+            lambda progress: evaluacion_accesibilidad.export_to_excel(progress_callback=progress),
+            _done,
+            sections=evaluacion_accesibilidad.EXPORT_SECTIONS,
+        )
 
 
     def _set_widget_value(self, widget, value):
@@ -5697,54 +6622,7 @@ class EvaluacionAccesibilidadWindow(tk.Toplevel, FormMousewheelMixin):
         entry.configure(state="readonly")
 
     def _search_company(self, mode="nit"):
-        nit = self.fields["nit_empresa"].get().strip()
-        nombre = self.fields.get("nombre_busqueda").get().strip() if self.fields.get("nombre_busqueda") else ""
-        if mode == "nit":
-            if not nit:
-                messagebox.showerror("Error", "Ingresa un NIT.")
-                return
-        elif mode == "nombre":
-            if not nombre:
-                messagebox.showerror("Error", "Ingresa el nombre de la empresa.")
-                return
-        else:
-            messagebox.showerror("Error", "Tipo de búsqueda no válido.")
-            return
-
-        try:
-            self.status_label.config(text="Buscando empresa...")
-            self.update_idletasks()
-            if mode == "nombre":
-                company = evaluacion_accesibilidad.get_empresa_by_nombre(nombre)
-            else:
-                company = evaluacion_accesibilidad.get_empresa_by_nit(nit)
-        except Exception as exc:
-            self.status_label.config(text="")
-            messagebox.showerror("Error", str(exc))
-            return
-
-        if not company:
-            self.company_data = None
-            msg = "No se encontró empresa para ese nombre." if mode == "nombre" else "No se encontró empresa para ese NIT."
-            self.status_label.config(text=msg)
-            self.continue_btn.config(state="disabled")
-            for key in evaluacion_accesibilidad.SECTION_1_SUPABASE_MAP.keys():
-                self._set_readonly_value(key, "")
-            return
-
-        if mode == "nombre":
-            nit_value = company.get("nit_empresa")
-            if nit_value:
-                entry = self.fields.get("nit_empresa")
-                if entry:
-                    entry.delete(0, tk.END)
-                    entry.insert(0, nit_value)
-
-        self.company_data = company
-        self.status_label.config(text="Empresa encontrada.")
-        self.continue_btn.config(state="normal")
-        for key in evaluacion_accesibilidad.SECTION_1_SUPABASE_MAP.keys():
-            self._set_readonly_value(key, company.get(key))
+        _section1_search_company(self, mode, evaluacion_accesibilidad)
 
     def _confirm_and_continue(self):
         if not self.company_data:
@@ -5915,77 +6793,30 @@ class CondicionesVacanteWindow(tk.Toplevel, FormMousewheelMixin):
         entry.configure(state="readonly")
 
     def _search_company(self, mode="nit"):
-        nit = self.fields["nit_empresa"].get().strip()
-        nombre = self.fields.get("nombre_busqueda").get().strip() if self.fields.get("nombre_busqueda") else ""
-        if mode == "nit":
-            if not nit:
-                messagebox.showerror("Error", "Ingresa un NIT.")
-                return
-        elif mode == "nombre":
-            if not nombre:
-                messagebox.showerror("Error", "Ingresa el nombre de la empresa.")
-                return
-        else:
-            messagebox.showerror("Error", "Tipo de búsqueda no válido.")
+        _section1_search_company(self, mode, condiciones_vacante)
+
+    def _confirm_and_continue(self):
+        if not self.company_data:
+            messagebox.showerror("Error", "Busca una empresa antes de confirmar.")
             return
 
+        fecha_visita = _get_required_fecha_visita(self)
+        if not fecha_visita:
+            return
+        modalidad = _get_required_modalidad(self)
+        if not modalidad:
+            return
+        user_inputs = {
+            "fecha_visita": fecha_visita,
+            "modalidad": modalidad,
+            "nit_empresa": self.fields["nit_empresa"].get().strip(),
+        }
         try:
-            self.status_label.config(text="Buscando empresa...")
-            self.update_idletasks()
-            if mode == "nombre":
-                company = condiciones_vacante.get_empresa_by_nombre(nombre)
-            else:
-                company = condiciones_vacante.get_empresa_by_nit(nit)
+            condiciones_vacante.confirm_section_1(self.company_data, user_inputs)
         except Exception as exc:
-            self.status_label.config(text="")
             messagebox.showerror("Error", str(exc))
             return
-
-        if not company:
-            self.company_data = None
-            msg = "No se encontró empresa para ese nombre." if mode == "nombre" else "No se encontró empresa para ese NIT."
-            self.status_label.config(text=msg)
-            self.continue_btn.config(state="disabled")
-            for key in condiciones_vacante.SECTION_1_SUPABASE_MAP.keys():
-                self._set_readonly_value(key, "")
-            return
-
-        if mode == "nombre":
-            nit_value = company.get("nit_empresa")
-            if nit_value:
-                entry = self.fields.get("nit_empresa")
-                if entry:
-                    entry.delete(0, tk.END)
-                    entry.insert(0, nit_value)
-
-        self.company_data = company
-        self.status_label.config(text="Empresa encontrada.")
-        self.continue_btn.config(state="normal")
-        for key in condiciones_vacante.SECTION_1_SUPABASE_MAP.keys():
-            self._set_readonly_value(key, company.get(key))
-
-    def _confirm_and_continue(self):
-        if not self.company_data:
-            messagebox.showerror("Error", "Busca una empresa antes de confirmar.")
-            return
-
-        fecha_visita = _get_required_fecha_visita(self)
-        if not fecha_visita:
-            return
-        modalidad = _get_required_modalidad(self)
-        if not modalidad:
-            return
-        user_inputs = {
-            "fecha_visita": fecha_visita,
-            "modalidad": modalidad,
-            "nit_empresa": self.fields["nit_empresa"].get().strip(),
-        }
-        try:
-            condiciones_vacante.confirm_section_1(self.company_data, user_inputs)
-        except Exception as exc:
-            messagebox.showerror("Error", str(exc))
-            return
-        self._show_section_2()
+        self._show_section_2()
 
     def _show_section_2(self):
         self._clear_section_container()
@@ -6632,6 +7463,7 @@ class CondicionesVacanteWindow(tk.Toplevel, FormMousewheelMixin):
         ).grid(row=0, column=2, sticky="w")
 
         self.section6_rows = []
+        _register_row_adder(self, "section6_rows", self._add_disability_row)
         self.section6_container = tk.Frame(content, bg=COLOR_LIGHT_BG)
         self.section6_container.pack(fill="x")
         self.disability_options = condiciones_vacante.SECTION_6["options"]
@@ -6814,6 +7646,8 @@ class CondicionesVacanteWindow(tk.Toplevel, FormMousewheelMixin):
             self.section8_rows.append((nombre_entry, cargo_entry))
             add_btn.grid(row=len(self.section8_rows) + 1, column=0, sticky="w", pady=(8, 0))
 
+        _register_row_adder(self, "section8_rows", _add_asistente_row)
+
         add_btn = ttk.Button(
             table,
             text="Agregar asistente",
@@ -6851,28 +7685,30 @@ class CondicionesVacanteWindow(tk.Toplevel, FormMousewheelMixin):
             messagebox.showerror("Error", str(exc))
             return
         loading = LoadingDialog(self, title="Guardando")
-        loading.set_status("Guardando Excel...")
-        loading.set_progress(30)
         cache_snapshot = condiciones_vacante.get_form_cache()
-        try:
-            output_path = condiciones_vacante.export_to_excel()
-        except Exception as exc:
-            loading.close()
-            messagebox.showerror("Error", str(exc))
-            return
-        cache = cache_snapshot
-        section_1 = cache.get("section_1", {})
-        company_name = section_1.get("nombre_empresa")
-        _finalize_export_flow(
+
+        def _done(output_path):
+            cache = cache_snapshot
+            section_1 = cache.get("section_1", {})
+            company_name = section_1.get("nombre_empresa")
+            _finalize_export_flow(
+                self,
+                loading,
+                output_path,
+                "Revision Condicion",
+                company_name,
+                "condiciones_vacante",
+            )
+            _return_to_hub(self)
+            self.destroy()
+
+        _run_export_job(
             self,
             loading,
-            output_path,
-            "Revision Condicion",
-            company_name,
-            "condiciones_vacante",
+            lambda progress: condiciones_vacante.export_to_excel(progress_callback=progress),
+            _done,
+            sections=condiciones_vacante.EXPORT_SECTIONS,
         )
-        _return_to_hub(self)
-        self.destroy()
 
 
 class SeleccionIncluyenteWindow(tk.Toplevel, FormMousewheelMixin):
@@ -6971,20 +7807,10 @@ class SeleccionIncluyenteWindow(tk.Toplevel, FormMousewheelMixin):
         return cleaned
 
     def _load_cedula_options(self):
-        try:
-            self.cedula_options = seleccion_incluyente.get_usuarios_reca_cedulas()
-        except Exception:
-            self.cedula_options = []
+        self.cedula_options = _load_cedula_suggestions()
 
     def _filter_cedula_values(self, widget):
-        raw = widget.get()
-        normalized = re.sub(r"\D+", "", raw)
-        options = self.cedula_options or []
-        if normalized:
-            filtered = [c for c in options if c and normalized in c]
-        else:
-            filtered = options
-        widget.configure(values=filtered)
+        _filter_cedula_combobox(widget)
 
     def _format_date_for_ui(self, value):
         if not value:
@@ -7100,54 +7926,7 @@ class SeleccionIncluyenteWindow(tk.Toplevel, FormMousewheelMixin):
         entry.configure(state="readonly")
 
     def _search_company(self, mode="nit"):
-        nit = self.fields["nit_empresa"].get().strip()
-        nombre = self.fields.get("nombre_busqueda").get().strip() if self.fields.get("nombre_busqueda") else ""
-        if mode == "nit":
-            if not nit:
-                messagebox.showerror("Error", "Ingresa un NIT.")
-                return
-        elif mode == "nombre":
-            if not nombre:
-                messagebox.showerror("Error", "Ingresa el nombre de la empresa.")
-                return
-        else:
-            messagebox.showerror("Error", "Tipo de búsqueda no válido.")
-            return
-
-        try:
-            self.status_label.config(text="Buscando empresa...")
-            self.update_idletasks()
-            if mode == "nombre":
-                company = seleccion_incluyente.get_empresa_by_nombre(nombre)
-            else:
-                company = seleccion_incluyente.get_empresa_by_nit(nit)
-        except Exception as exc:
-            self.status_label.config(text="")
-            messagebox.showerror("Error", str(exc))
-            return
-
-        if not company:
-            self.company_data = None
-            msg = "No se encontró empresa para ese nombre." if mode == "nombre" else "No se encontró empresa para ese NIT."
-            self.status_label.config(text=msg)
-            self.continue_btn.config(state="disabled")
-            for key in seleccion_incluyente.SECTION_1_SUPABASE_MAP.keys():
-                self._set_readonly_value(key, "")
-            return
-
-        if mode == "nombre":
-            nit_value = company.get("nit_empresa")
-            if nit_value:
-                entry = self.fields.get("nit_empresa")
-                if entry:
-                    entry.delete(0, tk.END)
-                    entry.insert(0, nit_value)
-
-        self.company_data = company
-        self.status_label.config(text="Empresa encontrada.")
-        self.continue_btn.config(state="normal")
-        for key in seleccion_incluyente.SECTION_1_SUPABASE_MAP.keys():
-            self._set_readonly_value(key, company.get(key))
+        _section1_search_company(self, mode, seleccion_incluyente)
 
     def _confirm_and_continue(self):
         if not self.company_data:
@@ -7648,6 +8427,8 @@ class SeleccionIncluyenteWindow(tk.Toplevel, FormMousewheelMixin):
             _refresh_oferente_numbers()
             _update_remove_button_state()
 
+        _register_row_adder(self, "oferente_blocks", _add_oferente_block)
+
         def _remove_oferente_block():
             if len(self.oferente_blocks) <= 1:
                 return
@@ -7796,6 +8577,8 @@ class SeleccionIncluyenteWindow(tk.Toplevel, FormMousewheelMixin):
             self.section6_rows.append((nombre_entry, cargo_entry))
             add_btn.grid(row=len(self.section6_rows) + 1, column=0, sticky="w", pady=(8, 0))
 
+        _register_row_adder(self, "section6_rows", _add_asistente_row)
+
         add_btn = ttk.Button(
             table,
             text="Agregar asistente",
@@ -7844,36 +8627,35 @@ class SeleccionIncluyenteWindow(tk.Toplevel, FormMousewheelMixin):
             messagebox.showerror("Error", str(exc))
             return
         loading = LoadingDialog(self, title="Guardando")
-        loading.set_status("Generando Excel...")
-        loading.set_progress(40)
         cache_snapshot = seleccion_incluyente.get_form_cache()
-        try:
-            output_path = seleccion_incluyente.export_to_excel(clear_cache=False)
-        except Exception as exc:
-            loading.close()
-            messagebox.showerror("Error", str(exc))
-            return
-        loading.set_status("Guardando en Supabase...")
-        loading.set_progress(70)
-        try:
-            seleccion_incluyente.sync_usuarios_reca()
-        except Exception as exc:
-            loading.close()
-            messagebox.showerror("Error", f"No se pudo guardar en Supabase.\n{exc}")
-            return
-        cache = cache_snapshot
-        section_1 = cache.get("section_1", {})
-        company_name = section_1.get("nombre_empresa")
-        _finalize_export_flow(
+
+        def _done(output_path):
+            cache = cache_snapshot
+            section_1 = cache.get("section_1", {})
+            company_name = section_1.get("nombre_empresa")
+            _finalize_export_flow(
+                self,
+                loading,
+                output_path,
+                "Seleccion Incluyente",
+                company_name,
+                "seleccion_incluyente",
+                extra_paths=seleccion_incluyente.get_form_cache().get("_output_paths") or (),
+            )
+            _return_to_hub(self)
+            self.destroy()
+
+        _run_export_job(
             self,
             loading,
-            output_path,
-            "Seleccion Incluyente",
-            company_name,
-            "seleccion_incluyente",
+            lambda progress: seleccion_incluyente.export_to_excel(
+                clear_cache=False,
+                progress_callback=progress,
+            ),
+            _done,
+            sync=seleccion_incluyente.sync_usuarios_reca,
+            sections=seleccion_incluyente.EXPORT_SECTIONS,
         )
-        _return_to_hub(self)
-        self.destroy()
 
     def _format_birthdate(self, _event, fecha_widget, edad_widget):
         digits, formatted = _format_birthdate_text(fecha_widget.get())
@@ -7967,20 +8749,10 @@ class ContratacionIncluyenteWindow(tk.Toplevel, FormMousewheelMixin):
         _refresh_age_from_date_entry(date_entry, age_entry, min_year=1900)
 
     def _load_cedula_options(self):
-        try:
-            self.cedula_options = contratacion_incluyente.get_usuarios_reca_cedulas()
-        except Exception:
-            self.cedula_options = []
+        self.cedula_options = _load_cedula_suggestions()
 
     def _filter_cedula_values(self, widget):
-        raw = widget.get()
-        normalized = re.sub(r"\D+", "", raw)
-        options = self.cedula_options or []
-        if normalized:
-            filtered = [c for c in options if c and normalized in c]
-        else:
-            filtered = options
-        widget.configure(values=filtered)
+        _filter_cedula_combobox(widget)
 
     def _format_date_for_ui(self, value):
         if not value:
@@ -8629,6 +9401,8 @@ class ContratacionIncluyenteWindow(tk.Toplevel, FormMousewheelMixin):
 
             self.oferente_blocks.append(fields)
 
+        _register_row_adder(self, "oferente_blocks", _add_oferente_block)
+
         def _refresh_oferente_numbers():
             for idx, fields in enumerate(self.oferente_blocks, start=1):
                 numero_widget = fields.get("numero")
@@ -8755,6 +9529,9 @@ class ContratacionIncluyenteWindow(tk.Toplevel, FormMousewheelMixin):
             nombre_entry.grid(row=row_idx, column=0, sticky="w", pady=4, padx=(0, 12))
             cargo_entry.grid(row=row_idx, column=1, sticky="w", pady=4)
             self.section7_rows.append((nombre_entry, cargo_entry))
+
+        _register_row_adder(self, "section7_rows", _add_asistente_row)
+
         _add_asistente_row()
         _add_asistente_row()
         _add_asistente_row()
@@ -8818,37 +9595,35 @@ class ContratacionIncluyenteWindow(tk.Toplevel, FormMousewheelMixin):
             messagebox.showerror("Error", str(exc))
             return
         loading = LoadingDialog(self, title="Guardando")
-        loading.set_status("Generando Excel...")
-        loading.set_progress(40)
-        try:
-            output_path = contratacion_incluyente.export_to_excel(clear_cache=False)
-        except Exception as exc:
-            loading.close()
-            messagebox.showerror("Error", str(exc))
-            return
-        loading.set_status("Guardando en Supabase...")
-        loading.set_progress(70)
-        try:
-            contratacion_incluyente.sync_usuarios_reca()
-        except Exception as exc:
-            loading.close()
-            messagebox.showerror("Error", f"No se pudo guardar en Supabase.\n{exc}")
-            return
-        cache = contratacion_incluyente.get_form_cache()
-        section_1 = cache.get("section_1", {})
-        company_name = section_1.get("nombre_empresa")
-        contratacion_incluyente.clear_cache_file()
-        contratacion_incluyente.clear_form_cache()
-        _finalize_export_flow(
+
+        def _done(output_path):
+            cache = contratacion_incluyente.get_form_cache()
+            section_1 = cache.get("section_1", {})
+            company_name = section_1.get("nombre_empresa")
+            contratacion_incluyente.clear_cache_file()
+            contratacion_incluyente.clear_form_cache()
+            _finalize_export_flow(
+                self,
+                loading,
+                output_path,
+                "Contratacion Incluyente",
+                company_name,
+                "contratacion_incluyente",
+            )
+            _return_to_hub(self)
+            self.destroy()
+
+        _run_export_job(
             self,
             loading,
-            output_path,
-            "Contratacion Incluyente",
-            company_name,
-            "contratacion_incluyente",
+            lambda progress: contratacion_incluyente.export_to_excel(
+                clear_cache=False,
+                progress_callback=progress,
+            ),
+            _done,
+            sync=contratacion_incluyente.sync_usuarios_reca,
+            sections=contratacion_incluyente.EXPORT_SECTIONS,
         )
-        _return_to_hub(self)
-        self.destroy()
 
     def _build_search(self, parent):
         _section1_build_search(self, parent)
@@ -8890,54 +9665,7 @@ class ContratacionIncluyenteWindow(tk.Toplevel, FormMousewheelMixin):
         entry.configure(state="readonly")
 
     def _search_company(self, mode="nit"):
-        nit = self.fields["nit_empresa"].get().strip()
-        nombre = self.fields.get("nombre_busqueda").get().strip() if self.fields.get("nombre_busqueda") else ""
-        if mode == "nit":
-            if not nit:
-                messagebox.showerror("Error", "Ingresa un NIT.")
-                return
-        elif mode == "nombre":
-            if not nombre:
-                messagebox.showerror("Error", "Ingresa el nombre de la empresa.")
-                return
-        else:
-            messagebox.showerror("Error", "Tipo de búsqueda no válido.")
-            return
-
-        try:
-            self.status_label.config(text="Buscando empresa...")
-            self.update_idletasks()
-            if mode == "nombre":
-                company = contratacion_incluyente.get_empresa_by_nombre(nombre)
-            else:
-                company = contratacion_incluyente.get_empresa_by_nit(nit)
-        except Exception as exc:
-            self.status_label.config(text="")
-            messagebox.showerror("Error", str(exc))
-            return
-
-        if not company:
-            self.company_data = None
-            msg = "No se encontró empresa para ese nombre." if mode == "nombre" else "No se encontró empresa para ese NIT."
-            self.status_label.config(text=msg)
-            self.continue_btn.config(state="disabled")
-            for key in contratacion_incluyente.SECTION_1_SUPABASE_MAP.keys():
-                self._set_readonly_value(key, "")
-            return
-
-        if mode == "nombre":
-            nit_value = company.get("nit_empresa")
-            if nit_value:
-                entry = self.fields.get("nit_empresa")
-                if entry:
-                    entry.delete(0, tk.END)
-                    entry.insert(0, nit_value)
-
-        self.company_data = company
-        self.status_label.config(text="Empresa encontrada.")
-        self.continue_btn.config(state="normal")
-        for key in contratacion_incluyente.SECTION_1_SUPABASE_MAP.keys():
-            self._set_readonly_value(key, company.get(key))
+        _section1_search_company(self, mode, contratacion_incluyente)
 
     def _confirm_and_continue(self):
         if not self.company_data:
@@ -9195,6 +9923,8 @@ class InduccionOrganizacionalWindow(tk.Toplevel, FormMousewheelMixin):
         def _add_vinculado():
             _create_vinculado_block(len(self.vinculado_blocks))
 
+        _register_row_adder(self, "vinculado_blocks", _add_vinculado)
+
         _create_vinculado_block(0)
         cached_rows = induccion_organizacional.get_form_cache().get("section_2", [])
         for idx, row_data in enumerate(cached_rows):
@@ -9458,6 +10188,8 @@ class InduccionOrganizacionalWindow(tk.Toplevel, FormMousewheelMixin):
                 cargo_entry.insert(0, cargo)
             self.section6_rows.append((row, nombre_entry, cargo_entry))
 
+        _register_row_adder(self, "section6_rows", _add_row)
+
         def _remove_last():
             if len(self.section6_rows) <= 1:
                 return
@@ -9480,20 +10212,10 @@ class InduccionOrganizacionalWindow(tk.Toplevel, FormMousewheelMixin):
         ttk.Button(actions, text="Finalizar", command=self._confirm_section_6).pack(side="right")
 
     def _load_cedula_options(self):
-        try:
-            self.cedula_options = induccion_organizacional.get_usuarios_reca_cedulas()
-        except Exception:
-            self.cedula_options = []
+        self.cedula_options = _load_cedula_suggestions()
 
     def _filter_cedula_values(self, widget):
-        raw = widget.get()
-        normalized = re.sub(r"\D+", "", raw)
-        options = self.cedula_options or []
-        if normalized:
-            filtered = [c for c in options if c and normalized in c]
-        else:
-            filtered = options
-        widget.configure(values=filtered)
+        _filter_cedula_combobox(widget)
 
     def _build_search(self, parent):
         _section1_build_search(self, parent)
@@ -9555,60 +10277,7 @@ class InduccionOrganizacionalWindow(tk.Toplevel, FormMousewheelMixin):
         entry.configure(state="readonly")
 
     def _search_company(self, mode="nit"):
-        nit = self.fields["nit_empresa"].get().strip()
-        nombre = (
-            self.fields.get("nombre_busqueda").get().strip()
-            if self.fields.get("nombre_busqueda")
-            else ""
-        )
-        if mode == "nit":
-            if not nit:
-                messagebox.showerror("Error", "Ingresa un NIT.")
-                return
-        elif mode == "nombre":
-            if not nombre:
-                messagebox.showerror("Error", "Ingresa el nombre de la empresa.")
-                return
-        else:
-            messagebox.showerror("Error", "Tipo de búsqueda no válido.")
-            return
-
-        try:
-            self.status_label.config(text="Buscando empresa...")
-            self.update_idletasks()
-            if mode == "nombre":
-                company = induccion_organizacional.get_empresa_by_nombre(nombre)
-            else:
-                company = induccion_organizacional.get_empresa_by_nit(nit)
-        except Exception as exc:
-            self.status_label.config(text="")
-            messagebox.showerror("Error", str(exc))
-            return
-
-        if not company:
-            self.company_data = None
-            msg = (
-                "No se encontró empresa para ese nombre."
-                if mode == "nombre"
-                else "No se encontró empresa para ese NIT."
-            )
-            self.status_label.config(text=msg)
-            for key in induccion_organizacional.SECTION_1_SUPABASE_MAP.keys():
-                self._set_readonly_value(key, "")
-            return
-
-        if mode == "nombre":
-            nit_value = company.get("nit_empresa")
-            if nit_value:
-                entry = self.fields.get("nit_empresa")
-                if entry:
-                    entry.delete(0, tk.END)
-                    entry.insert(0, nit_value)
-
-        self.company_data = company
-        self.status_label.config(text="Empresa encontrada.")
-        for key in induccion_organizacional.SECTION_1_SUPABASE_MAP.keys():
-            self._set_readonly_value(key, company.get(key))
+        _section1_search_company(self, mode, induccion_organizacional)
 
     def _prefill_section_1(self):
         cache = induccion_organizacional.get_form_cache().get("section_1", {})
@@ -9751,28 +10420,29 @@ class InduccionOrganizacionalWindow(tk.Toplevel, FormMousewheelMixin):
 
     def _export_form(self):
         loading = LoadingDialog(self, title="Guardando")
-        loading.set_status("Exportando Excel...")
-        loading.set_progress(35)
-        try:
-            output_path = induccion_organizacional.export_to_excel(clear_cache=False)
-        except Exception as exc:
-            loading.close()
-            messagebox.showerror("Error", str(exc))
-            return
 
-        cache_snapshot = induccion_organizacional.get_form_cache()
-        section_1 = cache_snapshot.get("section_1", {})
-        company_name = section_1.get("nombre_empresa")
-        _finalize_export_flow(
+        def _done(output_path):
+            cache_snapshot = induccion_organizacional.get_form_cache()
+            section_1 = cache_snapshot.get("section_1", {})
+            company_name = section_1.get("nombre_empresa")
+            _finalize_export_flow(
+                self,
+                loading,
+                output_path,
+                "Induccion Organizacional",
+                company_name,
+                "induccion_organizacional",
+            )
+            _return_to_hub(self)
+            self.destroy()
+
+        _run_export_job(
             self,
             loading,
-            output_path,
-            "Induccion Organizacional",
-            company_name,
-            "induccion_organizacional",
+            lambda progress: induccion_organizacional.export_to_excel(clear_cache=False, progress_callback=progress),
+            _done,
+            sections=induccion_organizacional.EXPORT_SECTIONS,
         )
-        _return_to_hub(self)
-        self.destroy()
 
     def _close_to_hub(self):
         _return_to_hub(self)
@@ -9910,60 +10580,7 @@ class InduccionOperativaWindow(tk.Toplevel, FormMousewheelMixin):
         entry.configure(state="readonly")
 
     def _search_company(self, mode="nit"):
-        nit = self.fields["nit_empresa"].get().strip()
-        nombre = (
-            self.fields.get("nombre_busqueda").get().strip()
-            if self.fields.get("nombre_busqueda")
-            else ""
-        )
-        if mode == "nit":
-            if not nit:
-                messagebox.showerror("Error", "Ingresa un NIT.")
-                return
-        elif mode == "nombre":
-            if not nombre:
-                messagebox.showerror("Error", "Ingresa el nombre de la empresa.")
-                return
-        else:
-            messagebox.showerror("Error", "Tipo de búsqueda no válido.")
-            return
-
-        try:
-            self.status_label.config(text="Buscando empresa...")
-            self.update_idletasks()
-            if mode == "nombre":
-                company = induccion_operativa.get_empresa_by_nombre(nombre)
-            else:
-                company = induccion_operativa.get_empresa_by_nit(nit)
-        except Exception as exc:
-            self.status_label.config(text="")
-            messagebox.showerror("Error", str(exc))
-            return
-
-        if not company:
-            self.company_data = None
-            msg = (
-                "No se encontró empresa para ese nombre."
-                if mode == "nombre"
-                else "No se encontró empresa para ese NIT."
-            )
-            self.status_label.config(text=msg)
-            for key in induccion_operativa.SECTION_1_SUPABASE_MAP.keys():
-                self._set_readonly_value(key, "")
-            return
-
-        if mode == "nombre":
-            nit_value = company.get("nit_empresa")
-            if nit_value:
-                entry = self.fields.get("nit_empresa")
-                if entry:
-                    entry.delete(0, tk.END)
-                    entry.insert(0, nit_value)
-
-        self.company_data = company
-        self.status_label.config(text="Empresa encontrada.")
-        for key in induccion_operativa.SECTION_1_SUPABASE_MAP.keys():
-            self._set_readonly_value(key, company.get(key))
+        _section1_search_company(self, mode, induccion_operativa)
 
     def _prefill_section_1(self):
         cache = induccion_operativa.get_form_cache().get("section_1", {})
@@ -10007,20 +10624,10 @@ class InduccionOperativaWindow(tk.Toplevel, FormMousewheelMixin):
         ttk.Button(actions, text="Continuar", command=self._confirm_and_continue).pack(side="right")
 
     def _load_cedula_options(self):
-        try:
-            self.cedula_options = induccion_operativa.get_usuarios_reca_cedulas()
-        except Exception:
-            self.cedula_options = []
+        self.cedula_options = _load_cedula_suggestions()
 
     def _filter_cedula_values(self, widget):
-        raw = widget.get()
-        normalized = re.sub(r"\D+", "", raw)
-        options = self.cedula_options or []
-        if normalized:
-            filtered = [c for c in options if c and normalized in c]
-        else:
-            filtered = options
-        widget.configure(values=filtered)
+        _filter_cedula_combobox(widget)
 
     def _show_section_2(self):
         self._clear_section_container()
@@ -10122,6 +10729,8 @@ class InduccionOperativaWindow(tk.Toplevel, FormMousewheelMixin):
         def _add_vinculado():
             _create_vinculado_block(len(self.vinculado_blocks))
 
+        _register_row_adder(self, "vinculado_blocks", _add_vinculado)
+
         def _remove_last_vinculado():
             if len(self.vinculado_blocks) <= 1:
                 return
@@ -10502,6 +11111,8 @@ class InduccionOperativaWindow(tk.Toplevel, FormMousewheelMixin):
                 cargo_entry.insert(0, cargo)
             self.section9_rows.append((row, nombre_entry, cargo_entry))
 
+        _register_row_adder(self, "section9_rows", _add_row)
+
         def _remove_last():
             if len(self.section9_rows) <= 1:
                 return
@@ -10668,28 +11279,29 @@ class InduccionOperativaWindow(tk.Toplevel, FormMousewheelMixin):
 
     def _export_form(self):
         loading = LoadingDialog(self, title="Guardando")
-        loading.set_status("Exportando Excel...")
-        loading.set_progress(35)
-        try:
-            output_path = induccion_operativa.export_to_excel(clear_cache=False)
-        except Exception as exc:
-            loading.close()
-            messagebox.showerror("Error", str(exc))
-            return
 
-        cache_snapshot = induccion_operativa.get_form_cache()
-        section_1 = cache_snapshot.get("section_1", {})
-        company_name = section_1.get("nombre_empresa")
-        _finalize_export_flow(
+        def _done(output_path):
+            cache_snapshot = induccion_operativa.get_form_cache()
+            section_1 = cache_snapshot.get("section_1", {})
+            company_name = section_1.get("nombre_empresa")
+            _finalize_export_flow(
+                self,
+                loading,
+                output_path,
+                "Induccion Operativa",
+                company_name,
+                "induccion_operativa",
+            )
+            _return_to_hub(self)
+            self.destroy()
+
+        _run_export_job(
             self,
             loading,
-            output_path,
-            "Induccion Operativa",
-            company_name,
-            "induccion_operativa",
+            lambda progress: induccion_operativa.export_to_excel(clear_cache=False, progress_callback=progress),
+            _done,
+            sections=induccion_operativa.EXPORT_SECTIONS,
         )
-        _return_to_hub(self)
-        self.destroy()
 
     def _close_to_hub(self):
         _return_to_hub(self)
@@ -10813,51 +11425,7 @@ class SensibilizacionWindow(tk.Toplevel, FormMousewheelMixin):
         entry.configure(state="readonly")
 
     def _search_company(self, mode="nit"):
-        nit = self.fields["nit_empresa"].get().strip()
-        nombre = self.fields.get("nombre_busqueda").get().strip() if self.fields.get("nombre_busqueda") else ""
-        if mode == "nit":
-            if not nit:
-                messagebox.showerror("Error", "Ingresa un NIT.")
-                return
-        elif mode == "nombre":
-            if not nombre:
-                messagebox.showerror("Error", "Ingresa el nombre de la empresa.")
-                return
-        else:
-            messagebox.showerror("Error", "Tipo de búsqueda no válido.")
-            return
-        try:
-            self.status_label.config(text="Buscando empresa...")
-            self.update_idletasks()
-            if mode == "nombre":
-                company = sensibilizacion.get_empresa_by_nombre(nombre)
-            else:
-                company = sensibilizacion.get_empresa_by_nit(nit)
-        except Exception as exc:
-            self.status_label.config(text="")
-            messagebox.showerror("Error", str(exc))
-            return
-
-        if not company:
-            self.company_data = None
-            msg = "No se encontró empresa para ese nombre." if mode == "nombre" else "No se encontró empresa para ese NIT."
-            self.status_label.config(text=msg)
-            for key in sensibilizacion.SECTION_1_SUPABASE_MAP.keys():
-                self._set_readonly_value(key, "")
-            return
-
-        if mode == "nombre":
-            nit_value = company.get("nit_empresa")
-            if nit_value:
-                entry = self.fields.get("nit_empresa")
-                if entry:
-                    entry.delete(0, tk.END)
-                    entry.insert(0, nit_value)
-
-        self.company_data = company
-        self.status_label.config(text="Empresa encontrada.")
-        for key in sensibilizacion.SECTION_1_SUPABASE_MAP.keys():
-            self._set_readonly_value(key, company.get(key))
+        _section1_search_company(self, mode, sensibilizacion)
 
     def _prefill_section_1(self):
         cache = sensibilizacion.get_form_cache().get("section_1", {})
@@ -11013,6 +11581,8 @@ class SensibilizacionWindow(tk.Toplevel, FormMousewheelMixin):
                 cargo_entry.insert(0, cargo)
             self.section5_rows.append((row, nombre_entry, cargo_entry))
 
+        _register_row_adder(self, "section5_rows", _add_row)
+
         def _remove_last():
             if len(self.section5_rows) <= 1:
                 return
@@ -11100,28 +11670,29 @@ class SensibilizacionWindow(tk.Toplevel, FormMousewheelMixin):
 
     def _export_form(self):
         loading = LoadingDialog(self, title="Guardando")
-        loading.set_status("Exportando Excel...")
-        loading.set_progress(35)
-        try:
-            output_path = sensibilizacion.export_to_excel(clear_cache=False)
-        except Exception as exc:
-            loading.close()
-            messagebox.showerror("Error", str(exc))
-            return
 
-        cache_snapshot = sensibilizacion.get_form_cache()
-        section_1 = cache_snapshot.get("section_1", {})
-        company_name = section_1.get("nombre_empresa")
-        _finalize_export_flow(
+        def _done(output_path):
+            cache_snapshot = sensibilizacion.get_form_cache()
+            section_1 = cache_snapshot.get("section_1", {})
+            company_name = section_1.get("nombre_empresa")
+            _finalize_export_flow(
+                self,
+                loading,
+                output_path,
+                "Sensibilizacion",
+                company_name,
+                "sensibilizacion",
+            )
+            _return_to_hub(self)
+            self.destroy()
+
+        _run_export_job(
             self,
             loading,
-            output_path,
-            "Sensibilizacion",
-            company_name,
-            "sensibilizacion",
+            lambda progress: sensibilizacion.export_to_excel(clear_cache=False, progress_callback=progress),
+            _done,
+            sections=sensibilizacion.EXPORT_SECTIONS,
         )
-        _return_to_hub(self)
-        self.destroy()
 
     def _close_to_hub(self):
         _return_to_hub(self)
@@ -11153,6 +11724,8 @@ class SeguimientosWindow(tk.Toplevel, FormMousewheelMixin):
         self._build_header()
         self._build_body()
         self._load_cedulas()
+        # Retoma las copias al compartido que quedaron pendientes (red caida, app cerrada).
+        seguimientos.resume_case_replication()
 
     def _build_header(self):
         header = tk.Frame(self, bg=COLOR_LIGHT_BG)
@@ -11260,6 +11833,9 @@ class SeguimientosWindow(tk.Toplevel, FormMousewheelMixin):
         _pack_actions(actions, pad_y=(14, FORM_PADY), pad_x=False)
 
         ttk.Button(actions, text="Regresar", command=self._close_to_hub).pack(side="left")
+        ttk.Button(actions, text="Tablero de casos", command=self._open_portfolio).pack(
+            side="left", padx=(8, 0)
+        )
         self.create_btn = ttk.Button(
             actions,
             text="Crear / Actualizar Caso",
@@ -11302,19 +11878,14 @@ class SeguimientosWindow(tk.Toplevel, FormMousewheelMixin):
 
     def _load_cedulas(self):
         try:
-            self.cedula_options = seguimientos.get_usuarios_reca_cedulas()
+            self.cedula_options = get_cedula_catalog().search("", limit=CEDULA_SUGGESTIONS_LIMIT)
             self._filtered_cedulas = list(self.cedula_options)
             self.cedula_combo["values"] = self._filtered_cedulas
         except Exception as exc:
             self.status_var.set(f"No se pudieron cargar cédulas desde Supabase: {exc}")
 
     def _filter_cedulas(self, _event=None):
-        raw = self.cedula_combo.get().strip()
-        if not raw:
-            self._filtered_cedulas = list(self.cedula_options)
-        else:
-            self._filtered_cedulas = [c for c in self.cedula_options if raw in str(c)]
-        self.cedula_combo["values"] = self._filtered_cedulas[:50]
+        self._filtered_cedulas = _filter_cedula_combobox(self.cedula_combo)
 
     def _buscar_vinculado(self):
         cedula = self.cedula_combo.get().strip()
@@ -11359,6 +11930,17 @@ class SeguimientosWindow(tk.Toplevel, FormMousewheelMixin):
         sheet = suggestion.get("sheet") or ""
         msg = suggestion.get("message") or ""
         self.suggestion_var.set(f"{sheet} - {msg}")
+        conflicts = seguimientos.get_case_conflicts(self.case_path)
+        if conflicts:
+            conflict_copy = conflicts[-1]["conflict_copy"]
+            conflict_name = os.path.join(
+                os.path.basename(os.path.dirname(conflict_copy)), os.path.basename(conflict_copy)
+            )
+            self.status_var.set(
+                "Archivo encontrado. Hubo cambios simultaneos en la carpeta compartida "
+                f"(copia: {conflict_name}); abre el diligenciamiento para resolverlo."
+            )
+            return
         self.status_var.set("Archivo encontrado y estado calculado correctamente.")
 
     def _crear_o_actualizar_caso(self):
@@ -11388,6 +11970,159 @@ class SeguimientosWindow(tk.Toplevel, FormMousewheelMixin):
         )
         self._refresh_suggestion()
 
+    def _open_portfolio(self):
+        modal = tk.Toplevel(self)
+        modal.title("Tablero de seguimientos")
+        modal.configure(bg=COLOR_LIGHT_BG)
+        modal.geometry("1100x640")
+        modal.transient(self)
+
+        frame = tk.Frame(modal, bg=COLOR_LIGHT_BG, padx=14, pady=12)
+        frame.pack(fill="both", expand=True)
+        tk.Label(
+            frame,
+            text="Avance de casos por profesional y empresa",
+            font=("Arial", 12, "bold"),
+            fg=COLOR_PURPLE,
+            bg=COLOR_LIGHT_BG,
+        ).pack(anchor="w", pady=(0, 8))
+        status_var = tk.StringVar(value="Revisando casos...")
+        tk.Label(frame, textvariable=status_var, font=FONT_LABEL, bg=COLOR_LIGHT_BG).pack(
+            anchor="w", pady=(0, 6)
+        )
+
+        def _make_tree(parent, columns, height):
+            box = tk.Frame(parent, bg="white", bd=1, relief="solid")
+            box.pack(fill="both", expand=True, pady=(0, 8))
+            yscroll = tk.Scrollbar(box, orient="vertical")
+            yscroll.pack(side="right", fill="y")
+            tree = ttk.Treeview(
+                box,
+                columns=[key for key, _label, _width in columns],
+                show="headings",
+                height=height,
+                yscrollcommand=yscroll.set,
+            )
+            for key, label, width in columns:
+                tree.heading(key, text=label)
+                tree.column(key, width=width, anchor="w")
+            tree.pack(side="left", fill="both", expand=True)
+            yscroll.config(command=tree.yview)
+            return tree
+
+        groups_tree = _make_tree(
+            frame,
+            [
+                ("profesional", "Profesional", 200),
+                ("empresa", "Empresa", 300),
+                ("paso", "Siguiente paso", 150),
+                ("casos", "Casos", 70),
+                ("base", "Base completa", 110),
+                ("seguimientos", "Seguimientos", 120),
+            ],
+            12,
+        )
+        cases_tree = _make_tree(
+            frame,
+            [
+                ("cedula", "Cédula", 120),
+                ("nombre", "Vinculado", 260),
+                ("base", "Base", 70),
+                ("seguimientos", "Seguimientos", 110),
+                ("paso", "Siguiente paso", 150),
+                ("carpeta", "Carpeta", 320),
+            ],
+            8,
+        )
+
+        state = {"rows": [], "groups": {}}
+
+        def _render(rows):
+            state["rows"] = rows
+            state["groups"] = {}
+            groups_tree.delete(*groups_tree.get_children())
+            cases_tree.delete(*cases_tree.get_children())
+            for idx, group in enumerate(seguimientos_portfolio.aggregate_portfolio(rows)):
+                iid = f"group_{idx}"
+                state["groups"][iid] = (group["profesional"], group["empresa"], group["siguiente_paso"])
+                groups_tree.insert(
+                    "",
+                    "end",
+                    iid=iid,
+                    values=(
+                        group["profesional"],
+                        group["empresa"],
+                        group["siguiente_paso"],
+                        group["casos"],
+                        f"{group['base_completa']}/{group['casos']}",
+                        f"{group['seguimientos_completados']}/{group['seguimientos_posibles']}",
+                    ),
+                )
+            errors = sum(1 for row in rows if row.get("error"))
+            status_var.set(
+                f"{len(rows)} casos revisados."
+                + (f" {errors} no se pudieron leer." if errors else "")
+                + " Selecciona un grupo para ver sus casos."
+            )
+
+        def _show_group(_event=None):
+            key = state["groups"].get(groups_tree.focus())
+            cases_tree.delete(*cases_tree.get_children())
+            if key is None:
+                return
+            for idx, row in enumerate(r for r in state["rows"] if seguimientos_portfolio.group_key(r) == key):
+                if row.get("error"):
+                    values = ("-", row["error"], "-", "-", "-", row["carpeta"])
+                else:
+                    values = (
+                        row["cedula"],
+                        row["nombre_usuario"],
+                        "Si" if row["base_completa"] else "No",
+                        f"{row['seguimientos_completados']}/{row['max_seguimientos']}",
+                        row["siguiente_paso"],
+                        row["carpeta"],
+                    )
+                cases_tree.insert("", "end", iid=f"case_{idx}", values=values)
+
+        def _progress(done, total):
+            if total:
+                modal.after(0, lambda: status_var.set(f"Leyendo libros modificados: {done}/{total}..."))
+
+        def _scan():
+            refresh_btn.config(state="disabled")
+            status_var.set("Revisando casos...")
+
+            def _worker():
+                try:
+                    rows = seguimientos_portfolio.scan_portfolio(progress_callback=_progress)
+                except Exception as exc:
+                    error = exc
+
+                    def _fail():
+                        if modal.winfo_exists():
+                            refresh_btn.config(state="normal")
+                            status_var.set(f"No fue posible revisar los casos: {error}")
+
+                    modal.after(0, _fail)
+                    return
+
+                def _done():
+                    if modal.winfo_exists():
+                        refresh_btn.config(state="normal")
+                        _render(rows)
+
+                modal.after(0, _done)
+
+            threading.Thread(target=_worker, daemon=True).start()
+
+        actions = tk.Frame(frame, bg=COLOR_LIGHT_BG)
+        actions.pack(fill="x")
+        ttk.Button(actions, text="Cerrar", command=modal.destroy).pack(side="right")
+        refresh_btn = ttk.Button(actions, text="Actualizar", command=_scan)
+        refresh_btn.pack(side="right", padx=(0, 8))
+        groups_tree.bind("<<TreeviewSelect>>", _show_group)
+        _scan()
+
     def _abrir_archivo(self):
         if not self.case_path or not os.path.exists(self.case_path):
             messagebox.showerror("Error", "No hay archivo para abrir.")
@@ -11419,12 +12154,14 @@ class SeguimientoEditorWindow(tk.Toplevel, FormMousewheelMixin):
         self.geometry("1200x820")
         _maximize_window(self)
 
-        self.meta = seguimientos.get_case_meta(case_path)
+        # Una sola carga del libro para leer y guardar todas las hojas.
+        self.session = seguimientos.get_case_session(case_path)
+        self.meta = seguimientos.get_case_meta(self.session)
         self.max_seg = int(self.meta.get("max_seguimientos") or 3)
         self.sheet_options = [seguimientos.SHEET_BASE] + [
             f"{seguimientos.SHEET_PREFIX}{i}" for i in range(1, self.max_seg + 1)
         ] + [seguimientos.SHEET_FINAL]
-        suggestion = seguimientos.suggest_next_step(case_path)
+        suggestion = seguimientos.suggest_next_step(self.session)
         self.sheet_var = tk.StringVar(value=suggestion.get("sheet") or self.sheet_options[0])
         if self.sheet_var.get() not in self.sheet_options:
             self.sheet_var.set(self.sheet_options[0])
@@ -11437,6 +12174,7 @@ class SeguimientoEditorWindow(tk.Toplevel, FormMousewheelMixin):
         self.base_dates_1 = []
         self.base_dates_2 = []
         self.company_name_combo = None
+        self._nombre_autocomplete = None
 
         self.follow_vars = {}
         self.follow_text = {}
@@ -11451,6 +12189,50 @@ class SeguimientoEditorWindow(tk.Toplevel, FormMousewheelMixin):
         self._build_controls()
         self._build_scroller()
         self._render_selected_sheet()
+        # La replicacion detecta conflictos en segundo plano; se revisan mientras el editor este abierto.
+        self._conflict_deferred = False
+        self.after(CASE_CONFLICT_POLL_MS, self._poll_case_conflict)
+
+    def _poll_case_conflict(self):
+        try:
+            if not self.winfo_exists():
+                return
+        except tk.TclError:
+            return
+        if not self._conflict_deferred:
+            conflicts = seguimientos.get_case_conflicts(self.case_path)
+            if conflicts:
+                self._prompt_case_conflict(conflicts[-1])
+        self.after(CASE_CONFLICT_POLL_MS, self._poll_case_conflict)
+
+    def _prompt_case_conflict(self, conflict):
+        copy_name = os.path.basename(conflict.get("conflict_copy") or "")
+        answer = messagebox.askyesnocancel(
+            "Conflicto en el caso",
+            "Otra persona modificó este caso en la carpeta compartida mientras lo editabas. "
+            f"Tu versión quedó en la carpeta Conflictos ({copy_name}) y no se replica hasta resolverlo.\n\n"
+            "Sí: conservar tu versión y reemplazar la compartida.\n"
+            "No: descartar tu versión y cargar la compartida.\n"
+            "Cancelar: decidir después.",
+            parent=self,
+        )
+        if answer is None:
+            self._conflict_deferred = True
+            self.status_var.set("Conflicto pendiente: tus cambios no se replican hasta resolverlo.")
+            return
+        try:
+            seguimientos.resolve_case_conflict(self.case_path, keep_local=answer)
+        except OSError as exc:
+            messagebox.showerror("Error", f"No se pudo resolver el conflicto.\n{exc}", parent=self)
+            return
+        if answer:
+            self.status_var.set("Se conservó tu versión; reemplazará la copia compartida.")
+        else:
+            self.session = seguimientos.get_case_session(self.case_path)
+            self._render_selected_sheet()
+            self.status_var.set("Se cargó la versión compartida del caso.")
+        if isinstance(self.owner, SeguimientosWindow):
+            self.owner._refresh_suggestion()
 
     def _build_header(self):
         header = tk.Frame(self, bg=COLOR_LIGHT_BG)
@@ -11583,13 +12365,14 @@ class SeguimientoEditorWindow(tk.Toplevel, FormMousewheelMixin):
             if self.base_vars.get("nombre_empresa")
             else ""
         )
-        if len(prefix) < 2:
-            combo["values"] = ()
-            return
-        try:
-            rows = seguimientos.get_empresas_by_nombre_prefix(prefix, limit=12)
-        except Exception:
-            rows = []
+        controller = self._nombre_autocomplete
+        if controller is None or controller.widget is not combo:
+            controller = AsyncAutocomplete(combo, self._fetch_empresa_nombre_suggestions, limit=12)
+            self._nombre_autocomplete = controller
+        controller.update(prefix)
+
+    def _fetch_empresa_nombre_suggestions(self, prefix, limit):
+        rows = seguimientos.get_empresas_by_nombre_prefix(prefix, limit=limit) or []
         values = []
         seen = set()
         for row in rows:
@@ -11601,7 +12384,8 @@ class SeguimientoEditorWindow(tk.Toplevel, FormMousewheelMixin):
                 continue
             seen.add(key)
             values.append(name)
-        combo["values"] = values
+        # Truncado segun las filas del servidor, no los nombres sin repetir.
+        return values, len(rows) >= limit
 
     def _search_selected_or_typed_company_name(self, _event=None):
         combo = self.company_name_combo
@@ -11639,7 +12423,7 @@ class SeguimientoEditorWindow(tk.Toplevel, FormMousewheelMixin):
         self.canvas.yview_moveto(0)
 
     def _render_sheet_base(self):
-        payload = seguimientos.get_base_payload(self.case_path)
+        payload = seguimientos.get_base_payload(self.session)
         self.base_vars = {
             k: tk.StringVar(value=str(payload.get(k, "")))
             for k in [
@@ -11872,7 +12656,7 @@ class SeguimientoEditorWindow(tk.Toplevel, FormMousewheelMixin):
         self.status_var.set("Editando hoja base.")
 
     def _render_sheet_followup(self, idx):
-        payload = seguimientos.get_followup_payload(self.case_path, idx)
+        payload = seguimientos.get_followup_payload(self.session, idx)
         self.follow_vars = {
             "modalidad": tk.StringVar(value=str(payload.get("modalidad") or "")),
             "seguimiento_numero": tk.StringVar(value=str(payload.get("seguimiento_numero") or idx)),
@@ -12162,21 +12946,24 @@ class SeguimientoEditorWindow(tk.Toplevel, FormMousewheelMixin):
         try:
             if sheet == seguimientos.SHEET_BASE:
                 payload = self._collect_base_payload()
-                seguimientos.save_base_payload(self.case_path, payload)
+                seguimientos.save_base_payload(self.session, payload)
             elif sheet.startswith(seguimientos.SHEET_PREFIX):
                 idx = int(re.search(r"(\d+)$", sheet).group(1))
                 payload = self._collect_followup_payload(idx)
-                seguimientos.save_followup_payload(self.case_path, idx, payload)
+                seguimientos.save_followup_payload(self.session, idx, payload)
             else:
                 messagebox.showinfo("Ponderado final", "Esta hoja no se diligencia manualmente.")
                 return
         except PermissionError:
+            # El payload se vuelve a tomar del formulario al reintentar.
+            self.session.discard()
             messagebox.showerror(
                 "Archivo en uso",
                 "No se pudo guardar porque el Excel está abierto en otra aplicación.",
             )
             return
         except Exception as exc:
+            self.session.discard()
             messagebox.showerror("Error", str(exc))
             return
         self.status_var.set(f"Guardado exitoso en hoja: {sheet}")
@@ -12193,6 +12980,9 @@ class SeguimientoEditorWindow(tk.Toplevel, FormMousewheelMixin):
 
 
 if __name__ == "__main__":
+    # El tablero de seguimientos usa un pool de procesos; en el ejecutable
+    # empaquetado los procesos hijos arrancan por aqui.
+    multiprocessing.freeze_support()
     app = HubWindow()
     app.mainloop()
 
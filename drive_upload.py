@@ -1,7 +1,8 @@
 import json
 import os
 import re
-import time
+
+from formularios.export_log import get_log
 
 
 DEFAULT_FOLDER_ID = "1zbuUkpHPEDfNuLN-tPQax-3ua26oxjjA"
@@ -85,33 +86,20 @@ def _load_config():
         return {}
 
 
+_DRIVE_LOG = get_log("drive_log.txt")
+
+
 def _get_log_dir(base_path=None):
     if base_path and os.path.exists(base_path):
         base_dir = os.path.dirname(base_path)
     else:
         base_dir = os.getcwd()
     log_dir = os.path.join(base_dir, "logs")
-    os.makedirs(log_dir, exist_ok=True)
     return log_dir
 
 
 def _log_drive(message, base_path=None):
-    try:
-        log_dir = _get_log_dir(base_path)
-        log_path = os.path.join(log_dir, "drive_log.txt")
-        if os.path.exists(log_path):
-            try:
-                if os.path.getsize(log_path) >= 5 * 1024 * 1024:
-                    with open(log_path, "w", encoding="utf-8") as log_file:
-                        log_file.write("")
-            except OSError:
-                with open(log_path, "w", encoding="utf-8") as log_file:
-                    log_file.write("")
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        with open(log_path, "a", encoding="utf-8") as log_file:
-            log_file.write(f"[{timestamp}] {message}\n")
-    except OSError:
-        return
+    _DRIVE_LOG.log(message, _get_log_dir(base_path))
 
 
 def upload_excel_to_drive(excel_path, base_name=None, professional_name=None):
@@ -0,0 +1,242 @@
+import bisect
+import threading
+import time
+
+from formularios.common import _normalize_cedula, _supabase_get, _supabase_get_paged
+
+
+CATALOG_TABLE = "usuarios_reca"
+CATALOG_REFRESH_SECONDS = 10 * 60
+# El refresco incremental solo ve cedulas nuevas (created_at); cada tanto se
+# descarga todo para reflejar cedulas corregidas o borradas.
+CATALOG_FULL_REFRESH_SECONDS = 6 * 60 * 60
+DEFAULT_SUGGESTIONS_LIMIT = 50
+NGRAM_SIZE = 3
+
+_CATALOG = None
+_CATALOG_LOCK = threading.Lock()
+
+
+class CedulaCatalog:
+    """
+    Catalogo de cedulas de usuarios_reca compartido por todas las ventanas.
+
+    Guarda las cedulas en un arreglo ordenado (prefijos por bisect) y un indice
+    de trigramas para busquedas por subcadena. Se descarga completo con
+    paginacion y luego se refresca de forma incremental.
+    """
+
+    def __init__(self, env_path=".env"):
+        self.env_path = env_path
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._values = []
+        self._positions = {}
+        self._sorted = []
+        self._ngrams = {}
+        self._loaded_at = 0.0
+        self._full_loaded_at = 0.0
+        self._watermark = ""
+        self._supports_created_at = None
+        self._refreshing = False
+
+    @property
+    def loaded(self):
+        return self._loaded_at > 0
+
+    def __len__(self):
+        return len(self._values)
+
+    def values(self):
+        with self._lock:
+            return list(self._sorted)
+
+    def add_cedulas(self, cedulas):
+        """Agrega cedulas nuevas al indice sin volver a descargar el catalogo."""
+        added = 0
+        with self._lock:
+            for raw in cedulas or []:
+                cedula = _normalize_cedula(raw)
+                if not cedula or cedula in self._positions:
+                    continue
+                idx = len(self._values)
+                self._values.append(cedula)
+                self._positions[cedula] = idx
+                bisect.insort(self._sorted, cedula)
+                for gram in _iter_ngrams(cedula):
+                    self._ngrams.setdefault(gram, []).append(idx)
+                added += 1
+        return added
+
+    def _replace_all(self, cedulas):
+        with self._lock:
+            self._values = []
+            self._positions = {}
+            self._sorted = []
+            self._ngrams = {}
+            clean = sorted({_normalize_cedula(c) for c in cedulas or []} - {""})
+            for idx, cedula in enumerate(clean):
+                self._values.append(cedula)
+                self._positions[cedula] = idx
+                for gram in _iter_ngrams(cedula):
+                    self._ngrams.setdefault(gram, []).append(idx)
+            self._sorted = list(clean)
+
+    def _has_created_at(self):
+        if self._supports_created_at is None:
+            try:
+                _supabase_get(CATALOG_TABLE, {"select": "created_at", "limit": 1}, env_path=self.env_path)
+                self._supports_created_at = True
+            except Exception:
+                self._supports_created_at = False
+        return self._supports_created_at
+
+    def _fetch(self, since=""):
+        params = {
+            "select": "cedula_usuario",
+            "cedula_usuario": "not.is.null",
+            "order": "cedula_usuario.asc",
+        }
+        if self._has_created_at():
+            params["select"] = "cedula_usuario,created_at"
+            if since:
+                params["created_at"] = f"gt.{since}"
+        rows = _supabase_get_paged(CATALOG_TABLE, params, env_path=self.env_path)
+        watermark = max((str(row.get("created_at") or "") for row in rows), default="")
+        return [row.get("cedula_usuario") for row in rows if row.get("cedula_usuario")], watermark
+
+    def refresh(self, full=False):
+        """
+        Sincroniza con Supabase. Si la tabla expone created_at solo trae las
+        cedulas nuevas; si no, o si la ultima carga completa supera
+        CATALOG_FULL_REFRESH_SECONDS, vuelve a descargar todo con paginacion.
+        """
+        incremental = (
+            not full
+            and self.loaded
+            and self._watermark
+            and time.time() - self._full_loaded_at < CATALOG_FULL_REFRESH_SECONDS
+            and self._has_created_at()
+        )
+        cedulas, watermark = self._fetch(self._watermark if incremental else "")
+        if incremental:
+            self.add_cedulas(cedulas)
+        else:
+            self._replace_all(cedulas)
+        with self._lock:
+            self._watermark = max(self._watermark, watermark) if incremental else watermark
+            self._loaded_at = time.time()
+            if not incremental:
+                self._full_loaded_at = self._loaded_at
+        return len(self._values)
+
+    def ensure_loaded(self):
+        """
+        Carga sincronica la primera vez; despues solo lanza un refresco en
+        segundo plano cuando el catalogo supera CATALOG_REFRESH_SECONDS.
+        """
+        if not self.loaded:
+            with self._load_lock:
+                if not self.loaded:
+                    self.refresh(full=True)
+            return self
+        if time.time() - self._loaded_at >= CATALOG_REFRESH_SECONDS:
+            self.refresh_async()
+        return self
+
+    def refresh_async(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def _worker():
+            try:
+                self.refresh()
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=_worker, daemon=True).start()
+
+    def search(self, query, limit=DEFAULT_SUGGESTIONS_LIMIT):
+        """
+        Devuelve hasta `limit` cedulas que contienen `query`. Primero las que
+        empiezan por `query` y luego el resto, ambas en orden ascendente.
+        """
+        needle = _normalize_cedula(query)
+        limit = max(1, int(limit or DEFAULT_SUGGESTIONS_LIMIT))
+        with self._lock:
+            if not needle:
+                return self._sorted[:limit]
+
+            start = bisect.bisect_left(self._sorted, needle)
+            prefixed = []
+            for pos in range(start, min(start + limit, len(self._sorted))):
+                cedula = self._sorted[pos]
+                if not cedula.startswith(needle):
+                    break
+                prefixed.append(cedula)
+            if len(prefixed) >= limit:
+                return prefixed
+
+            if len(needle) < NGRAM_SIZE:
+                # Consultas muy cortas: casi todo coincide, basta con recorrer hasta llenar el cupo.
+                others = []
+                for cedula in self._sorted:
+                    if needle in cedula and not cedula.startswith(needle):
+                        others.append(cedula)
+                        if len(prefixed) + len(others) >= limit:
+                            break
+                return prefixed + others
+
+            postings = [self._ngrams.get(gram) for gram in _iter_ngrams(needle)]
+            if not all(postings):
+                return prefixed
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    return prefixed
+            values = self._values
+            others = sorted(
+                values[idx]
+                for idx in candidates
+                if needle in values[idx] and not values[idx].startswith(needle)
+            )
+        return prefixed + others[: limit - len(prefixed)]
+
+
+def _iter_ngrams(text):
+    seen = set()
+    for idx in range(len(text) - NGRAM_SIZE + 1):
+        gram = text[idx : idx + NGRAM_SIZE]
+        if gram in seen:
+            continue
+        seen.add(gram)
+        yield gram
+
+
+def get_cedula_catalog(env_path=".env", load=True):
+    """
+    Devuelve el catalogo unico del proceso. Con load=False no toca la red
+    (util en eventos de teclado si la primera carga fallo).
+    """
+    global _CATALOG
+    if _CATALOG is None:
+        with _CATALOG_LOCK:
+            if _CATALOG is None:
+                _CATALOG = CedulaCatalog(env_path=env_path)
+    if not load:
+        return _CATALOG
+    return _CATALOG.ensure_loaded()
+
+
+def register_cedulas(cedulas):
+    """Agrega al catalogo las cedulas que la app acaba de guardar en usuarios_reca."""
+    if _CATALOG is None:
+        return 0
+    return _CATALOG.add_cedulas(cedulas)
@@ -1,3 +1,4 @@
+import atexit
 import os
 import re
 import time
@@ -351,13 +352,122 @@ def _clear_supabase_get_cache():
             conn.close()
 
 
-def _atomic_write_json(path, payload):
+def _atomic_write_text(path, text):
     tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
     with open(tmp_path, "w", encoding="utf-8") as handle:
-        json.dump(payload, handle, ensure_ascii=False, indent=2)
+        handle.write(text)
     os.replace(tmp_path, path)
 
 
+def _atomic_write_json(path, payload):
+    _atomic_write_text(path, json.dumps(payload, ensure_ascii=False, indent=2))
+
+
+# Escritura diferida de los caches de formulario: cada confirmar solo deja el
+# JSON compacto en memoria y un hilo lo escribe cuando los guardados se calman
+# (CACHE_WRITE_DELAY_SECONDS sin cambios, o CACHE_WRITE_MAX_DELAY_SECONDS
+# desde el primer cambio pendiente). Tambien se escribe al cerrar y al salir.
+CACHE_WRITE_DELAY_SECONDS = 0.5
+CACHE_WRITE_MAX_DELAY_SECONDS = 3.0
+CACHE_WRITE_RETRY_SECONDS = 5.0
+
+_CACHE_WRITES = {}
+_CACHE_WRITES_LOCK = threading.Lock()
+# Solo un hilo escribe o borra caches a la vez, asi un flush o un borrado no
+# se cruzan con una escritura en curso del hilo de fondo.
+_CACHE_WRITES_IO_LOCK = threading.Lock()
+_CACHE_WRITES_WAKE = threading.Event()
+_CACHE_WRITER_STARTED = False
+
+
+def _schedule_cache_write(path, payload):
+    """
+    Encola `payload` para escribirse en `path`. Se serializa aqui (en el hilo
+    que llama) para que cambios posteriores al cache no afecten lo encolado.
+    """
+    text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    now = time.time()
+    with _CACHE_WRITES_LOCK:
+        entry = _CACHE_WRITES.get(path)
+        first = entry["first"] if entry else now
+        _CACHE_WRITES[path] = {
+            "text": text,
+            "first": first,
+            "due": min(now + CACHE_WRITE_DELAY_SECONDS, first + CACHE_WRITE_MAX_DELAY_SECONDS),
+        }
+    _ensure_cache_writer()
+    _CACHE_WRITES_WAKE.set()
+
+
+def _write_cache_entries(paths=None, force=False):
+    """Escribe los caches vencidos (o todos con `force`). Devuelve False si alguno fallo."""
+    ok = True
+    with _CACHE_WRITES_IO_LOCK:
+        with _CACHE_WRITES_LOCK:
+            now = time.time()
+            ready = {
+                path: entry
+                for path, entry in _CACHE_WRITES.items()
+                if (paths is None or path in paths) and (force or entry["due"] <= now)
+            }
+            for path in ready:
+                _CACHE_WRITES.pop(path)
+        for path, entry in ready.items():
+            try:
+                _atomic_write_text(path, entry["text"])
+            except OSError:
+                ok = False
+                with _CACHE_WRITES_LOCK:
+                    # Si ya hay una version mas nueva encolada, esa gana.
+                    if path not in _CACHE_WRITES:
+                        entry["due"] = time.time() + CACHE_WRITE_RETRY_SECONDS
+                        _CACHE_WRITES[path] = entry
+    return ok
+
+
+def _flush_cache_writes(path=None, wait=True):
+    """
+    Escribe ya lo pendiente (solo `path` si se indica). Con `wait=False` solo
+    lo marca como vencido y despierta al hilo, para no bloquear la interfaz.
+    """
+    paths = None if path is None else {path}
+    if wait:
+        return _write_cache_entries(paths, force=True)
+    with _CACHE_WRITES_LOCK:
+        for key, entry in _CACHE_WRITES.items():
+            if paths is None or key in paths:
+                entry["due"] = 0
+    _CACHE_WRITES_WAKE.set()
+    return True
+
+
+def _cancel_cache_write(path):
+    """Descarta lo pendiente para `path` y espera a que no haya una escritura en curso."""
+    with _CACHE_WRITES_IO_LOCK:
+        with _CACHE_WRITES_LOCK:
+            _CACHE_WRITES.pop(path, None)
+
+
+def _cache_writer_loop():
+    while True:
+        with _CACHE_WRITES_LOCK:
+            dues = [entry["due"] for entry in _CACHE_WRITES.values()]
+        timeout = max(0.0, min(dues) - time.time()) if dues else None
+        _CACHE_WRITES_WAKE.wait(timeout)
+        _CACHE_WRITES_WAKE.clear()
+        _write_cache_entries()
+
+
+def _ensure_cache_writer():
+    global _CACHE_WRITER_STARTED
+    with _CACHE_WRITES_LOCK:
+        if _CACHE_WRITER_STARTED:
+            return
+        _CACHE_WRITER_STARTED = True
+    threading.Thread(target=_cache_writer_loop, name="form-cache-writer", daemon=True).start()
+    atexit.register(_flush_cache_writes)
+
+
 def _persist_write_queue_locked():
     path = _get_supabase_queue_path()
     _atomic_write_json(path, _WRITE_QUEUE)
@@ -6,7 +6,22 @@ import shutil
 import unicodedata
 
 from formularios.evaluacion_programa import evaluacion_accesibilidad
-from formularios.common import _get_desktop_dir, _normalize_text, _sanitize_filename
+from formularios.common import (
+    _get_desktop_dir,
+    _normalize_text,
+    _sanitize_filename,
+    _cancel_cache_write,
+    _flush_cache_writes,
+    _schedule_cache_write,
+)
+from formularios.excel_backend import expand_row_block, open_workbook
+from formularios.export_log import get_log
+from formularios.form_records import record_export
+from formularios.template_registry import (
+    bound_sheet,
+    find_anchor_row,
+    get_template_path,
+)
 
 
 FORM_NAME = "Condiciones de Vacante"
@@ -294,7 +309,9 @@ def _get_cache_path():
 
 
 def cache_file_exists():
-    return os.path.exists(_get_cache_path())
+    path = _get_cache_path()
+    _flush_cache_writes(path)
+    return os.path.exists(path)
 
 
 def save_cache_to_file():
@@ -303,12 +320,12 @@ def save_cache_to_file():
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
         "data": FORM_CACHE,
     }
-    with open(_get_cache_path(), "w", encoding="utf-8") as handle:
-        json.dump(payload, handle, ensure_ascii=False, indent=2)
+    _schedule_cache_write(_get_cache_path(), payload)
 
 
 def load_cache_from_file():
     path = _get_cache_path()
+    _flush_cache_writes(path)
     if not os.path.exists(path):
         return False
     with open(path, "r", encoding="utf-8") as handle:
@@ -324,6 +341,7 @@ def load_cache_from_file():
 
 def clear_cache_file():
     path = _get_cache_path()
+    _cancel_cache_write(path)
     if os.path.exists(path):
         os.remove(path)
 
@@ -334,15 +352,10 @@ def clear_form_cache():
 
 
 def _find_template_path():
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-    templates_dir = os.path.join(base_dir, "templates")
-    if not os.path.isdir(templates_dir):
-        raise FileNotFoundError("No existe la carpeta templates.")
-    for name in os.listdir(templates_dir):
-        normalized = _normalize_text(name).replace("_", "")
-        if "revision" in normalized and "condicion" in normalized and normalized.endswith(".xlsx"):
-            return os.path.join(templates_dir, name)
-    raise FileNotFoundError("No se encontró el template de revision de condiciones.")
+    return get_template_path("condiciones_vacante")
+
+
+_EXCEL_LOG = get_log("excel_log.txt")
 
 
 def _get_log_dir():
@@ -352,29 +365,11 @@ def _get_log_dir():
     else:
         base_dir = os.getcwd()
     log_dir = os.path.join(base_dir, "logs")
-    os.makedirs(log_dir, exist_ok=True)
     return log_dir
 
 
 def _log_excel(message):
-    try:
-        log_dir = _get_log_dir()
-        log_path = os.path.join(log_dir, "excel_log.txt")
-        reset_log = False
-        if os.path.exists(log_path):
-            try:
-                if os.path.getsize(log_path) >= 5 * 1024 * 1024:
-                    reset_log = True
-            except OSError:
-                reset_log = True
-        if reset_log:
-            with open(log_path, "w", encoding="utf-8") as log_file:
-                log_file.write("")
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        with open(log_path, "a", encoding="utf-8") as log_file:
-            log_file.write(f"[{timestamp}] {message}\n")
-    except OSError:
-        return
+    _EXCEL_LOG.log(message, _get_log_dir())
 
 
 def _ensure_output_path():
@@ -418,6 +413,9 @@ def _get_sheet_by_name(workbook):
 
 
 def _find_row_by_text(ws, text):
+    row = find_anchor_row(ws, text, prefix_only=('7.', '8.'))
+    if row is not None:
+        return row
     cell = ws.Columns("A").Find(What=text, LookAt=1)
     if cell is not None:
         return cell.Row
@@ -469,8 +467,8 @@ def get_empresa_by_nombre(nombre, env_path=".env"):
     return evaluacion_accesibilidad.get_empresa_by_nombre(nombre, env_path=env_path)
 
 
-def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10):
-    return evaluacion_accesibilidad.get_empresas_by_nombre_prefix(prefix, env_path=env_path, limit=limit)
+def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10, with_truncated=False):
+    return evaluacion_accesibilidad.get_empresas_by_nombre_prefix(prefix, env_path=env_path, limit=limit, with_truncated=with_truncated)
 
 
 def confirm_section_1(company_data, user_inputs):
@@ -1099,12 +1097,7 @@ def _write_section_with_ws(ws, section_id, payload):
         base_rows = mapping["base_rows"]
         total = len(payload or [])
         if total > base_rows:
-            insert_at = start_row + base_rows
-            template_row = start_row + base_rows - 1
-            for _ in range(total - base_rows):
-                ws.Rows(insert_at).Insert()
-                ws.Rows(template_row).Copy(ws.Rows(insert_at))
-                insert_at += 1
+            expand_row_block(ws, start_row + base_rows - 1, 1, start_row + base_rows, total - base_rows)
         for idx, entry in enumerate(payload or []):
             row = start_row + idx
             discapacidad = entry.get("discapacidad", "")
@@ -1138,12 +1131,7 @@ def _write_section_with_ws(ws, section_id, payload):
         base_rows = EXCEL_MAPPING["section_8"].get("rows", 3)
         total = len(payload)
         if total > base_rows:
-            insert_at = start_row + base_rows
-            template_row = start_row + base_rows - 1
-            for _ in range(total - base_rows):
-                ws.Rows(insert_at).Insert()
-                ws.Rows(template_row).Copy(ws.Rows(insert_at))
-                insert_at += 1
+            expand_row_block(ws, start_row + base_rows - 1, 1, start_row + base_rows, total - base_rows)
         for idx, entry in enumerate(payload):
             row = start_row + idx
             nombre = entry.get("nombre", "")
@@ -1186,48 +1174,38 @@ def _write_section_with_ws(ws, section_id, payload):
             ws.Range(cell).Value = value
 
 
-def export_to_excel(progress_callback=None):
+EXPORT_SECTIONS = (
+    "section_1",
+    "section_2",
+    "section_2_1",
+    "section_3",
+    "section_4",
+    "section_5",
+    "section_6",
+    "section_7",
+    "section_8",
+)
+
+
+def export_to_excel(progress_callback=None, backend=None):
     output_path = _ensure_output_path()
     _log_excel(f"START export_all output={output_path}")
     try:
-        import win32com.client as win32
-    except ImportError as exc:
-        _log_excel("ERROR export_all error=pywin32_not_installed")
-        raise RuntimeError("pywin32 no esta instalado. Instala con pip install pywin32.") from exc
-
-    excel = win32.DispatchEx("Excel.Application")
-    excel.Visible = False
-    excel.DisplayAlerts = False
-    wb = None
-    try:
-        wb = excel.Workbooks.Open(output_path)
-        ws = _get_sheet_by_name(wb)
-        section_order = [
-            "section_1",
-            "section_2",
-            "section_2_1",
-            "section_3",
-            "section_4",
-            "section_5",
-            "section_6",
-            "section_7",
-            "section_8",
-        ]
-        for section_id in section_order:
-            payload = FORM_CACHE.get(section_id, {})
-            _log_excel(f"SECTION export_all section={section_id}")
-            if progress_callback:
-                progress_callback(section_id)
-            _write_section_with_ws(ws, section_id, payload)
-        wb.Save()
-        _log_excel("SUCCESS export_all")
+        with open_workbook(output_path, backend=backend) as wb:
+            ws = _get_sheet_by_name(wb)
+            with bound_sheet(ws, "condiciones_vacante"):
+                for section_id in EXPORT_SECTIONS:
+                    payload = FORM_CACHE.get(section_id, {})
+                    _log_excel(f"SECTION export_all section={section_id}")
+                    if progress_callback:
+                        progress_callback(section_id)
+                    _write_section_with_ws(ws, section_id, payload)
+            wb.Save()
+            _log_excel("SUCCESS export_all")
     except Exception as exc:
         _log_excel(f"ERROR export_all error={exc!r}")
         raise
-    finally:
-        if wb is not None:
-            wb.Close(SaveChanges=True)
-        excel.Quit()
+    record_export("condiciones_vacante", FORM_CACHE, output_path)
     clear_cache_file()
     clear_form_cache()
     return output_path
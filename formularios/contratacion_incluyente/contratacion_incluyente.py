@@ -12,7 +12,19 @@ from formularios.common import (
     _sanitize_filename,
     _supabase_get,
     _supabase_upsert_with_queue,
+    _cancel_cache_write,
+    _flush_cache_writes,
+    _schedule_cache_write,
 )
+from formularios.excel_backend import expand_row_block, open_workbook
+from formularios.export_log import get_log
+from formularios.form_records import record_export
+from formularios.template_registry import (
+    bound_sheet,
+    find_anchor_row,
+    get_template_path,
+)
+from formularios.cedula_catalog import get_cedula_catalog, register_cedulas
 
 
 FORM_ID = "contratacion_incluyente"
@@ -392,7 +404,9 @@ def _get_cache_path():
 
 
 def cache_file_exists():
-    return os.path.exists(_get_cache_path())
+    path = _get_cache_path()
+    _flush_cache_writes(path)
+    return os.path.exists(path)
 
 
 def save_cache_to_file():
@@ -401,12 +415,12 @@ def save_cache_to_file():
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
         "data": FORM_CACHE,
     }
-    with open(_get_cache_path(), "w", encoding="utf-8") as handle:
-        json.dump(payload, handle, ensure_ascii=False, indent=2)
+    _schedule_cache_write(_get_cache_path(), payload)
 
 
 def load_cache_from_file():
     path = _get_cache_path()
+    _flush_cache_writes(path)
     if not os.path.exists(path):
         return False
     with open(path, "r", encoding="utf-8") as handle:
@@ -422,6 +436,7 @@ def load_cache_from_file():
 
 def clear_cache_file():
     path = _get_cache_path()
+    _cancel_cache_write(path)
     if os.path.exists(path):
         os.remove(path)
 
@@ -469,13 +484,7 @@ def _infer_discapacidad_categoria(value):
 
 
 def get_usuarios_reca_cedulas(env_path=".env"):
-    params = {
-        "select": "cedula_usuario",
-        "cedula_usuario": "not.is.null",
-        "order": "cedula_usuario.asc",
-    }
-    data = _supabase_get("usuarios_reca", params, env_path=env_path)
-    return [row.get("cedula_usuario") for row in data if row.get("cedula_usuario")]
+    return get_cedula_catalog(env_path=env_path).values()
 
 
 def get_usuario_reca_by_cedula(cedula, env_path=".env"):
@@ -517,17 +526,10 @@ def get_usuario_reca_by_cedula(cedula, env_path=".env"):
 
 
 def _find_template_path():
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-    templates_dir = os.path.join(base_dir, "templates")
-    if not os.path.isdir(templates_dir):
-        raise FileNotFoundError("No existe la carpeta templates.")
-    for name in os.listdir(templates_dir):
-        if name.startswith("~$"):
-            continue
-        normalized = _normalize_text(name).replace("_", "")
-        if "contratacion" in normalized and "incluyente" in normalized and normalized.endswith(".xlsx"):
-            return os.path.join(templates_dir, name)
-    raise FileNotFoundError("No se encontró el template de contratacion incluyente.")
+    return get_template_path(FORM_ID)
+
+
+_EXCEL_LOG = get_log("excel_log.txt")
 
 
 def _get_log_dir():
@@ -537,29 +539,11 @@ def _get_log_dir():
     else:
         base_dir = os.getcwd()
     log_dir = os.path.join(base_dir, "logs")
-    os.makedirs(log_dir, exist_ok=True)
     return log_dir
 
 
 def _log_excel(message):
-    try:
-        log_dir = _get_log_dir()
-        log_path = os.path.join(log_dir, "excel_log.txt")
-        reset_log = False
-        if os.path.exists(log_path):
-            try:
-                if os.path.getsize(log_path) >= 5 * 1024 * 1024:
-                    reset_log = True
-            except OSError:
-                reset_log = True
-        if reset_log:
-            with open(log_path, "w", encoding="utf-8") as log_file:
-                log_file.write("")
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        with open(log_path, "a", encoding="utf-8") as log_file:
-            log_file.write(f"[{timestamp}] {message}\n")
-    except OSError:
-        return
+    _EXCEL_LOG.log(message, _get_log_dir())
 
 
 def _ensure_output_path():
@@ -599,8 +583,8 @@ def get_empresa_by_nombre(nombre, env_path=".env"):
     return evaluacion_accesibilidad.get_empresa_by_nombre(nombre, env_path=env_path)
 
 
-def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10):
-    return evaluacion_accesibilidad.get_empresas_by_nombre_prefix(prefix, env_path=env_path, limit=limit)
+def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10, with_truncated=False):
+    return evaluacion_accesibilidad.get_empresas_by_nombre_prefix(prefix, env_path=env_path, limit=limit, with_truncated=with_truncated)
 
 
 def confirm_section_1(company_data, user_inputs):
@@ -699,6 +683,7 @@ def sync_usuarios_reca(env_path=".env"):
             on_conflict="cedula_usuario",
         )
         cedulas = [row.get("cedula_usuario") for row in rows if row.get("cedula_usuario")]
+        register_cedulas(cedulas)
         preview = ", ".join(cedulas[:10])
         extra = "" if len(cedulas) <= 10 else f" (+{len(cedulas) - 10} mas)"
         status = sync_result.get("status") or "synced"
@@ -709,6 +694,9 @@ def sync_usuarios_reca(env_path=".env"):
 
 
 def _find_row_by_text(ws, text):
+    row = find_anchor_row(ws, text, prefix_only=('2.', '6.'))
+    if row is not None:
+        return row
     cell = ws.Columns("A").Find(What=text, LookAt=1)
     if cell is not None:
         return cell.Row
@@ -740,18 +728,6 @@ def _find_row_by_text(ws, text):
     raise ValueError(f"No se encontró el texto '{text}' en la columna A.")
 
 
-def _insert_person_block(ws, start_row, block_height, insert_at):
-    start_end = start_row + block_height - 1
-    dest_end = insert_at + block_height - 1
-    source = ws.Range(f"A{start_row}:{SECTION_2_LAST_COLUMN}{start_end}")
-    dest = ws.Range(f"A{insert_at}:{SECTION_2_LAST_COLUMN}{dest_end}")
-    source.Copy()
-    dest.Insert(Shift=-4121)
-    for row_offset in range(block_height):
-        ws.Rows(insert_at + row_offset).RowHeight = ws.Rows(start_row + row_offset).RowHeight
-    ws.Application.CutCopyMode = False
-
-
 def _write_section_2(ws, oferentes):
     if not oferentes:
         return
@@ -770,10 +746,12 @@ def _write_section_2(ws, oferentes):
     _log_excel(
         f"SECTION section=section_2 start_row={start_row} next_row={next_row} block_height={block_height} total={len(oferentes)}"
     )
-    for idx in range(1, len(oferentes)):
-        insert_at = start_row + (block_height * idx)
-        _insert_person_block(ws, start_row, block_height, insert_at)
-        _log_excel(f"INSERT section=section_2 rows={block_height} at={insert_at}")
+    if total_oferentes > 1:
+        insert_at = start_row + block_height
+        inserted = expand_row_block(
+            ws, start_row, block_height, insert_at, total_oferentes - 1, last_column=SECTION_2_LAST_COLUMN
+        )
+        _log_excel(f"INSERT section=section_2 rows={inserted} at={insert_at}")
 
     for idx, entry in enumerate(oferentes):
         base_row = start_row + (block_height * idx)
@@ -813,14 +791,10 @@ def _write_section_7(ws, payload):
     total = len(payload)
     if total > base_rows:
         insert_at = start_row + base_rows
-        template_row = start_row + base_rows - 1
-        for _ in range(total - base_rows):
-            ws.Rows(insert_at).Insert()
-            ws.Rows(template_row).Copy(ws.Rows(insert_at))
-            insert_at += 1
-            _log_excel(
-                f"INSERT section=section_7 rows=1 at={insert_at - 1}"
-            )
+        inserted = expand_row_block(ws, insert_at - 1, 1, insert_at, total - base_rows)
+        _log_excel(
+            f"INSERT section=section_7 rows={inserted} at={insert_at}"
+        )
     for idx, entry in enumerate(payload):
         row = start_row + idx
         nombre = entry.get("nombre", "")
@@ -854,36 +828,34 @@ def _write_section_1(ws, payload):
             )
 
 
-def export_to_excel(clear_cache=True):
+_SECTION_WRITERS = (
+    ("section_1", _write_section_1, {}),
+    ("section_2", _write_section_2, []),
+    ("section_6", _write_section_6, {}),
+    ("section_7", _write_section_7, []),
+)
+EXPORT_SECTIONS = tuple(section_id for section_id, _writer, _default in _SECTION_WRITERS)
+
+
+def export_to_excel(clear_cache=True, progress_callback=None, backend=None):
     output_path = _ensure_output_path()
     if not FORM_CACHE.get("section_1") and cache_file_exists():
         load_cache_from_file()
     _log_excel(f"START export_all output={output_path}")
     try:
-        import win32com.client as win32
-    except ImportError as exc:
-        _log_excel("ERROR export_all error=pywin32_not_installed")
-        raise RuntimeError("pywin32 no esta instalado. Instala con pip install pywin32.") from exc
-    excel = win32.DispatchEx("Excel.Application")
-    excel.Visible = False
-    excel.DisplayAlerts = False
-    wb = None
-    try:
-        wb = excel.Workbooks.Open(output_path)
-        ws = _get_sheet_by_name(wb)
-        _write_section_1(ws, FORM_CACHE.get("section_1", {}))
-        _write_section_2(ws, FORM_CACHE.get("section_2", []))
-        _write_section_6(ws, FORM_CACHE.get("section_6", {}))
-        _write_section_7(ws, FORM_CACHE.get("section_7", []))
-        wb.Save()
-        _log_excel("SUCCESS export_all")
+        with open_workbook(output_path, backend=backend) as wb:
+            ws = _get_sheet_by_name(wb)
+            with bound_sheet(ws, FORM_ID):
+                for section_id, writer, default in _SECTION_WRITERS:
+                    if progress_callback:
+                        progress_callback(section_id)
+                    writer(ws, FORM_CACHE.get(section_id, default))
+            wb.Save()
+            _log_excel("SUCCESS export_all")
     except Exception as exc:
         _log_excel(f"ERROR export_all error={exc!r}")
         raise
-    finally:
-        if wb is not None:
-            wb.Close(SaveChanges=True)
-        excel.Quit()
+    record_export(FORM_ID, FORM_CACHE, output_path)
     if clear_cache:
         clear_cache_file()
         clear_form_cache()
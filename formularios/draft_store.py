@@ -0,0 +1,507 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+import zlib
+
+from formularios.common import _get_cache_dir
+
+
+DRAFTS_DB_NAME = "form_drafts_il.sqlite3"
+DRAFTS_SCHEMA_VERSION = 3
+# Store anterior: un JSON con todos los borradores de todos los usuarios.
+LEGACY_DRAFTS_FILE_NAME = "form_drafts_il.json"
+LEGACY_MIGRATED_SUFFIX = ".migrado"
+
+DRAFT_META_COLUMNS = (
+    "draft_id",
+    "user_login",
+    "form_id",
+    "form_name",
+    "company_key",
+    "company_name",
+    "last_section",
+    "ui_section",
+    "created_at",
+    "updated_at",
+)
+
+# El cache del formulario va por seccion y el snapshot de la pantalla por
+# campo (draft_fields.path guarda el id del campo), asi el autoguardado
+# reescribe solo lo que cambio. cache_blob y
+# snapshot_blob quedan de la version 1 y se vacian al migrar. Desde la
+# version 3 puede haber varios borradores por (usuario, formulario, empresa):
+# cada ventana autoguarda en el suyo.
+_SCHEMA = """
+create table if not exists drafts (
+    draft_id text primary key,
+    user_login text not null,
+    form_id text not null,
+    form_name text not null default '',
+    company_key text not null default '',
+    company_name text not null default '',
+    last_section text not null default '',
+    ui_section text not null default '',
+    created_at text not null default '',
+    updated_at text not null default '',
+    cache_blob blob,
+    snapshot_blob blob
+);
+create index if not exists idx_drafts_user_form_company_key on drafts (user_login, form_id, company_key);
+create index if not exists idx_drafts_user_updated on drafts (user_login, updated_at);
+create table if not exists draft_sections (
+    draft_id text not null references drafts (draft_id) on delete cascade,
+    section_id text not null,
+    payload blob not null,
+    primary key (draft_id, section_id)
+);
+create table if not exists draft_fields (
+    draft_id text not null references drafts (draft_id) on delete cascade,
+    path text not null,
+    widget_class text not null default '',
+    value text not null default '',
+    position integer not null default 0,
+    primary key (draft_id, path)
+);
+"""
+
+_LOCK = threading.Lock()
+_READY = set()
+# Snapshots viejos: posicion del widget en el arbol ("0.3.1") en vez de id de campo.
+_LEGACY_PATH_RE = re.compile(r"^\d+(\.\d+)*$")
+
+
+def _get_db_path():
+    return os.path.join(_get_cache_dir(), DRAFTS_DB_NAME)
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def _pack(value):
+    return zlib.compress(_dumps(value).encode("utf-8"))
+
+
+def _unpack(blob, default):
+    if not blob:
+        return default
+    try:
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+    except (zlib.error, ValueError):
+        return default
+
+
+def _connect(path=None):
+    default = path is None
+    path = path or _get_db_path()
+    conn = sqlite3.connect(path, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("pragma foreign_keys = on")
+    if path not in _READY:
+        conn.execute("pragma journal_mode = wal")
+        version = conn.execute("pragma user_version").fetchone()[0]
+        if version < DRAFTS_SCHEMA_VERSION:
+            conn.executescript(_SCHEMA)
+            if version == 1:
+                _migrate_blobs(conn)
+            if version in (1, 2):
+                conn.execute("drop index if exists idx_drafts_user_form_company")
+            conn.execute(f"pragma user_version = {DRAFTS_SCHEMA_VERSION}")
+            conn.commit()
+        if default:
+            _migrate_legacy_json(conn)
+        _READY.add(path)
+    return conn
+
+
+def _write_sections(conn, draft_id, sections, replace=False):
+    if replace:
+        conn.execute("delete from draft_sections where draft_id = ?", (draft_id,))
+    conn.executemany(
+        "insert or replace into draft_sections (draft_id, section_id, payload) values (?, ?, ?)",
+        [(draft_id, str(section_id), _pack(payload)) for section_id, payload in sections.items()],
+    )
+
+
+def _field_key(row):
+    """Clave de una fila del snapshot: id de campo ("field") o, en snapshots viejos, "path"."""
+    return str(row.get("field") or row.get("path") or "")
+
+
+def _field_row(key, widget_class, value):
+    name = "path" if _LEGACY_PATH_RE.match(key) else "field"
+    return {name: key, "class": widget_class, "value": value}
+
+
+def _write_fields(conn, draft_id, fields, replace=False):
+    """`fields`: pares (posicion, fila del snapshot {"field", "class", "value"})."""
+    if replace:
+        conn.execute("delete from draft_fields where draft_id = ?", (draft_id,))
+    conn.executemany(
+        "insert or replace into draft_fields (draft_id, path, widget_class, value, position) values (?, ?, ?, ?, ?)",
+        [
+            (draft_id, _field_key(row), str(row.get("class") or ""), str(row.get("value") or ""), position)
+            for position, row in fields
+        ],
+    )
+
+
+def _snapshot_fields(snapshot):
+    if not isinstance(snapshot, list):
+        return []
+    return [(position, row) for position, row in enumerate(snapshot) if isinstance(row, dict) and _field_key(row)]
+
+
+def _migrate_blobs(conn):
+    """Version 1 -> 2: reparte cache_blob y snapshot_blob en secciones y campos."""
+    rows = conn.execute(
+        "select draft_id, cache_blob, snapshot_blob from drafts "
+        "where cache_blob is not null or snapshot_blob is not null"
+    ).fetchall()
+    for row in rows:
+        cache = _unpack(row["cache_blob"], {})
+        _write_sections(conn, row["draft_id"], cache if isinstance(cache, dict) else {}, replace=True)
+        _write_fields(conn, row["draft_id"], _snapshot_fields(_unpack(row["snapshot_blob"], [])), replace=True)
+    conn.execute("update drafts set cache_blob = null, snapshot_blob = null")
+
+
+def _migrate_legacy_json(conn):
+    """
+    Importa form_drafts_il.json (si existe) y lo renombra a .migrado. Si el
+    JSON no se puede leer se deja en su lugar para no perder borradores.
+    """
+    legacy_path = os.path.join(_get_cache_dir(), LEGACY_DRAFTS_FILE_NAME)
+    if not os.path.exists(legacy_path):
+        return
+    try:
+        with open(legacy_path, "r", encoding="utf-8") as handle:
+            data = json.load(handle) or {}
+    except (OSError, ValueError):
+        return
+    users = data.get("users") if isinstance(data, dict) else None
+    with conn:
+        for user_login, drafts in (users if isinstance(users, dict) else {}).items():
+            for item in drafts if isinstance(drafts, list) else []:
+                if not isinstance(item, dict) or not item.get("form_id"):
+                    continue
+                draft_id = str(item.get("draft_id") or uuid.uuid4())
+                cursor = conn.execute(
+                    "insert or ignore into drafts (draft_id, user_login, form_id, form_name, company_key, "
+                    "company_name, last_section, ui_section, created_at, updated_at) "
+                    "values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        draft_id,
+                        str(user_login or "").strip().lower(),
+                        str(item.get("form_id") or ""),
+                        str(item.get("form_name") or ""),
+                        str(item.get("company_key") or ""),
+                        str(item.get("company_name") or ""),
+                        str(item.get("last_section") or ""),
+                        str(item.get("ui_section") or ""),
+                        str(item.get("created_at") or ""),
+                        str(item.get("updated_at") or item.get("created_at") or ""),
+                    ),
+                )
+                if not cursor.rowcount:
+                    continue
+                cache = item.get("cache")
+                _write_sections(conn, draft_id, cache if isinstance(cache, dict) else {})
+                _write_fields(conn, draft_id, _snapshot_fields(item.get("ui_snapshot")))
+    try:
+        os.replace(legacy_path, legacy_path + LEGACY_MIGRATED_SUFFIX)
+    except OSError:
+        pass
+
+
+def _meta_sql():
+    return ", ".join(DRAFT_META_COLUMNS)
+
+
+def _full_draft(conn, row):
+    draft = {key: row[key] for key in DRAFT_META_COLUMNS}
+    draft["cache"] = {
+        section["section_id"]: _unpack(section["payload"], None)
+        for section in conn.execute(
+            "select section_id, payload from draft_sections where draft_id = ?", (draft["draft_id"],)
+        )
+    }
+    draft["ui_snapshot"] = [
+        _field_row(field["path"], field["widget_class"], field["value"])
+        for field in conn.execute(
+            "select path, widget_class, value from draft_fields where draft_id = ? order by position, path",
+            (draft["draft_id"],),
+        )
+    ]
+    return draft
+
+
+def list_drafts(user_login=None):
+    """Metadatos de los borradores (sin cache ni snapshot), mas recientes primero."""
+    sql = f"select {_meta_sql()} from drafts"
+    params = []
+    if user_login is not None:
+        sql += " where user_login = ?"
+        params.append(user_login)
+    sql += " order by updated_at desc"
+    with _LOCK:
+        conn = _connect()
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+
+def count_drafts(user_login):
+    with _LOCK:
+        conn = _connect()
+        try:
+            return conn.execute("select count(*) from drafts where user_login = ?", (user_login,)).fetchone()[0]
+        finally:
+            conn.close()
+
+
+def load_draft(draft_id):
+    """Borrador completo: metadatos mas "cache" y "ui_snapshot", o None."""
+    with _LOCK:
+        conn = _connect()
+        try:
+            row = conn.execute(f"select {_meta_sql()} from drafts where draft_id = ?", (draft_id,)).fetchone()
+            return _full_draft(conn, row) if row is not None else None
+        finally:
+            conn.close()
+
+
+def _find_draft_id(conn, user_login, form_id, company_key):
+    """draft_id mas reciente del usuario para (formulario, empresa), o None."""
+    row = conn.execute(
+        "select draft_id from drafts where user_login = ? and form_id = ? and company_key = ? "
+        "order by updated_at desc limit 1",
+        (user_login, form_id, company_key),
+    ).fetchone()
+    return row["draft_id"] if row else None
+
+
+def _write_meta(
+    conn, draft_id, user_login, form_id, form_name, company_key, company_name, ui_section, last_section, updated_at
+):
+    """Crea o actualiza los metadatos de `draft_id`; conserva created_at si ya existia."""
+    conn.execute(
+        "insert into drafts (draft_id, user_login, form_id, form_name, company_key, company_name, "
+        "last_section, ui_section, created_at, updated_at) values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+        "on conflict(draft_id) do update set form_name = excluded.form_name, "
+        "company_key = excluded.company_key, company_name = excluded.company_name, "
+        "last_section = excluded.last_section, ui_section = excluded.ui_section, "
+        "updated_at = excluded.updated_at",
+        (
+            draft_id,
+            user_login,
+            form_id,
+            form_name,
+            company_key,
+            company_name,
+            last_section,
+            ui_section,
+            updated_at,
+            updated_at,
+        ),
+    )
+
+
+def save_draft(
+    user_login,
+    form_id,
+    form_name,
+    company_key,
+    company_name,
+    cache,
+    ui_section,
+    ui_snapshot,
+    updated_at,
+    draft_id=None,
+):
+    """
+    Reemplaza el borrador `draft_id` o, sin el, el del usuario para
+    (formulario, empresa) (lo crea si no hay). Devuelve su draft_id.
+    """
+    cache = cache or {}
+    last_section = ui_section or str(cache.get("_last_section") or "")
+    with _LOCK:
+        conn = _connect()
+        try:
+            with conn:
+                draft_id = draft_id or _find_draft_id(conn, user_login, form_id, company_key) or str(uuid.uuid4())
+                _write_meta(
+                    conn,
+                    draft_id,
+                    user_login,
+                    form_id,
+                    form_name,
+                    company_key,
+                    company_name,
+                    ui_section,
+                    last_section,
+                    updated_at,
+                )
+                _write_sections(conn, draft_id, cache, replace=True)
+                _write_fields(conn, draft_id, _snapshot_fields(ui_snapshot or []), replace=True)
+        finally:
+            conn.close()
+    return draft_id
+
+
+def delete_draft(user_login, draft_id):
+    with _LOCK:
+        conn = _connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "delete from drafts where user_login = ? and draft_id = ?", (user_login, draft_id)
+                )
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+
+def read_all_drafts(db_path=None, user_login=None):
+    """Borradores completos de un store (por defecto el local), para exportaciones en lote."""
+    sql = f"select {_meta_sql()} from drafts"
+    params = []
+    if user_login is not None:
+        sql += " where user_login = ?"
+        params.append(user_login)
+    with _LOCK:
+        conn = _connect(db_path)
+        try:
+            return [_full_draft(conn, row) for row in conn.execute(sql, params).fetchall()]
+        finally:
+            conn.close()
+
+
+def _digest(value):
+    return hashlib.sha1(_dumps(value).encode("utf-8")).hexdigest()
+
+
+class DraftAutosave:
+    """
+    Autoguardado de un formulario abierto. Guarda siempre en su propio
+    borrador: uno nuevo en el primer save() o el que se le asigne con adopt()
+    (el borrador desde el que se abrio la ventana); nunca en otro borrador
+    de la misma empresa. Recuerda la huella de cada seccion del cache y el
+    valor de cada campo del snapshot ya guardados; save() escribe solo las
+    secciones y campos que cambiaron. Pensado para correr fuera del hilo de Tk.
+    """
+
+    def __init__(self, user_login, form_id, form_name):
+        self.user_login = user_login
+        self.form_id = form_id
+        self.form_name = form_name
+        self.draft_id = None
+        # True si el borrador lo creo el autoguardado (no existia antes).
+        self.created = False
+        self._synced = False
+        self._sections = {}
+        self._fields = {}
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def adopt(self, draft_id):
+        """
+        Toma `draft_id` como borrador de la ventana (abierto desde la lista o
+        guardado a mano); el siguiente save() lo reescribe completo. Si el
+        autoguardado ya habia creado otro borrador, ese se borra.
+        """
+        with self._lock:
+            if self._closed or not draft_id:
+                return
+            if self.draft_id == draft_id:
+                self.created = False
+                return
+            if self.draft_id and self.created:
+                delete_draft(self.user_login, self.draft_id)
+            self.draft_id = draft_id
+            self.created = False
+            self._synced = False
+            self._sections = {}
+            self._fields = {}
+
+    def save(self, cache, ui_snapshot, ui_section, company_key, company_name, updated_at):
+        """Guarda el delta y devuelve cuantas secciones y campos se escribieron o borraron."""
+        cache = cache or {}
+        sections = {str(section_id): _digest(payload) for section_id, payload in cache.items()}
+        fields = {_field_key(row): (position, row) for position, row in _snapshot_fields(ui_snapshot)}
+        last_section = ui_section or str(cache.get("_last_section") or "")
+        with self._lock:
+            if self._closed:
+                return 0
+            full = not self._synced
+            changed_sections = [sid for sid, digest in sections.items() if full or self._sections.get(sid) != digest]
+            removed_sections = [] if full else [sid for sid in self._sections if sid not in sections]
+            changed_fields = [
+                (position, row)
+                for key, (position, row) in fields.items()
+                if full or self._fields.get(key) != (position, row.get("class"), row.get("value"))
+            ]
+            removed_fields = [] if full else [key for key in self._fields if key not in fields]
+            if not (full or changed_sections or removed_sections or changed_fields or removed_fields):
+                return 0
+
+            created = self.draft_id is None
+            draft_id = self.draft_id or str(uuid.uuid4())
+            with _LOCK:
+                conn = _connect()
+                try:
+                    with conn:
+                        # Si cambio la empresa, el mismo borrador pasa a la clave nueva.
+                        _write_meta(
+                            conn,
+                            draft_id,
+                            self.user_login,
+                            self.form_id,
+                            self.form_name,
+                            company_key,
+                            company_name,
+                            ui_section,
+                            last_section,
+                            updated_at,
+                        )
+                        _write_sections(conn, draft_id, {sid: cache[sid] for sid in changed_sections}, replace=full)
+                        conn.executemany(
+                            "delete from draft_sections where draft_id = ? and section_id = ?",
+                            [(draft_id, sid) for sid in removed_sections],
+                        )
+                        _write_fields(conn, draft_id, changed_fields, replace=full)
+                        conn.executemany(
+                            "delete from draft_fields where draft_id = ? and path = ?",
+                            [(draft_id, key) for key in removed_fields],
+                        )
+                finally:
+                    conn.close()
+
+            if created:
+                self.created = True
+            self.draft_id = draft_id
+            self._synced = True
+            self._sections = sections
+            self._fields = {
+                key: (position, row.get("class"), row.get("value")) for key, (position, row) in fields.items()
+            }
+            return len(changed_sections) + len(removed_sections) + len(changed_fields) + len(removed_fields)
+
+    def discard(self):
+        """
+        Borra el borrador si lo creo el autoguardado (p.ej. tras exportar) y
+        deja de guardar: un save() que llegue despues no hace nada.
+        """
+        with self._lock:
+            self._closed = True
+            if self.draft_id and self.created:
+                delete_draft(self.user_login, self.draft_id)
+            self.draft_id = None
+            self.created = False
+            self._synced = False
+            self._sections = {}
+            self._fields = {}
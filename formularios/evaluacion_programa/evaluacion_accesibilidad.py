@@ -13,10 +13,16 @@ from . import seccion_6_7
 from . import seccion_8
 from formularios.common import (
     _get_desktop_dir,
-    _normalize_text,
     _sanitize_filename,
     _supabase_get,
+    _cancel_cache_write,
+    _flush_cache_writes,
+    _schedule_cache_write,
 )
+from formularios.excel_backend import expand_row_block, open_workbook
+from formularios.export_log import get_log
+from formularios.form_records import record_export
+from formularios.template_registry import get_template_path
 
 FORM_NAME = "Evaluacion de Accesibilidad"
 SHEET_NAME = "2. EVALUACIÓN DE ACCESIBILIDAD"
@@ -166,7 +172,9 @@ def _get_cache_path():
 
 
 def cache_file_exists():
-    return os.path.exists(_get_cache_path())
+    path = _get_cache_path()
+    _flush_cache_writes(path)
+    return os.path.exists(path)
 
 
 def save_cache_to_file():
@@ -175,12 +183,12 @@ def save_cache_to_file():
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
         "data": FORM_CACHE,
     }
-    with open(_get_cache_path(), "w", encoding="utf-8") as handle:
-        json.dump(payload, handle, ensure_ascii=False, indent=2)
+    _schedule_cache_write(_get_cache_path(), payload)
 
 
 def load_cache_from_file():
     path = _get_cache_path()
+    _flush_cache_writes(path)
     if not os.path.exists(path):
         return False
     with open(path, "r", encoding="utf-8") as handle:
@@ -196,6 +204,7 @@ def load_cache_from_file():
 
 def clear_cache_file():
     path = _get_cache_path()
+    _cancel_cache_write(path)
     if os.path.exists(path):
         os.remove(path)
 
@@ -206,19 +215,7 @@ def clear_form_cache():
 
 
 def _find_template_path():
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-    templates_dir = os.path.join(base_dir, "templates")
-    if not os.path.isdir(templates_dir):
-        raise FileNotFoundError("No existe la carpeta templates.")
-    for name in os.listdir(templates_dir):
-        normalized = _normalize_text(name).replace("_", "")
-        if (
-            "evaluacion" in normalized
-            and "accesibilidad" in normalized
-            and normalized.endswith(".xlsx")
-        ):
-            return os.path.join(templates_dir, name)
-    raise FileNotFoundError("No se encontró el template de evaluacion.")
+    return get_template_path("evaluacion_accesibilidad")
 
 
 def _ensure_output_path():
@@ -249,6 +246,9 @@ def get_output_path():
     return None
 
 
+_EXCEL_LOG = get_log("excel_log.txt")
+
+
 def _get_log_dir():
     output_path = FORM_CACHE.get("_output_path")
     if output_path:
@@ -256,29 +256,11 @@ def _get_log_dir():
     else:
         base_dir = os.getcwd()
     log_dir = os.path.join(base_dir, "logs")
-    os.makedirs(log_dir, exist_ok=True)
     return log_dir
 
 
 def _log_excel(message):
-    try:
-        log_dir = _get_log_dir()
-        log_path = os.path.join(log_dir, "excel_log.txt")
-        reset_log = False
-        if os.path.exists(log_path):
-            try:
-                if os.path.getsize(log_path) >= 5 * 1024 * 1024:
-                    reset_log = True
-            except OSError:
-                reset_log = True
-        if reset_log:
-            with open(log_path, "w", encoding="utf-8") as log_file:
-                log_file.write("")
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        with open(log_path, "a", encoding="utf-8") as log_file:
-            log_file.write(f"[{timestamp}] {message}\n")
-    except OSError:
-        return
+    _EXCEL_LOG.log(message, _get_log_dir())
 
 
 def _write_section_with_ws(ws, section_id, payload):
@@ -296,13 +278,7 @@ def _write_section_with_ws(ws, section_id, payload):
         total = len(asistentes)
         template_row = start_row + base_rows - 1
         if total > base_rows:
-            insert_at = start_row + base_rows
-            extra_rows = total - base_rows
-            for _ in range(extra_rows):
-                ws.Rows(insert_at).Insert()
-                ws.Rows(template_row).Copy()
-                ws.Rows(insert_at).PasteSpecial(-4122)
-                insert_at += 1
+            expand_row_block(ws, template_row, 1, start_row + base_rows, total - base_rows, formats_only=True)
         for idx, entry in enumerate(asistentes):
             row = start_row + idx
             nombre = entry.get("nombre", "")
@@ -330,36 +306,24 @@ def _write_section_with_ws(ws, section_id, payload):
 
 
 
-def export_to_excel(progress_callback=None):
+def export_to_excel(progress_callback=None, backend=None):
     output_path = _ensure_output_path()
     _log_excel(f"START export_all output={output_path}")
     try:
-        import win32com.client as win32
-    except ImportError as exc:
-        _log_excel("ERROR export_all error=pywin32_not_installed")
-        raise RuntimeError("pywin32 no esta instalado. Instala con pip install pywin32.") from exc
-    excel = win32.DispatchEx("Excel.Application")
-    excel.Visible = False
-    excel.DisplayAlerts = False
-    wb = None
-    try:
-        wb = excel.Workbooks.Open(output_path)
-        ws = wb.Worksheets(SHEET_NAME)
-        for section_id in EXCEL_MAPPING.keys():
-            payload = FORM_CACHE.get(section_id, {})
-            _log_excel(f"SECTION export_all section={section_id}")
-            if progress_callback:
-                progress_callback(section_id)
-            _write_section_with_ws(ws, section_id, payload)
-        wb.Save()
-        _log_excel("SUCCESS export_all")
+        with open_workbook(output_path, backend=backend) as wb:
+            ws = wb.Worksheets(SHEET_NAME)
+            for section_id in EXCEL_MAPPING.keys():
+                payload = FORM_CACHE.get(section_id, {})
+                _log_excel(f"SECTION export_all section={section_id}")
+                if progress_callback:
+                    progress_callback(section_id)
+                _write_section_with_ws(ws, section_id, payload)
+            wb.Save()
+            _log_excel("SUCCESS export_all")
     except Exception as exc:
         _log_excel(f"ERROR export_all error={exc!r}")
         raise
-    finally:
-        if wb is not None:
-            wb.Close(SaveChanges=True)
-        excel.Quit()
+    record_export("evaluacion_accesibilidad", FORM_CACHE, output_path)
     clear_cache_file()
     clear_form_cache()
     return output_path
@@ -684,6 +648,7 @@ EXCEL_MAPPING = {
         "base_rows": 4,
     },
 }
+EXPORT_SECTIONS = tuple(EXCEL_MAPPING)
 
 SECTION_2_1 = {
     "title": "2.1 CONDICIONES DE MOVILIDAD Y URBANÍSTICAS",
@@ -1493,12 +1458,14 @@ def get_empresa_by_nombre(nombre, env_path=".env"):
     raise ValueError("Hay más de una empresa con ese nombre. Usa el NIT.")
 
 
-def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10):
+def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10, with_truncated=False):
+    """Nombres que empiezan por `prefix`; con `with_truncated`, (nombres, truncado)."""
+    empty = ([], False) if with_truncated else []
     if not prefix:
-        return []
+        return empty
     prefix = " ".join(str(prefix).split())
     if not prefix:
-        return []
+        return empty
     params = {
         "select": "nombre_empresa",
         "nombre_empresa": f"ilike.{prefix}%",
@@ -1506,7 +1473,7 @@ def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10):
     }
     data = _supabase_get("empresas", params, env_path=env_path)
     if not data:
-        return []
+        return empty
     names = []
     seen = set()
     for row in data:
@@ -1517,6 +1484,9 @@ def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10):
             continue
         seen.add(name)
         names.append(name)
+    if with_truncated:
+        # Se mide con las filas del servidor: sin repetidos puede haber menos de `limit` nombres.
+        return names, len(data) >= params["limit"]
     return names
 
 
@@ -0,0 +1,672 @@
+import json
+import os
+import re
+import warnings
+from contextlib import contextmanager
+from copy import copy
+
+from openpyxl.cell.cell import MergedCell
+from openpyxl.utils import column_index_from_string, get_column_letter, range_boundaries
+
+from formularios.template_registry import note_rows_inserted
+
+
+EXCEL_BACKEND_ENV = "RECA_EXCEL_BACKEND"
+DEFAULT_CONFIG_PATH = "config.json"
+
+BACKEND_COM = "com"
+BACKEND_OPENPYXL = "openpyxl"
+BACKENDS = (BACKEND_COM, BACKEND_OPENPYXL)
+
+# Constantes de Excel que usan los formularios.
+XL_SHIFT_DOWN = -4121
+XL_PASTE_FORMATS = -4122
+XL_WHOLE = 1
+XL_PART = 2
+
+DEFAULT_ROW_HEIGHT = 15.0
+_MAX_COLUMN = 16384
+
+# openpyxl descarta las listas desplegables guardadas como extension x14
+# (las que toman la lista de otra hoja) y solo lo avisa con este warning.
+_X14_VALIDATION_WARNING = "Data Validation extension is not supported"
+
+_REF_RE = re.compile(
+    r"(?P<sheet>(?:'[^']+'|[A-Za-z_][\w.]*)!)?"
+    r"(?<![A-Za-z0-9_$])"
+    r"(?P<c1>\$?[A-Z]{1,3})(?P<r1>\$?\d+)"
+    r"(?::(?P<c2>\$?[A-Z]{1,3})(?P<r2>\$?\d+))?"
+    r"(?![\w(])"
+)
+
+
+def load_config():
+    """config.json del directorio de trabajo como dict; {} si no existe o no se puede leer."""
+    if not os.path.exists(DEFAULT_CONFIG_PATH):
+        return {}
+    try:
+        with open(DEFAULT_CONFIG_PATH, "r", encoding="utf-8") as handle:
+            return json.load(handle) or {}
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def get_export_backend(backend=None):
+    """
+    Resuelve el backend de exportacion: argumento explicito, luego la variable
+    RECA_EXCEL_BACKEND, luego config.json (excel_backend). Por defecto COM.
+    """
+    value = backend or os.getenv(EXCEL_BACKEND_ENV) or load_config().get("excel_backend") or BACKEND_COM
+    value = str(value).strip().lower()
+    if value not in BACKENDS:
+        raise ValueError(f"Backend de Excel no valido: {value}")
+    return value
+
+
+@contextmanager
+def com_thread():
+    """
+    Inicializa COM en el hilo actual mientras dura el bloque. Va en el hilo
+    de trabajo que exporta (fuera del libro), para que CoUninitialize corra
+    cuando ya no queda ningun proxy de Excel vivo. Sin pywin32 no hace nada.
+    """
+    try:
+        import pythoncom
+    except ImportError:
+        yield
+        return
+    pythoncom.CoInitialize()
+    try:
+        yield
+    finally:
+        pythoncom.CoUninitialize()
+
+
+@contextmanager
+def open_workbook(path, backend=None):
+    """
+    Abre `path` con el backend elegido y entrega un libro con la API de COM
+    que usan los formularios (Worksheets, Range, Rows, Save...).
+    Al salir cierra el libro guardando cambios, igual que Close(SaveChanges=True).
+    Con COM fuera del hilo principal, el hilo debe correr dentro de com_thread().
+    """
+    backend = get_export_backend(backend)
+    if backend == BACKEND_OPENPYXL:
+        wb = OpenpyxlWorkbook(path)
+        try:
+            yield wb
+        finally:
+            wb.Close(SaveChanges=True)
+        return
+
+    try:
+        import win32com.client as win32
+    except ImportError as exc:
+        raise RuntimeError("pywin32 no esta instalado. Instala con pip install pywin32.") from exc
+    excel = win32.DispatchEx("Excel.Application")
+    excel.Visible = False
+    excel.DisplayAlerts = False
+    wb = None
+    try:
+        wb = excel.Workbooks.Open(path)
+        yield wb
+    finally:
+        if wb is not None:
+            wb.Close(SaveChanges=True)
+        excel.Quit()
+
+
+
+# Largo maximo de una direccion de rango en COM.
+_MAX_ADDRESS_CHARS = 250
+
+
+def expand_row_block(ws, first_row, height, insert_at, copies, formats_only=False, last_column=None):
+    """
+    Repite `copies` veces el bloque de `height` filas que empieza en
+    `first_row`, insertando todas las filas desde `insert_at` de una vez:
+    una insercion, una copia sobre el destino completo y los altos de fila
+    por grupos. Funciona con COM y con openpyxl y avisa al template_registry.
+
+    `formats_only` pega solo formatos; si no, copia valores, formulas y
+    combinaciones. `last_column` limita la copia a A:<columna> (las filas
+    se insertan completas). Devuelve el total de filas insertadas.
+    """
+    if height <= 0 or copies <= 0:
+        return 0
+    total = height * copies
+    if isinstance(ws, _Sheet):
+        ws.expand_rows(first_row, height, insert_at, copies, formats_only=formats_only, last_column=last_column)
+    else:
+        _expand_rows_com(ws, first_row, height, insert_at, copies, formats_only, last_column)
+    note_rows_inserted(ws, insert_at, total)
+    return total
+
+
+def _expand_rows_com(ws, first_row, height, insert_at, copies, formats_only, last_column):
+    total = height * copies
+    last_row = insert_at + total - 1
+    # Con algo en el portapapeles Insert pegaria esas celdas.
+    ws.Application.CutCopyMode = False
+    ws.Range(f"{insert_at}:{last_row}").Insert(Shift=XL_SHIFT_DOWN)
+    if first_row >= insert_at:
+        first_row += total
+    source_last = first_row + height - 1
+    if last_column:
+        source = ws.Range(f"A{first_row}:{last_column}{source_last}")
+        dest = ws.Range(f"A{insert_at}:{last_column}{last_row}")
+    else:
+        source = ws.Range(f"{first_row}:{source_last}")
+        dest = ws.Range(f"{insert_at}:{last_row}")
+    # El destino es multiplo del origen: Excel repite el bloque completo.
+    if formats_only:
+        source.Copy()
+        dest.PasteSpecial(Paste=XL_PASTE_FORMATS)
+    else:
+        source.Copy(dest)
+    ws.Application.CutCopyMode = False
+
+    rows_by_height = {}
+    for offset in range(height):
+        row_height = ws.Rows(first_row + offset).RowHeight
+        rows_by_height.setdefault(row_height, []).extend(
+            insert_at + offset + height * idx for idx in range(copies)
+        )
+    for row_height, rows in rows_by_height.items():
+        for address in _row_addresses(rows):
+            ws.Range(address).RowHeight = row_height
+
+
+def _row_addresses(rows):
+    """Agrupa filas en direcciones "5:7,10:10" que no pasen del largo de COM."""
+    spans = []
+    for row in sorted(rows):
+        if spans and row == spans[-1][1] + 1:
+            spans[-1][1] = row
+        else:
+            spans.append([row, row])
+    addresses = []
+    current = ""
+    for start, end in spans:
+        part = f"{start}:{end}"
+        if current and len(current) + len(part) + 1 > _MAX_ADDRESS_CHARS:
+            addresses.append(current)
+            current = ""
+        current = f"{current},{part}" if current else part
+    if current:
+        addresses.append(current)
+    return addresses
+
+class OpenpyxlWorkbook:
+    """
+    Libro openpyxl con la parte del modelo de objetos de Excel que usan los
+    export_to_excel. Conserva estilos, combinaciones, altos de fila,
+    validaciones e imagenes al insertar y copiar filas.
+    """
+
+    def __init__(self, path):
+        from openpyxl import load_workbook
+
+        self.path = path
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            self._wb = load_workbook(path)
+        self.dropped_validations = any(
+            _X14_VALIDATION_WARNING in str(item.message) for item in caught
+        )
+        if self.dropped_validations:
+            warnings.warn(
+                f"{os.path.basename(path)}: openpyxl no conserva las listas desplegables "
+                "x14 de la plantilla; el libro exportado queda sin ellas. Usa el backend COM "
+                "si se necesitan.",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+        self._sheets = {}
+        self.Application = _Application()
+        self.Worksheets = _Worksheets(self)
+        self._dirty = False
+
+    @property
+    def workbook(self):
+        return self._wb
+
+    def _sheet(self, ws):
+        sheet = self._sheets.get(id(ws))
+        if sheet is None:
+            sheet = _Sheet(self, ws)
+            self._sheets[id(ws)] = sheet
+        return sheet
+
+    def Save(self):
+        self._wb.save(self.path)
+        self._dirty = False
+
+    def Close(self, SaveChanges=False):
+        if SaveChanges and self._dirty:
+            self.Save()
+        self._wb.close()
+
+
+class _Application:
+    def __init__(self):
+        self.clipboard = None
+
+    @property
+    def CutCopyMode(self):
+        return self.clipboard is not None
+
+    @CutCopyMode.setter
+    def CutCopyMode(self, value):
+        if not value:
+            self.clipboard = None
+
+
+class _Worksheets:
+    def __init__(self, book):
+        self._book = book
+
+    def __call__(self, key):
+        wb = self._book.workbook
+        if isinstance(key, int):
+            return self._book._sheet(wb.worksheets[key - 1])
+        return self._book._sheet(wb[key])
+
+    def __iter__(self):
+        for ws in self._book.workbook.worksheets:
+            yield self._book._sheet(ws)
+
+    def __len__(self):
+        return len(self._book.workbook.worksheets)
+
+    @property
+    def Count(self):
+        return len(self)
+
+
+class _Count:
+    def __init__(self, count):
+        self.Count = count
+
+
+class _Sheet:
+    def __init__(self, book, ws):
+        self._book = book
+        self.ws = ws
+        self.Application = book.Application
+
+    @property
+    def Name(self):
+        return self.ws.title
+
+    def Range(self, ref):
+        min_col, min_row, max_col, max_row = range_boundaries(ref)
+        return _Range(self, min_row or 1, min_col or 1, max_row or self.ws.max_row, max_col or _MAX_COLUMN)
+
+    def Cells(self, row, column):
+        return _Range(self, row, column, row, column)
+
+    def Rows(self, row):
+        return _Range(self, row, 1, row, _MAX_COLUMN)
+
+    def Columns(self, column):
+        if isinstance(column, str):
+            min_col, _min_row, max_col, _max_row = range_boundaries(f"{column}1")
+        else:
+            min_col = max_col = column
+        return _Range(self, 1, min_col, self.ws.max_row, max_col)
+
+    @property
+    def UsedRange(self):
+        ws = self.ws
+        return _Range(self, ws.min_row, ws.min_column, ws.max_row, ws.max_column)
+
+    def _touch(self):
+        self._book._dirty = True
+
+    def _row_height(self, row):
+        height = self.ws.row_dimensions[row].height
+        if height is None:
+            height = self.ws.sheet_format.defaultRowHeight or DEFAULT_ROW_HEIGHT
+        return height
+
+    def _merged_anchor(self, row, column):
+        for merged in self.ws.merged_cells.ranges:
+            if merged.min_row <= row <= merged.max_row and merged.min_col <= column <= merged.max_col:
+                return merged.min_row, merged.min_col
+        return row, column
+
+    def _last_column(self, max_col):
+        return min(max_col, max(self.ws.max_column, 1))
+
+    def insert_rows(self, idx, amount):
+        """Inserta filas completas desplazando todo lo que queda debajo."""
+        if amount <= 0:
+            return
+        ws = self.ws
+        _shift_formulas(ws, idx, amount)
+        merged = list(ws.merged_cells.ranges)
+        for rng in merged:
+            ws.merged_cells.remove(rng)
+        ws.insert_rows(idx, amount)
+        grown = []
+        for rng in merged:
+            if rng.min_row >= idx:
+                rng.shift(0, amount)
+                ws.merged_cells.add(rng)
+            elif rng.max_row >= idx:
+                grown.append(f"{get_column_letter(rng.min_col)}{rng.min_row}:{get_column_letter(rng.max_col)}{rng.max_row + amount}")
+            else:
+                ws.merged_cells.add(rng)
+        for ref in grown:
+            ws.merge_cells(ref)
+
+        dims = ws.row_dimensions
+        moved = sorted((row for row in list(dims.keys()) if row >= idx), reverse=True)
+        for row in moved:
+            dim = dims.pop(row)
+            dim.index = row + amount
+            dims[row + amount] = dim
+
+        for dv in ws.data_validations.dataValidation:
+            dv.sqref = _shift_sqref(dv.sqref, idx, amount)
+        _rebuild_conditional_formatting(ws, lambda sqref: _shift_sqref(sqref, idx, amount))
+        for image in list(getattr(ws, "_images", [])) + list(getattr(ws, "_charts", [])):
+            _shift_anchor(image.anchor, idx, amount)
+        self._touch()
+
+    def copy_block(self, source, dest_row, dest_col, formats_only=False, repeat=1):
+        """
+        Copia `source` (otro _Range) sobre la celda destino, como Range.Copy.
+        Con `repeat` > 1 el bloque se repite hacia abajo, como cuando en Excel
+        el destino es un multiplo del rango copiado.
+        """
+        src_ws = source.sheet.ws
+        ws = self.ws
+        last_col = source.sheet._last_column(source.max_col)
+        block_height = source.max_row - source.min_row + 1
+        col_offset = dest_col - source.min_col
+        whole_rows = source.min_col == 1 and source.max_col == _MAX_COLUMN
+        offsets = [dest_row - source.min_row + block_height * idx for idx in range(max(1, repeat))]
+
+        # Como xlPasteFormats, pegar solo formatos tambien copia las combinaciones.
+        for rng in list(ws.merged_cells.ranges):
+            if (
+                rng.min_row >= dest_row
+                and rng.max_row <= source.max_row + offsets[-1]
+                and rng.min_col >= dest_col
+                and rng.max_col <= last_col + col_offset
+            ):
+                ws.unmerge_cells(rng.coord)
+
+        from openpyxl.formula.translate import Translator
+
+        for row in range(source.min_row, source.max_row + 1):
+            cells = [src_ws.cell(row=row, column=col) for col in range(source.min_col, last_col + 1)]
+            for row_offset in offsets:
+                for src in cells:
+                    target = ws.cell(row=row + row_offset, column=src.column + col_offset)
+                    if isinstance(target, MergedCell):
+                        continue
+                    if src.has_style:
+                        target._style = copy(src._style)
+                    if formats_only or isinstance(src, MergedCell):
+                        continue
+                    value = src.value
+                    if isinstance(value, str) and value.startswith("="):
+                        value = Translator(value, origin=src.coordinate).translate_formula(target.coordinate)
+                    target.value = value
+                if whole_rows:
+                    src_dim = src_ws.row_dimensions[row]
+                    dest_dim = ws.row_dimensions[row + row_offset]
+                    dest_dim.height = src_dim.height
+                    dest_dim.hidden = src_dim.hidden
+
+        merges = [
+            rng
+            for rng in list(src_ws.merged_cells.ranges)
+            if rng.min_row >= source.min_row
+            and rng.max_row <= source.max_row
+            and rng.min_col >= source.min_col
+            and rng.max_col <= last_col
+        ]
+        for row_offset in offsets:
+            for rng in merges:
+                ws.merge_cells(
+                    start_row=rng.min_row + row_offset,
+                    start_column=rng.min_col + col_offset,
+                    end_row=rng.max_row + row_offset,
+                    end_column=rng.max_col + col_offset,
+                )
+        if not formats_only and src_ws is ws:
+            bounds = (source.min_row, source.min_col, source.max_row, last_col)
+
+            def _copies(sqref):
+                for row_offset in offsets:
+                    sqref = _copy_sqref(sqref, bounds, row_offset, col_offset)
+                return sqref
+
+            for dv in ws.data_validations.dataValidation:
+                dv.sqref = _copies(dv.sqref)
+            _rebuild_conditional_formatting(ws, _copies)
+        self._touch()
+
+    def expand_rows(self, first_row, height, insert_at, copies, formats_only=False, last_column=None):
+        """Version openpyxl de expand_row_block: una insercion y una copia repetida."""
+        total = height * copies
+        self.insert_rows(insert_at, total)
+        if first_row >= insert_at:
+            first_row += total
+        max_col = column_index_from_string(last_column) if last_column else _MAX_COLUMN
+        source = _Range(self, first_row, 1, first_row + height - 1, max_col)
+        self.copy_block(source, insert_at, 1, formats_only=formats_only, repeat=copies)
+        dims = self.ws.row_dimensions
+        for offset in range(height):
+            src_dim = dims[first_row + offset]
+            for idx in range(copies):
+                dest_dim = dims[insert_at + offset + height * idx]
+                dest_dim.height = src_dim.height
+                dest_dim.hidden = src_dim.hidden
+
+
+class _Range:
+    def __init__(self, sheet, min_row, min_col, max_row, max_col):
+        self.sheet = sheet
+        self.min_row = min_row
+        self.min_col = min_col
+        self.max_row = max_row
+        self.max_col = max_col
+
+    @property
+    def Row(self):
+        return self.min_row
+
+    @property
+    def Column(self):
+        return self.min_col
+
+    @property
+    def Rows(self):
+        return _Count(self.max_row - self.min_row + 1)
+
+    @property
+    def Columns(self):
+        return _Count(self.max_col - self.min_col + 1)
+
+    @property
+    def Value(self):
+        ws = self.sheet.ws
+        if self.min_row == self.max_row and self.min_col == self.max_col:
+            return ws.cell(row=self.min_row, column=self.min_col).value
+        # Como COM: un rango de varias celdas devuelve una tupla de filas.
+        last_col = self.sheet._last_column(self.max_col)
+        return tuple(
+            tuple(ws.cell(row=row, column=col).value for col in range(self.min_col, last_col + 1))
+            for row in range(self.min_row, self.max_row + 1)
+        )
+
+    @Value.setter
+    def Value(self, value):
+        ws = self.sheet.ws
+        if self.min_row == self.max_row and self.min_col == self.max_col:
+            # Como en Excel, el valor de una combinacion vive en su celda superior izquierda.
+            row, col = self.sheet._merged_anchor(self.min_row, self.min_col)
+            ws.cell(row=row, column=col).value = value
+            self.sheet._touch()
+            return
+        last_col = self.sheet._last_column(self.max_col)
+        for row in range(self.min_row, self.max_row + 1):
+            for col in range(self.min_col, last_col + 1):
+                cell = ws.cell(row=row, column=col)
+                if not isinstance(cell, MergedCell):
+                    cell.value = value
+        self.sheet._touch()
+
+    @property
+    def RowHeight(self):
+        return self.sheet._row_height(self.min_row)
+
+    @RowHeight.setter
+    def RowHeight(self, value):
+        for row in range(self.min_row, self.max_row + 1):
+            self.sheet.ws.row_dimensions[row].height = value
+        self.sheet._touch()
+
+    def Find(self, What, LookAt=XL_PART, **_kwargs):
+        target = str(What).strip().lower()
+        ws = self.sheet.ws
+        last_row = min(self.max_row, ws.max_row)
+        for row in range(self.min_row, last_row + 1):
+            for col in range(self.min_col, min(self.max_col, ws.max_column) + 1):
+                value = ws.cell(row=row, column=col).value
+                if value is None:
+                    continue
+                text = str(value).strip().lower()
+                if (LookAt == XL_WHOLE and text == target) or (LookAt != XL_WHOLE and target in text):
+                    return _Range(self.sheet, row, col, row, col)
+        return None
+
+    def Copy(self, Destination=None):
+        if Destination is None:
+            self.sheet.Application.clipboard = self
+            return True
+        Destination.sheet.copy_block(self, Destination.min_row, Destination.min_col)
+        return True
+
+    def PasteSpecial(self, Paste=XL_PASTE_FORMATS, **_kwargs):
+        clip = self.sheet.Application.clipboard
+        if clip is None:
+            raise RuntimeError("No hay rango copiado para pegar.")
+        self.sheet.copy_block(clip, self.min_row, self.min_col, formats_only=Paste == XL_PASTE_FORMATS)
+        return True
+
+    def Insert(self, Shift=XL_SHIFT_DOWN, **_kwargs):
+        """
+        Inserta filas completas (el unico caso que usan las plantillas). Si hay
+        un rango copiado, como en Excel, se insertan las celdas copiadas.
+        """
+        clip = self.sheet.Application.clipboard
+        amount = self.max_row - self.min_row + 1
+        if clip is not None:
+            amount = clip.max_row - clip.min_row + 1
+        self.sheet.insert_rows(self.min_row, amount)
+        if clip is not None:
+            if clip.sheet is self.sheet and clip.min_row >= self.min_row:
+                clip = _Range(clip.sheet, clip.min_row + amount, clip.min_col, clip.max_row + amount, clip.max_col)
+                self.sheet.Application.clipboard = clip
+            self.sheet.copy_block(clip, self.min_row, clip.min_col)
+        return True
+
+    def Delete(self, **_kwargs):
+        self.sheet.ws.delete_rows(self.min_row, self.max_row - self.min_row + 1)
+        self.sheet._touch()
+        return True
+
+
+def _shift_row_token(token, idx, amount):
+    absolute = token.startswith("$")
+    number = int(token.lstrip("$"))
+    if number >= idx:
+        number += amount
+    return f"{'$' if absolute else ''}{number}"
+
+
+def _shift_formula(formula, sheet_title, idx, amount):
+    parts = formula.split('"')
+    for pos in range(0, len(parts), 2):
+
+        def _replace(match):
+            sheet = match.group("sheet")
+            if sheet and sheet[:-1].strip("'") != sheet_title:
+                return match.group(0)
+            text = (sheet or "") + match.group("c1") + _shift_row_token(match.group("r1"), idx, amount)
+            if match.group("c2"):
+                text += ":" + match.group("c2") + _shift_row_token(match.group("r2"), idx, amount)
+            return text
+
+        parts[pos] = _REF_RE.sub(_replace, parts[pos])
+    return '"'.join(parts)
+
+
+def _shift_formulas(ws, idx, amount):
+    # Solo referencias de la misma hoja: las formulas de otras hojas no se tocan.
+    for cell in list(ws._cells.values()):
+        value = cell.value
+        if isinstance(value, str) and value.startswith("="):
+            cell.value = _shift_formula(value, ws.title, idx, amount)
+
+
+def _shift_sqref(sqref, idx, amount):
+    from openpyxl.worksheet.cell_range import MultiCellRange
+
+    ranges = []
+    for rng in sqref.ranges:
+        min_row, max_row = rng.min_row, rng.max_row
+        if min_row >= idx:
+            min_row += amount
+        if max_row >= idx:
+            max_row += amount
+        ranges.append(f"{get_column_letter(rng.min_col)}{min_row}:{get_column_letter(rng.max_col)}{max_row}")
+    return MultiCellRange(" ".join(ranges))
+
+
+def _copy_sqref(sqref, bounds, row_offset, col_offset):
+    from openpyxl.worksheet.cell_range import MultiCellRange
+
+    min_row, min_col, max_row, max_col = bounds
+    ranges = [rng.coord for rng in sqref.ranges]
+    for rng in sqref.ranges:
+        top, left = max(rng.min_row, min_row), max(rng.min_col, min_col)
+        bottom, right = min(rng.max_row, max_row), min(rng.max_col, max_col)
+        if top > bottom or left > right:
+            continue
+        ranges.append(
+            f"{get_column_letter(left + col_offset)}{top + row_offset}:"
+            f"{get_column_letter(right + col_offset)}{bottom + row_offset}"
+        )
+    return MultiCellRange(" ".join(ranges))
+
+
+def _rebuild_conditional_formatting(ws, transform):
+    from openpyxl.formatting.formatting import ConditionalFormattingList
+
+    old = ws.conditional_formatting
+    if not len(old._cf_rules):
+        return
+    fresh = ConditionalFormattingList()
+    for cf in old:
+        sqref = str(transform(cf.sqref))
+        for rule in cf.rules:
+            fresh.add(sqref, rule)
+    ws.conditional_formatting = fresh
+
+
+def _shift_anchor(anchor, idx, amount):
+    # Las anclas de dibujo usan filas base 0.
+    start = getattr(anchor, "_from", None)
+    if start is None or start.row < idx - 1:
+        return
+    start.row += amount
+    end = getattr(anchor, "to", None)
+    if end is not None:
+        end.row += amount
@@ -0,0 +1,184 @@
+import atexit
+import os
+import threading
+import time
+from collections import deque
+
+
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+LOG_BUFFER_LINES = 5000
+LOG_FLUSH_SECONDS = 1.0
+LOG_VERBOSE_ENV = "RECA_EXCEL_LOG_VERBOSE"
+
+# Mensajes por celda: en modo estructurado se cuentan pero no se escriben.
+DETAIL_PREFIXES = ("WRITE ", "INSERT ")
+SECTION_PREFIX = "SECTION "
+END_PREFIXES = ("SUCCESS ", "ERROR ")
+
+_LOGGERS = {}
+_LOGGERS_LOCK = threading.Lock()
+
+
+def is_verbose():
+    return (os.getenv(LOG_VERBOSE_ENV) or "").strip().lower() in {"1", "true", "si", "yes"}
+
+
+class BufferedLog:
+    """
+    Log de texto con buffer en memoria (anillo de LOG_BUFFER_LINES lineas) y un
+    hilo que vuelca a disco cada LOG_FLUSH_SECONDS. Rota por tamano conservando
+    `backup_count` archivos (nombre.txt.1, nombre.txt.2...).
+
+    Sin modo verbose las lineas WRITE/INSERT no se escriben: por cada seccion
+    queda una linea TIMING con el total de celdas y el tiempo transcurrido.
+    La seccion abierta se guarda por exportacion (carpeta de log e hilo), asi
+    exportaciones en paralelo no se cierran las secciones entre si. Fuera de
+    una seccion las lineas WRITE/INSERT se escriben como en modo verbose.
+    """
+
+    def __init__(
+        self,
+        file_name,
+        max_bytes=LOG_MAX_BYTES,
+        backup_count=LOG_BACKUP_COUNT,
+        capacity=LOG_BUFFER_LINES,
+        flush_interval=LOG_FLUSH_SECONDS,
+        verbose=None,
+    ):
+        self.file_name = file_name
+        self.max_bytes = max_bytes
+        self.backup_count = max(0, int(backup_count))
+        self.flush_interval = flush_interval
+        self.verbose = verbose
+        self._buffer = deque(maxlen=max(1, int(capacity)))
+        self._dropped = 0
+        self._sections = {}
+        self._known_dirs = set()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def _is_verbose(self):
+        return is_verbose() if self.verbose is None else self.verbose
+
+    def log(self, message, log_dir=None):
+        log_dir = log_dir or os.path.join(os.getcwd(), "logs")
+        now = time.time()
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+        message = str(message)
+        export_key = (log_dir, threading.get_ident())
+        with self._lock:
+            if not self._is_verbose():
+                if message.startswith(DETAIL_PREFIXES):
+                    section = self._sections.get(export_key)
+                    if section is not None:
+                        section["writes"] += 1
+                        return
+                if message.startswith(SECTION_PREFIX) or message.startswith(END_PREFIXES):
+                    self._close_section_locked(export_key, now, stamp)
+                if message.startswith(SECTION_PREFIX):
+                    self._sections[export_key] = {"name": message[len(SECTION_PREFIX):], "start": now, "writes": 0}
+            self._append_locked(log_dir, f"[{stamp}] {message}\n")
+            urgent = message.startswith(END_PREFIXES) or len(self._buffer) >= self._buffer.maxlen // 2
+        self._ensure_thread()
+        if urgent:
+            self._wake.set()
+
+    def _close_section_locked(self, export_key, now, stamp):
+        section = self._sections.pop(export_key, None)
+        if section is None:
+            return
+        log_dir = export_key[0]
+        elapsed_ms = int((now - section["start"]) * 1000)
+        self._append_locked(
+            log_dir,
+            f"[{stamp}] TIMING {section['name']} writes={section['writes']} elapsed_ms={elapsed_ms}\n",
+        )
+
+    def _append_locked(self, log_dir, line):
+        if len(self._buffer) == self._buffer.maxlen:
+            self._dropped += 1
+        self._buffer.append((log_dir, line))
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=f"log-{self.file_name}", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._buffer:
+                return
+            pending = list(self._buffer)
+            self._buffer.clear()
+            dropped = self._dropped
+            self._dropped = 0
+        by_dir = {}
+        for log_dir, line in pending:
+            by_dir.setdefault(log_dir, []).append(line)
+        if dropped:
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+            first_dir = pending[0][0]
+            by_dir[first_dir].insert(0, f"[{stamp}] DROPPED lines={dropped}\n")
+        with self._write_lock:
+            for log_dir, lines in by_dir.items():
+                try:
+                    self._write_lines(log_dir, "".join(lines))
+                except OSError:
+                    continue
+
+    def _write_lines(self, log_dir, text):
+        if log_dir not in self._known_dirs:
+            os.makedirs(log_dir, exist_ok=True)
+            self._known_dirs.add(log_dir)
+        path = os.path.join(log_dir, self.file_name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if size and size + len(text) > self.max_bytes:
+            self._rotate(path)
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.write(text)
+
+    def _rotate(self, path):
+        if self.backup_count <= 0:
+            open(path, "w", encoding="utf-8").close()
+            return
+        for idx in range(self.backup_count - 1, 0, -1):
+            src = f"{path}.{idx}"
+            if os.path.exists(src):
+                os.replace(src, f"{path}.{idx + 1}")
+        os.replace(path, f"{path}.1")
+
+
+def get_log(file_name):
+    """Devuelve el BufferedLog unico del proceso para `file_name`."""
+    with _LOGGERS_LOCK:
+        logger = _LOGGERS.get(file_name)
+        if logger is None:
+            logger = BufferedLog(file_name)
+            _LOGGERS[file_name] = logger
+        return logger
+
+
+def flush_all():
+    with _LOGGERS_LOCK:
+        loggers = list(_LOGGERS.values())
+    for logger in loggers:
+        logger.flush()
+
+
+atexit.register(flush_all)
@@ -0,0 +1,339 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from formularios.common import _atomic_write_json, _get_cache_dir
+
+
+REPLICATION_STATE_NAME = "replicacion_archivos.json"
+REPLICATION_POLL_SECONDS = 0.6
+REPLICATION_MAX_BACKOFF = 300
+CONFLICT_DIR_NAME = "Conflictos"
+# Conflictos ya resueltos que se conservan en el estado (historial).
+RESOLVED_CONFLICTS_KEEP = 50
+
+_LOCK = threading.Lock()
+_STATE = {"jobs": [], "bases": {}, "conflicts": []}
+_LOADED = False
+_WORKER_STARTED = False
+_WAKE = threading.Event()
+
+
+def _get_state_path():
+    return os.path.join(_get_cache_dir(), REPLICATION_STATE_NAME)
+
+
+def _key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _load_state_locked():
+    global _LOADED
+    if _LOADED:
+        return
+    _LOADED = True
+    path = _get_state_path()
+    if not os.path.exists(path):
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            data = json.load(handle) or {}
+    except (OSError, json.JSONDecodeError):
+        return
+    if isinstance(data, dict):
+        for name in ("jobs", "conflicts"):
+            if isinstance(data.get(name), list):
+                _STATE[name] = data[name]
+        if isinstance(data.get("bases"), dict):
+            _STATE["bases"] = data["bases"]
+
+
+def _persist_locked():
+    try:
+        _atomic_write_json(_get_state_path(), _STATE)
+    except OSError:
+        pass
+
+
+def file_fingerprint(path, with_hash=True):
+    """{"mtime_ns", "size", "sha256"} del archivo, o None si no existe."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    fingerprint = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(path, "rb") as handle:
+            for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+                digest.update(chunk)
+        fingerprint["sha256"] = digest.hexdigest()
+    return fingerprint
+
+
+def _same_stat(left, right):
+    return bool(left and right) and left["mtime_ns"] == right["mtime_ns"] and left["size"] == right["size"]
+
+
+def _remember_base_locked(target):
+    fingerprint = file_fingerprint(target)
+    if fingerprint:
+        _STATE["bases"][_key(target)] = fingerprint
+
+
+def remember_base(target):
+    """Registra el estado de `target` como la ultima version conocida (sin conflicto)."""
+    with _LOCK:
+        _load_state_locked()
+        _remember_base_locked(target)
+        _persist_locked()
+
+
+def remote_changed(target):
+    """
+    True si `target` cambio desde la ultima version conocida (otro equipo lo
+    edito). Compara mtime y tamano y solo calcula el hash si difieren.
+    """
+    with _LOCK:
+        _load_state_locked()
+        base = dict(_STATE["bases"].get(_key(target)) or {})
+    current = file_fingerprint(target, with_hash=False)
+    if not base or current is None:
+        return current is not None
+    if _same_stat(base, current):
+        return False
+    current = file_fingerprint(target)
+    if current is None:
+        return False
+    if current["sha256"] == base.get("sha256"):
+        # Mismo contenido con otra fecha (p.ej. una copia): se actualiza la base.
+        remember_base(target)
+        return False
+    return True
+
+
+def has_pending(source):
+    """True si hay una copia de `source` pendiente de replicar."""
+    source_key = _key(source)
+    with _LOCK:
+        _load_state_locked()
+        return any(_key(job["source"]) == source_key for job in _STATE["jobs"])
+
+
+def _open_conflict_locked(target):
+    target_key = _key(target)
+    return any(
+        _key(item.get("target") or "") == target_key and not item.get("resolved_at")
+        for item in _STATE["conflicts"]
+    )
+
+
+def get_conflicts(limit=50, include_resolved=False):
+    """Conflictos sin resolver (con `include_resolved`, tambien el historial)."""
+    with _LOCK:
+        _load_state_locked()
+        items = [item for item in _STATE["conflicts"] if include_resolved or not item.get("resolved_at")]
+        return [dict(item) for item in items[-limit:]]
+
+
+def resolve_conflicts(target, keep_source):
+    """
+    Cierra los conflictos abiertos de `target`. Con `keep_source` el job
+    pendiente vuelve a correr y pisa el destino con la version local; sin el,
+    se descartan los jobs hacia `target` (el llamador trae la version remota).
+    Devuelve cuantos conflictos se cerraron.
+    """
+    fingerprint = file_fingerprint(target)
+    with _LOCK:
+        _load_state_locked()
+        target_key = _key(target)
+        now = time.time()
+        closed = 0
+        for item in _STATE["conflicts"]:
+            if _key(item.get("target") or "") == target_key and not item.get("resolved_at"):
+                item["resolved_at"] = now
+                item["resolution"] = "local" if keep_source else "remote"
+                closed += 1
+        # La version actual del destino pasa a ser la base: ya no es un cambio ajeno.
+        if fingerprint:
+            _STATE["bases"][target_key] = fingerprint
+        if not keep_source:
+            _STATE["jobs"] = [job for job in _STATE["jobs"] if _key(job["target"]) != target_key]
+        resolved = [item for item in _STATE["conflicts"] if item.get("resolved_at")]
+        stale = {id(item) for item in resolved[:-RESOLVED_CONFLICTS_KEEP]}
+        _STATE["conflicts"] = [item for item in _STATE["conflicts"] if id(item) not in stale]
+        _persist_locked()
+    _WAKE.set()
+    return closed
+
+
+def enqueue_file_replication(source, targets):
+    """
+    Encola la copia de `source` a cada destino. Un job pendiente para el mismo
+    destino se reutiliza: al correr copia la version mas reciente de `source`.
+    """
+    targets = [target for target in targets or [] if target and _key(target) != _key(source)]
+    if not targets:
+        return 0
+    with _LOCK:
+        _load_state_locked()
+        pending = {(_key(job["source"]), _key(job["target"])): job for job in _STATE["jobs"]}
+        now = time.time()
+        for target in targets:
+            job = pending.get((_key(source), _key(target)))
+            if job is not None:
+                # Si el job ya esta copiando, requested_at hace que corra otra vez.
+                job["requested_at"] = now
+                continue
+            _STATE["jobs"].append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "source": source,
+                    "target": target,
+                    "attempts": 0,
+                    "next_try_at": now,
+                    "requested_at": now,
+                    "last_error": "",
+                }
+            )
+        _persist_locked()
+    _ensure_replication_worker()
+    _WAKE.set()
+    return len(targets)
+
+
+def _conflict_path(target):
+    # En una subcarpeta: quien busca el libro en la carpeta del destino no
+    # debe tomar la copia en conflicto por el original.
+    stem, ext = os.path.splitext(os.path.basename(target))
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return os.path.join(os.path.dirname(target), CONFLICT_DIR_NAME, f"{stem} (conflicto {stamp}){ext}")
+
+
+def _copy_atomic(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+    try:
+        shutil.copy2(source, tmp_path)
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def _replicate(job):
+    """Devuelve "copied", "skipped" o "conflict"; los errores de disco se propagan."""
+    source, target = job["source"], job["target"]
+    source_fp = file_fingerprint(source)
+    if source_fp is None:
+        return "skipped"
+    with _LOCK:
+        base = dict(_STATE["bases"].get(_key(target)) or {})
+    target_fp = file_fingerprint(target)
+    if target_fp is not None:
+        if target_fp["sha256"] == source_fp["sha256"]:
+            with _LOCK:
+                _STATE["bases"][_key(target)] = target_fp
+            return "skipped"
+        if base.get("sha256") and target_fp["sha256"] != base["sha256"]:
+            # El destino cambio por fuera desde la ultima sincronizacion: no se pisa.
+            conflict_path = _conflict_path(target)
+            _copy_atomic(source, conflict_path)
+            with _LOCK:
+                _STATE["conflicts"].append(
+                    {
+                        "id": str(uuid.uuid4()),
+                        "source": source,
+                        "target": target,
+                        "conflict_copy": conflict_path,
+                        "detected_at": time.time(),
+                        "resolved_at": None,
+                    }
+                )
+            return "conflict"
+    _copy_atomic(source, target)
+    with _LOCK:
+        _remember_base_locked(target)
+    return "copied"
+
+
+def _replication_worker_loop():
+    while True:
+        _WAKE.wait(REPLICATION_POLL_SECONDS)
+        _WAKE.clear()
+        job = None
+        with _LOCK:
+            now = time.time()
+            for item in _STATE["jobs"]:
+                # Con un conflicto abierto el destino no se toca hasta resolverlo.
+                if float(item.get("next_try_at") or 0) <= now and not _open_conflict_locked(item["target"]):
+                    job = dict(item)
+                    break
+        if not job:
+            continue
+        started = time.time()
+        try:
+            result = _replicate(job)
+        except OSError as exc:
+            # Unidad compartida no disponible o archivo en uso: se reintenta.
+            with _LOCK:
+                for item in _STATE["jobs"]:
+                    if item["id"] == job["id"]:
+                        item["attempts"] = int(item.get("attempts") or 0) + 1
+                        item["last_error"] = str(exc)
+                        item["next_try_at"] = time.time() + min(
+                            REPLICATION_MAX_BACKOFF, 5 * (2 ** min(item["attempts"], 6))
+                        )
+                _persist_locked()
+            continue
+        with _LOCK:
+            if result != "conflict":
+                _STATE["jobs"] = [
+                    item
+                    for item in _STATE["jobs"]
+                    if item["id"] != job["id"] or float(item.get("requested_at") or 0) > started
+                ]
+            _persist_locked()
+        _WAKE.set()
+
+
+def _ensure_replication_worker():
+    global _WORKER_STARTED
+    with _LOCK:
+        if _WORKER_STARTED:
+            return
+        _load_state_locked()
+        _WORKER_STARTED = True
+    threading.Thread(target=_replication_worker_loop, name="file-replication", daemon=True).start()
+
+
+def start_replication():
+    """Arranca el hilo de replicacion y retoma los jobs que quedaron pendientes."""
+    _ensure_replication_worker()
+    _WAKE.set()
+
+
+def wait_idle(timeout=None):
+    """Espera a que no queden jobs listos para correr (para scripts y pruebas)."""
+    deadline = None if timeout is None else time.time() + timeout
+    while True:
+        with _LOCK:
+            ready = [
+                job
+                for job in _STATE["jobs"]
+                if float(job.get("next_try_at") or 0) <= time.time() and not _open_conflict_locked(job["target"])
+            ]
+        if not ready:
+            return True
+        if deadline is not None and time.time() >= deadline:
+            return False
+        _WAKE.set()
+        time.sleep(0.05)
@@ -0,0 +1,198 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from formularios.common import _get_cache_dir, _supabase_enqueue_upsert
+from formularios.excel_backend import load_config
+
+
+RECORDS_DB_NAME = "formatos_registros_il.sqlite3"
+RECORDS_SCHEMA_VERSION = 1
+RECORDS_TABLE = "formatos_registros_il"
+RECORDS_REPLICATE_ENV = "RECA_FORM_RECORDS_SUPABASE"
+
+_SCHEMA = """
+create table if not exists form_records (
+    record_id text primary key,
+    form_id text not null,
+    nit_empresa text not null default '',
+    nombre_empresa text not null default '',
+    profesional text not null default '',
+    fecha_visita text not null default '',
+    output_path text not null default '',
+    exported_at text not null
+);
+create index if not exists idx_form_records_form on form_records (form_id, exported_at);
+create index if not exists idx_form_records_nit on form_records (nit_empresa, exported_at);
+create index if not exists idx_form_records_exported on form_records (exported_at);
+create table if not exists form_record_sections (
+    record_id text not null references form_records (record_id) on delete cascade,
+    section_id text not null,
+    payload text not null,
+    primary key (record_id, section_id)
+);
+"""
+
+_LOCK = threading.Lock()
+_READY = set()
+# Profesional con sesion abierta en la app; respaldo para formularios cuya
+# seccion 1 no trae profesional_asignado (p.ej. sensibilizacion).
+_SESSION_PROFESIONAL = {"nombre": ""}
+
+
+def _get_db_path():
+    return os.path.join(_get_cache_dir(), RECORDS_DB_NAME)
+
+
+def _connect():
+    path = _get_db_path()
+    conn = sqlite3.connect(path, timeout=10)
+    conn.row_factory = sqlite3.Row
+    conn.execute("pragma foreign_keys = on")
+    if path not in _READY:
+        conn.execute("pragma journal_mode = wal")
+        if conn.execute("pragma user_version").fetchone()[0] < RECORDS_SCHEMA_VERSION:
+            conn.executescript(_SCHEMA)
+            conn.execute(f"pragma user_version = {RECORDS_SCHEMA_VERSION}")
+            conn.commit()
+        _READY.add(path)
+    return conn
+
+
+def _now_colombia():
+    try:
+        return datetime.now(ZoneInfo("America/Bogota"))
+    except Exception:
+        return datetime.now()
+
+
+def _replication_enabled():
+    value = os.getenv(RECORDS_REPLICATE_ENV)
+    if value is None:
+        value = load_config().get("form_records_supabase")
+    return str(value or "").strip().lower() in {"1", "true", "si", "yes"}
+
+
+def set_session_profesional(nombre):
+    _SESSION_PROFESIONAL["nombre"] = str(nombre or "").strip()
+
+
+def _record_profesional(section_1):
+    """profesional_asignado del formulario; si falta, el de la sesion y por ultimo el asesor."""
+    return (
+        str(section_1.get("profesional_asignado") or "").strip()
+        or _SESSION_PROFESIONAL["nombre"]
+        or str(section_1.get("asesor") or "").strip()
+    )
+
+
+def normalize_cache(cache):
+    """Secciones del FORM_CACHE sin las claves internas (_output_path, _last_section...)."""
+    return {
+        str(section_id): payload
+        for section_id, payload in (cache or {}).items()
+        if not str(section_id).startswith("_")
+    }
+
+
+def record_export(form_id, cache, output_path=None):
+    """
+    Guarda el formulario exportado en el registro local (una fila por
+    formulario y una por seccion) y, si esta activo, lo encola para Supabase.
+    Nunca interrumpe la exportacion: ante un error devuelve None.
+    """
+    sections = normalize_cache(cache)
+    section_1 = sections.get("section_1") or {}
+    if not isinstance(section_1, dict):
+        section_1 = {}
+    record = {
+        "record_id": str(uuid.uuid4()),
+        "form_id": form_id,
+        "nit_empresa": str(section_1.get("nit_empresa") or "").strip(),
+        "nombre_empresa": str(section_1.get("nombre_empresa") or "").strip(),
+        "profesional": _record_profesional(section_1),
+        "fecha_visita": str(section_1.get("fecha_visita") or "").strip(),
+        "output_path": output_path or "",
+        "exported_at": _now_colombia().isoformat(timespec="seconds"),
+    }
+    try:
+        with _LOCK:
+            conn = _connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "insert into form_records (record_id, form_id, nit_empresa, nombre_empresa, "
+                        "profesional, fecha_visita, output_path, exported_at) "
+                        "values (:record_id, :form_id, :nit_empresa, :nombre_empresa, "
+                        ":profesional, :fecha_visita, :output_path, :exported_at)",
+                        record,
+                    )
+                    conn.executemany(
+                        "insert into form_record_sections (record_id, section_id, payload) values (?, ?, ?)",
+                        [
+                            (record["record_id"], section_id, json.dumps(payload, ensure_ascii=False, sort_keys=True))
+                            for section_id, payload in sections.items()
+                        ],
+                    )
+            finally:
+                conn.close()
+    except (sqlite3.Error, OSError, TypeError, ValueError):
+        return None
+
+    if _replication_enabled():
+        row = dict(record)
+        row.pop("output_path")
+        row["secciones"] = sections
+        try:
+            _supabase_enqueue_upsert(RECORDS_TABLE, [row], on_conflict="record_id")
+        except Exception:
+            pass
+    return record["record_id"]
+
+
+def query_records(form_id=None, nit_empresa=None, since=None, limit=None):
+    """Registros mas recientes primero, filtrados por formulario, NIT y fecha (ISO)."""
+    clauses = []
+    params = []
+    if form_id:
+        clauses.append("form_id = ?")
+        params.append(form_id)
+    if nit_empresa:
+        clauses.append("nit_empresa = ?")
+        params.append(str(nit_empresa).strip())
+    if since:
+        clauses.append("exported_at >= ?")
+        params.append(str(since))
+    sql = "select * from form_records"
+    if clauses:
+        sql += " where " + " and ".join(clauses)
+    sql += " order by exported_at desc, rowid desc"
+    if limit:
+        sql += " limit ?"
+        params.append(int(limit))
+    with _LOCK:
+        conn = _connect()
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+
+def get_record_sections(record_id, section_ids=None):
+    """{section_id: payload} de un registro; con `section_ids` solo esas secciones."""
+    sql = "select section_id, payload from form_record_sections where record_id = ?"
+    params = [record_id]
+    if section_ids:
+        section_ids = list(section_ids)
+        sql += f" and section_id in ({', '.join('?' for _ in section_ids)})"
+        params.extend(section_ids)
+    with _LOCK:
+        conn = _connect()
+        try:
+            return {row["section_id"]: json.loads(row["payload"]) for row in conn.execute(sql, params)}
+        finally:
+            conn.close()
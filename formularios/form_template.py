@@ -9,6 +9,9 @@ from formularios.common import (
     _normalize_text,
     _sanitize_filename,
     _supabase_get,
+    _cancel_cache_write,
+    _flush_cache_writes,
+    _schedule_cache_write,
 )
 
 
@@ -147,7 +150,9 @@ def _get_cache_path():
 
 
 def cache_file_exists():
-    return os.path.exists(_get_cache_path())
+    path = _get_cache_path()
+    _flush_cache_writes(path)
+    return os.path.exists(path)
 
 
 def save_cache_to_file():
@@ -156,12 +161,12 @@ def save_cache_to_file():
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
         "data": FORM_CACHE,
     }
-    with open(_get_cache_path(), "w", encoding="utf-8") as handle:
-        json.dump(payload, handle, ensure_ascii=False, indent=2)
+    _schedule_cache_write(_get_cache_path(), payload)
 
 
 def load_cache_from_file():
     path = _get_cache_path()
+    _flush_cache_writes(path)
     if not os.path.exists(path):
         return False
     with open(path, "r", encoding="utf-8") as handle:
@@ -177,6 +182,7 @@ def load_cache_from_file():
 
 def clear_cache_file():
     path = _get_cache_path()
+    _cancel_cache_write(path)
     if os.path.exists(path):
         os.remove(path)
 
@@ -220,9 +226,9 @@ def get_empresa_by_nombre(nombre, env_path=".env"):
     return data[0]
 
 
-def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10):
+def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10, with_truncated=False):
     return evaluacion_accesibilidad.get_empresas_by_nombre_prefix(
-        prefix, env_path=env_path, limit=limit
+        prefix, env_path=env_path, limit=limit, with_truncated=with_truncated
     )
 
 
@@ -10,7 +10,18 @@ from formularios.common import (
     _normalize_text,
     _sanitize_filename,
     _supabase_get,
+    _cancel_cache_write,
+    _flush_cache_writes,
+    _schedule_cache_write,
 )
+from formularios.excel_backend import expand_row_block, open_workbook
+from formularios.form_records import record_export
+from formularios.template_registry import (
+    bound_sheet,
+    find_anchor_row,
+    get_template_path,
+)
+from formularios.cedula_catalog import get_cedula_catalog
 
 
 FORM_ID = "induccion_organizacional"
@@ -393,7 +404,9 @@ def _get_cache_path():
 
 
 def cache_file_exists():
-    return os.path.exists(_get_cache_path())
+    path = _get_cache_path()
+    _flush_cache_writes(path)
+    return os.path.exists(path)
 
 
 def save_cache_to_file():
@@ -402,12 +415,12 @@ def save_cache_to_file():
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
         "data": FORM_CACHE,
     }
-    with open(_get_cache_path(), "w", encoding="utf-8") as handle:
-        json.dump(payload, handle, ensure_ascii=False, indent=2)
+    _schedule_cache_write(_get_cache_path(), payload)
 
 
 def load_cache_from_file():
     path = _get_cache_path()
+    _flush_cache_writes(path)
     if not os.path.exists(path):
         return False
     with open(path, "r", encoding="utf-8") as handle:
@@ -423,6 +436,7 @@ def load_cache_from_file():
 
 def clear_cache_file():
     path = _get_cache_path()
+    _cancel_cache_write(path)
     if os.path.exists(path):
         os.remove(path)
 
@@ -443,13 +457,7 @@ def get_form_cache():
 
 
 def get_usuarios_reca_cedulas(env_path=".env"):
-    params = {
-        "select": "cedula_usuario",
-        "cedula_usuario": "not.is.null",
-        "order": "cedula_usuario.asc",
-    }
-    data = _supabase_get("usuarios_reca", params, env_path=env_path)
-    return [row.get("cedula_usuario") for row in data if row.get("cedula_usuario")]
+    return get_cedula_catalog(env_path=env_path).values()
 
 
 def get_usuario_reca_by_cedula(cedula, env_path=".env"):
@@ -481,9 +489,9 @@ def get_empresa_by_nombre(nombre, env_path=".env"):
     return evaluacion_accesibilidad.get_empresa_by_nombre(nombre, env_path=env_path)
 
 
-def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10):
+def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10, with_truncated=False):
     return evaluacion_accesibilidad.get_empresas_by_nombre_prefix(
-        prefix, env_path=env_path, limit=limit
+        prefix, env_path=env_path, limit=limit, with_truncated=with_truncated
     )
 
 
@@ -550,21 +558,7 @@ def confirm_section_6(payload):
 
 
 def _find_template_path():
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-    templates_dir = os.path.join(base_dir, "templates")
-    if not os.path.isdir(templates_dir):
-        raise FileNotFoundError("No existe la carpeta templates.")
-    for name in os.listdir(templates_dir):
-        if name.startswith("~$"):
-            continue
-        normalized = _normalize_text(name).replace("_", "")
-        if (
-            "induccion" in normalized
-            and "organizacional" in normalized
-            and normalized.endswith(".xlsx")
-        ):
-            return os.path.join(templates_dir, name)
-    raise FileNotFoundError("No se encontró el template de induccion organizacional.")
+    return get_template_path(FORM_ID)
 
 
 def _ensure_output_path():
@@ -592,6 +586,9 @@ def _get_sheet_by_name(workbook):
 
 
 def _find_row_by_text(ws, text):
+    row = find_anchor_row(ws, text)
+    if row is not None:
+        return row
     cell = ws.Columns("A").Find(What=text, LookAt=1)
     if cell is not None:
         return cell.Row
@@ -612,12 +609,6 @@ def _find_row_by_text(ws, text):
     raise ValueError(f"No se encontró el texto '{text}' en la columna A.")
 
 
-def _insert_vinculado_row(ws, insert_at):
-    ws.Rows(insert_at).Insert()
-    ws.Rows(SECTION_2_TEMPLATE_ROW).Copy(ws.Rows(insert_at))
-    ws.Rows(insert_at).RowHeight = ws.Rows(SECTION_2_TEMPLATE_ROW).RowHeight
-
-
 def _write_section_1(ws, payload):
     if not payload:
         payload = SECTION_1_CACHE
@@ -638,8 +629,7 @@ def _write_section_2(ws, payload):
         anchor_row = SECTION_2_TEMPLATE_ROW + 1
     total = len(payload)
     if total > 1:
-        for _ in range(total - 1):
-            _insert_vinculado_row(ws, anchor_row)
+        expand_row_block(ws, SECTION_2_TEMPLATE_ROW, 1, anchor_row, total - 1)
     for idx, row_data in enumerate(payload):
         target_row = SECTION_2_TEMPLATE_ROW + idx
         for field_id, col in SECTION_2_COL_MAP.items():
@@ -708,13 +698,7 @@ def _write_section_6(ws, payload):
     total = len(payload)
 
     if total > base_rows:
-        insert_at = start_row + base_rows
-        template_row = start_row + base_rows - 1
-        for _ in range(total - base_rows):
-            ws.Rows(insert_at).Insert()
-            ws.Rows(template_row).Copy(ws.Rows(insert_at))
-            ws.Rows(insert_at).RowHeight = ws.Rows(template_row).RowHeight
-            insert_at += 1
+        expand_row_block(ws, start_row + base_rows - 1, 1, start_row + base_rows, total - base_rows)
 
     for idx, entry in enumerate(payload):
         row = start_row + idx
@@ -726,32 +710,30 @@ def _write_section_6(ws, payload):
             ws.Range(f"L{row}").Value = cargo
 
 
-def export_to_excel(clear_cache=True):
+_SECTION_WRITERS = (
+    ("section_1", _write_section_1, {}),
+    ("section_2", _write_section_2, []),
+    ("section_3", _write_section_3, {}),
+    ("section_4", _write_section_4, []),
+    ("section_5", _write_section_5, {}),
+    ("section_6", _write_section_6, []),
+)
+EXPORT_SECTIONS = tuple(section_id for section_id, _writer, _default in _SECTION_WRITERS)
+
+
+def export_to_excel(clear_cache=True, progress_callback=None, backend=None):
     output_path = _ensure_output_path()
     if not FORM_CACHE.get("section_1") and cache_file_exists():
         load_cache_from_file()
-    try:
-        import win32com.client as win32
-    except ImportError as exc:
-        raise RuntimeError("pywin32 no esta instalado. Instala con pip install pywin32.") from exc
-    excel = win32.DispatchEx("Excel.Application")
-    excel.Visible = False
-    excel.DisplayAlerts = False
-    wb = None
-    try:
-        wb = excel.Workbooks.Open(output_path)
+    with open_workbook(output_path, backend=backend) as wb:
         ws = _get_sheet_by_name(wb)
-        _write_section_1(ws, FORM_CACHE.get("section_1", {}))
-        _write_section_2(ws, FORM_CACHE.get("section_2", []))
-        _write_section_3(ws, FORM_CACHE.get("section_3", {}))
-        _write_section_4(ws, FORM_CACHE.get("section_4", []))
-        _write_section_5(ws, FORM_CACHE.get("section_5", {}))
-        _write_section_6(ws, FORM_CACHE.get("section_6", []))
+        with bound_sheet(ws, FORM_ID):
+            for section_id, writer, default in _SECTION_WRITERS:
+                if progress_callback:
+                    progress_callback(section_id)
+                writer(ws, FORM_CACHE.get(section_id, default))
         wb.Save()
-    finally:
-        if wb is not None:
-            wb.Close(SaveChanges=True)
-        excel.Quit()
+    record_export(FORM_ID, FORM_CACHE, output_path)
     if clear_cache:
         clear_cache_file()
         clear_form_cache()
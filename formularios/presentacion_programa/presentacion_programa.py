@@ -8,7 +8,14 @@ from formularios.common import (
     _normalize_text,
     _sanitize_filename,
     _supabase_get,
+    _cancel_cache_write,
+    _flush_cache_writes,
+    _schedule_cache_write,
 )
+from formularios.excel_backend import expand_row_block, open_workbook
+from formularios.export_log import get_log
+from formularios.form_records import record_export
+from formularios.template_registry import get_template_path
 
 FORM_NAME = "Presentacion/Reactivacion del programa de inclusion laboral"
 
@@ -333,7 +340,9 @@ def _get_cache_path():
 
 
 def cache_file_exists():
-    return os.path.exists(_get_cache_path())
+    path = _get_cache_path()
+    _flush_cache_writes(path)
+    return os.path.exists(path)
 
 
 def save_cache_to_file():
@@ -342,12 +351,12 @@ def save_cache_to_file():
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
         "data": FORM_CACHE,
     }
-    with open(_get_cache_path(), "w", encoding="utf-8") as handle:
-        json.dump(payload, handle, ensure_ascii=False, indent=2)
+    _schedule_cache_write(_get_cache_path(), payload)
 
 
 def load_cache_from_file():
     path = _get_cache_path()
+    _flush_cache_writes(path)
     if not os.path.exists(path):
         return False
     with open(path, "r", encoding="utf-8") as handle:
@@ -363,6 +372,7 @@ def load_cache_from_file():
 
 def clear_cache_file():
     path = _get_cache_path()
+    _cancel_cache_write(path)
     if os.path.exists(path):
         os.remove(path)
 
@@ -451,12 +461,14 @@ def get_empresa_by_nombre(nombre, env_path=".env"):
     return data[0]
 
 
-def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10):
+def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10, with_truncated=False):
+    """Nombres que empiezan por `prefix`; con `with_truncated`, (nombres, truncado)."""
+    empty = ([], False) if with_truncated else []
     if not prefix:
-        return []
+        return empty
     prefix = " ".join(str(prefix).split())
     if not prefix:
-        return []
+        return empty
     params = {
         "select": "nombre_empresa",
         "nombre_empresa": f"ilike.{prefix}%",
@@ -464,7 +476,7 @@ def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10):
     }
     data = _supabase_get("empresas", params, env_path=env_path)
     if not data:
-        return []
+        return empty
     names = []
     seen = set()
     for row in data:
@@ -475,6 +487,9 @@ def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10):
             continue
         seen.add(name)
         names.append(name)
+    if with_truncated:
+        # Se mide con las filas del servidor: sin repetidos puede haber menos de `limit` nombres.
+        return names, len(data) >= params["limit"]
     return names
 
 
@@ -574,52 +589,32 @@ def get_form_cache():
     return dict(FORM_CACHE)
 
 
+_EXCEL_LOG = get_log("excel_log.txt")
+
+
 def _get_log_dir(output_path=None):
     if output_path:
         base_dir = os.path.dirname(output_path)
     else:
         base_dir = os.getcwd()
     log_dir = os.path.join(base_dir, "logs")
-    os.makedirs(log_dir, exist_ok=True)
     return log_dir
 
 
 def _log_excel(message, output_path=None):
-    try:
-        log_dir = _get_log_dir(output_path)
-        log_path = os.path.join(log_dir, "excel_log.txt")
-        reset_log = False
-        if os.path.exists(log_path):
-            try:
-                if os.path.getsize(log_path) >= 5 * 1024 * 1024:
-                    reset_log = True
-            except OSError:
-                reset_log = True
-        if reset_log:
-            with open(log_path, "w", encoding="utf-8") as log_file:
-                log_file.write("")
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        with open(log_path, "a", encoding="utf-8") as log_file:
-            log_file.write(f"[{timestamp}] {message}\n")
-    except OSError:
-        return
+    _EXCEL_LOG.log(message, _get_log_dir(output_path))
 
 
 def _find_template_path(tipo_visita=None):
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-    templates_dir = os.path.join(base_dir, "templates")
-    if not os.path.isdir(templates_dir):
-        raise FileNotFoundError("No existe la carpeta templates.")
     visit_type = (tipo_visita or "").strip().lower()
-    keyword = "reactivacion" if visit_type == "reactivacion" else "presentacion"
-    for name in os.listdir(templates_dir):
-        normalized = _normalize_text(name)
-        if keyword in normalized and normalized.endswith(".xlsx"):
-            return os.path.join(templates_dir, name)
-    raise FileNotFoundError("No se encontró el template correspondiente.")
+    form_id = "reactivacion_programa" if visit_type == "reactivacion" else "presentacion_programa"
+    return get_template_path(form_id)
+
+
+EXPORT_SECTIONS = ("section_1", "section_3_item_8", "section_4", "section_5")
 
 
-def export_to_excel(cache=None):
+def export_to_excel(cache=None, progress_callback=None, backend=None):
     if cache is None:
         cache = FORM_CACHE
     section_1 = cache.get("section_1") or {}
@@ -647,87 +642,81 @@ def export_to_excel(cache=None):
     _log_excel(f"START export_all output={output_path}", output_path)
 
     try:
-        import win32com.client as win32
-    except ImportError as exc:
-        raise RuntimeError("pywin32 no está instalado. Instala con pip install pywin32.") from exc
-
-    excel = win32.DispatchEx("Excel.Application")
-    excel.Visible = False
-    excel.DisplayAlerts = False
-    wb = None
-    try:
-        wb = excel.Workbooks.Open(output_path)
-        ws = wb.Worksheets(1)
-
-        for key, cell in EXCEL_MAPPING["section_1"].items():
-            if key in section_1:
-                value = section_1.get(key)
+        with open_workbook(output_path, backend=backend) as wb:
+            ws = wb.Worksheets(1)
+
+            if progress_callback:
+                progress_callback("section_1")
+            _log_excel("SECTION export_all section=section_1", output_path)
+            for key, cell in EXCEL_MAPPING["section_1"].items():
+                if key in section_1:
+                    value = section_1.get(key)
+                    _log_excel(
+                        f"WRITE section=section_1 cell={cell} key={key} value={value!r}",
+                        output_path,
+                    )
+                    ws.Range(cell).Value = value
+
+            if progress_callback:
+                progress_callback("section_3_item_8")
+            _log_excel("SECTION export_all section=section_3_item_8", output_path)
+            for key, cell in EXCEL_MAPPING["section_3_item_8"].items():
+                value = section_3_item_8.get(key, False)
+                _log_excel(
+                    f"WRITE section=section_3_item_8 cell={cell} key={key} value={bool(value)!r}",
+                    output_path,
+                )
+                ws.Range(cell).Value = bool(value)
+
+            if progress_callback:
+                progress_callback("section_4")
+            _log_excel("SECTION export_all section=section_4", output_path)
+            for key, cell in EXCEL_MAPPING["section_4"].items():
+                if key in section_4:
+                    value = section_4.get(key)
+                    _log_excel(
+                        f"WRITE section=section_4 cell={cell} key={key} value={value!r}",
+                        output_path,
+                    )
+                    ws.Range(cell).Value = value
+
+            if progress_callback:
+                progress_callback("section_5")
+            _log_excel("SECTION export_all section=section_5", output_path)
+            section_5_cfg = EXCEL_MAPPING["section_5"]
+            start_row = section_5_cfg["start_row"]
+            name_col = section_5_cfg["name_col"]
+            cargo_col = section_5_cfg["cargo_col"]
+            total = len(section_5)
+            template_row = start_row + 2
+            if total > 3:
+                expand_row_block(ws, template_row, 1, start_row + 3, total - 3, formats_only=True)
+
+            for idx in range(total):
+                row = start_row + idx
+                entry = section_5[idx]
+                nombre = entry.get("nombre", "")
+                cargo = entry.get("cargo", "")
                 _log_excel(
-                    f"WRITE section=section_1 cell={cell} key={key} value={value!r}",
+                    f"WRITE section=section_5 cell={name_col}{row} key=nombre value={nombre!r}",
                     output_path,
                 )
-                ws.Range(cell).Value = value
-
-        for key, cell in EXCEL_MAPPING["section_3_item_8"].items():
-            value = section_3_item_8.get(key, False)
-            _log_excel(
-                f"WRITE section=section_3_item_8 cell={cell} key={key} value={bool(value)!r}",
-                output_path,
-            )
-            ws.Range(cell).Value = bool(value)
-
-        for key, cell in EXCEL_MAPPING["section_4"].items():
-            if key in section_4:
-                value = section_4.get(key)
                 _log_excel(
-                    f"WRITE section=section_4 cell={cell} key={key} value={value!r}",
+                    f"WRITE section=section_5 cell={cargo_col}{row} key=cargo value={cargo!r}",
                     output_path,
                 )
-                ws.Range(cell).Value = value
-
-        section_5_cfg = EXCEL_MAPPING["section_5"]
-        start_row = section_5_cfg["start_row"]
-        name_col = section_5_cfg["name_col"]
-        cargo_col = section_5_cfg["cargo_col"]
-        total = len(section_5)
-        template_row = start_row + 2
-        if total > 3:
-            insert_at = start_row + 3
-            extra_rows = total - 3
-            for _ in range(extra_rows):
-                ws.Rows(insert_at).Insert()
-                ws.Rows(template_row).Copy()
-                ws.Rows(insert_at).PasteSpecial(-4122)
-                insert_at += 1
-
-        for idx in range(total):
-            row = start_row + idx
-            entry = section_5[idx]
-            nombre = entry.get("nombre", "")
-            cargo = entry.get("cargo", "")
-            _log_excel(
-                f"WRITE section=section_5 cell={name_col}{row} key=nombre value={nombre!r}",
-                output_path,
-            )
-            _log_excel(
-                f"WRITE section=section_5 cell={cargo_col}{row} key=cargo value={cargo!r}",
-                output_path,
-            )
-            ws.Range(f"{name_col}{row}").Value = nombre
-            ws.Range(f"{cargo_col}{row}").Value = cargo
-            if idx >= 3:
-                ws.Range(f"A{row}").Value = "Nombre completo:"
-                ws.Range(f"L{row}").Value = "Cargo:"
-
-        wb.Save()
-        _log_excel("SUCCESS export_all", output_path)
+                ws.Range(f"{name_col}{row}").Value = nombre
+                ws.Range(f"{cargo_col}{row}").Value = cargo
+                if idx >= 3:
+                    ws.Range(f"A{row}").Value = "Nombre completo:"
+                    ws.Range(f"L{row}").Value = "Cargo:"
+
+            wb.Save()
+            _log_excel("SUCCESS export_all", output_path)
     except Exception as exc:
         _log_excel(f"ERROR export_all error={exc!r}", output_path)
         raise
-    finally:
-        if wb is not None:
-            wb.Close(SaveChanges=True)
-        excel.Quit()
+    record_export("presentacion_programa", cache, output_path)
     clear_cache_file()
     clear_form_cache()
     return output_path
@@ -0,0 +1,234 @@
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from formularios.common import _atomic_write_json, _get_cache_dir
+from formularios.seguimientos import seguimientos
+
+
+PORTFOLIO_CACHE_NAME = "seguimientos_tablero_cache.json"
+# Con pocos libros cambiados no vale la pena arrancar procesos.
+PORTFOLIO_MIN_PARALLEL = 8
+PORTFOLIO_MAX_WORKERS = 8
+
+NEXT_STEP_BASE = "Hoja base"
+NEXT_STEP_FINAL = "Ponderado final"
+
+_CACHE_LOCK = threading.Lock()
+
+
+def _get_cache_path():
+    return os.path.join(_get_cache_dir(), PORTFOLIO_CACHE_NAME)
+
+
+def _load_cache():
+    path = _get_cache_path()
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            data = json.load(handle) or {}
+    except (OSError, json.JSONDecodeError):
+        return {}
+    entries = data.get("entries") if isinstance(data, dict) else None
+    return entries if isinstance(entries, dict) else {}
+
+
+def _save_cache(entries):
+    try:
+        _atomic_write_json(_get_cache_path(), {"entries": entries})
+    except OSError:
+        pass
+
+
+def _root_workbooks(root):
+    """{carpeta: libro} de un root, usando el indice de casos."""
+    if not root or not os.path.isdir(root):
+        return {}
+    key = seguimientos._root_key(root)
+    with seguimientos._CASE_INDEX_LOCK:
+        conn = seguimientos._case_index_connect()
+        try:
+            with conn:
+                state = conn.execute("select mtime_ns from case_roots where root = ?", (key,)).fetchone()
+                if state is None:
+                    seguimientos._index_refresh(conn, root, full=True)
+                elif state[0] != seguimientos._root_mtime(root):
+                    seguimientos._index_refresh(conn, root)
+                rows = conn.execute(
+                    "select folder, workbook from case_folders where root = ? order by folder", (key,)
+                ).fetchall()
+        finally:
+            conn.close()
+    found = {}
+    for folder, workbook in rows:
+        if not workbook or not os.path.isfile(workbook):
+            workbook = seguimientos._find_excel_in_folder(os.path.join(root, folder))
+        if workbook:
+            found[folder] = workbook
+    return found
+
+
+def list_case_workbooks():
+    """
+    Un libro por caso entre el root compartido y el local. Gana el compartido,
+    salvo que la copia local tenga cambios sin replicar.
+    """
+    cases = {}
+    roots = seguimientos._get_roots()
+    for root in (roots.get("shared"), roots.get("local")):
+        try:
+            workbooks = _root_workbooks(root)
+        except (sqlite3.Error, OSError):
+            continue
+        for folder, workbook in workbooks.items():
+            cases.setdefault(folder, workbook)
+    return {folder: seguimientos._readable_copy(path) for folder, path in cases.items()}
+
+
+def _next_step_label(sheet):
+    if sheet == seguimientos.SHEET_BASE:
+        return NEXT_STEP_BASE
+    if sheet == seguimientos.SHEET_FINAL:
+        return NEXT_STEP_FINAL
+    if sheet.startswith(seguimientos.SHEET_PREFIX):
+        return f"Seguimiento {sheet[len(seguimientos.SHEET_PREFIX):]}"
+    return sheet
+
+
+def summarize_case(path):
+    """Fila del tablero para un libro de caso. Corre en los procesos del pool."""
+    summary = seguimientos.get_case_summary(path)
+    meta = summary["meta"]
+    max_seguimientos = meta["max_seguimientos"]
+    completed = sum(
+        1 for index, done in summary["followups_completed"].items() if done and index <= max_seguimientos
+    )
+    return {
+        "cedula": meta["cedula"],
+        "nombre_usuario": meta["nombre_usuario"],
+        "empresa": summary["base_info"]["empresa"],
+        "profesional": summary["base_info"]["profesional"],
+        "base_completa": summary["base_completed"],
+        "seguimientos_completados": completed,
+        "max_seguimientos": max_seguimientos,
+        "siguiente_paso": _next_step_label(summary["suggestion"]["sheet"]),
+    }
+
+
+def _summarize_safe(path):
+    try:
+        return path, summarize_case(path), ""
+    except Exception as exc:
+        return path, None, str(exc) or exc.__class__.__name__
+
+
+def _stat_key(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def scan_portfolio(workers=None, progress_callback=None):
+    """
+    Estado de todos los casos de seguimiento. Los libros sin cambios (misma
+    ruta, mtime y tamano) salen del cache; los demas se leen en un pool de
+    procesos. Devuelve una fila por caso, con "error" si el libro no se pudo leer.
+    """
+    cases = list_case_workbooks()
+    with _CACHE_LOCK:
+        cache = _load_cache()
+    rows = []
+    changed = []
+    stats = {}
+    for folder, path in sorted(cases.items()):
+        stat = _stat_key(path)
+        if stat is None:
+            continue
+        key = os.path.normcase(os.path.abspath(path))
+        stats[path] = stat
+        entry = cache.get(key)
+        if entry and entry.get("mtime_ns") == stat["mtime_ns"] and entry.get("size") == stat["size"]:
+            rows.append(dict(entry["row"], carpeta=folder, path=path, error=""))
+        else:
+            changed.append((folder, path))
+
+    total = len(changed)
+    if progress_callback:
+        progress_callback(0, total)
+    folders = {path: folder for folder, path in changed}
+    results = []
+    if total and (total < PORTFOLIO_MIN_PARALLEL or workers == 1):
+        for index, (_folder, path) in enumerate(changed, start=1):
+            results.append(_summarize_safe(path))
+            if progress_callback:
+                progress_callback(index, total)
+    elif total:
+        workers = max(1, min(workers or os.cpu_count() or 1, PORTFOLIO_MAX_WORKERS, total))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_summarize_safe, path) for _folder, path in changed]
+            for index, future in enumerate(as_completed(futures), start=1):
+                results.append(future.result())
+                if progress_callback:
+                    progress_callback(index, total)
+
+    for path, row, error in results:
+        folder = folders[path]
+        if row is None:
+            rows.append({"carpeta": folder, "path": path, "error": error})
+            continue
+        cache[os.path.normcase(os.path.abspath(path))] = dict(stats[path], row=row)
+        rows.append(dict(row, carpeta=folder, path=path, error=""))
+
+    live = {os.path.normcase(os.path.abspath(path)) for path in cases.values()}
+    with _CACHE_LOCK:
+        _save_cache({key: entry for key, entry in cache.items() if key in live})
+    rows.sort(key=lambda row: row["carpeta"].lower())
+    return rows
+
+
+def group_key(row):
+    """(profesional, empresa, siguiente paso) con que se agrupa una fila del tablero."""
+    if row.get("error"):
+        return ("", "", "Error de lectura")
+    return (
+        row.get("profesional") or "Sin profesional",
+        row.get("empresa") or "Sin empresa",
+        row.get("siguiente_paso") or "",
+    )
+
+
+def aggregate_portfolio(rows):
+    """
+    Casos agrupados por profesional, empresa y siguiente paso, con cuantos
+    tienen la hoja base completa y el total de seguimientos diligenciados.
+    """
+    groups = {}
+    for row in rows:
+        key = group_key(row)
+        group = groups.setdefault(
+            key,
+            {
+                "profesional": key[0],
+                "empresa": key[1],
+                "siguiente_paso": key[2],
+                "casos": 0,
+                "base_completa": 0,
+                "seguimientos_completados": 0,
+                "seguimientos_posibles": 0,
+            },
+        )
+        group["casos"] += 1
+        if row.get("error"):
+            continue
+        group["base_completa"] += 1 if row.get("base_completa") else 0
+        group["seguimientos_completados"] += int(row.get("seguimientos_completados") or 0)
+        group["seguimientos_posibles"] += int(row.get("max_seguimientos") or 0)
+    return sorted(
+        groups.values(),
+        key=lambda group: (group["profesional"].lower(), group["empresa"].lower(), group["siguiente_paso"]),
+    )
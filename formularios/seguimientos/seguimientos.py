@@ -1,15 +1,29 @@
+import json
 import os
+import posixpath
 import re
 import shutil
+import sqlite3
+import threading
+import time
+import uuid
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
 
 from openpyxl import load_workbook
 
 from formularios.common import (
+    _atomic_write_json,
+    _get_cache_dir,
     _get_desktop_dir,
     _normalize_cedula,
     _sanitize_filename,
     _supabase_get,
 )
+from formularios.template_registry import get_template_path
+from formularios.cedula_catalog import get_cedula_catalog
+from formularios import file_replication
 
 
 FORM_ID = "seguimientos"
@@ -20,6 +34,10 @@ SHEET_BASE = "9.  SEGUIMIENTO AL PROCESO DE I"
 SHEET_PREFIX = "SEGUIMIENTO PROCESO IL "
 SHEET_FINAL = "PONDERADO FINAL"
 SHEET_META = "_META_IL"
+BASE_REQUIRED_CELLS = ("A16", "E16", "A18", "N18")
+FOLLOWUP_REQUIRED_CELLS = ("O12", "R12", "J31")
+# Datos de la hoja base que se muestran en el tablero de casos.
+BASE_SUMMARY_CELLS = {"empresa": "D9", "profesional": "D13"}
 
 MODALIDAD_OPTIONS = ["Presencial", "Virtual", "Mixta", "No aplica"]
 SI_NO_NA_OPTIONS = ["Si", "No", "No aplica"]
@@ -74,16 +92,7 @@ def _get_roots():
 
 
 def _find_template_path():
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-    templates_dir = os.path.join(base_dir, "templates")
-    if not os.path.isdir(templates_dir):
-        raise FileNotFoundError("No existe la carpeta templates.")
-    for name in os.listdir(templates_dir):
-        if name.startswith("~$"):
-            continue
-        if name.lower().endswith(".xlsx") and "seguimiento" in name.lower():
-            return os.path.join(templates_dir, name)
-    raise FileNotFoundError("No se encontró el template de seguimientos.")
+    return get_template_path(FORM_ID)
 
 
 def _parse_first_name_lastname(full_name):
@@ -110,28 +119,186 @@ def _find_excel_in_folder(folder_path):
     if not os.path.isdir(folder_path):
         return None
     for name in os.listdir(folder_path):
-        if name.startswith("~$"):
+        if name.startswith("~$") or "(conflicto " in name:
             continue
         if name.lower().endswith(".xlsx"):
             return os.path.join(folder_path, name)
     return None
 
 
-def _scan_case_folder_by_cedula(root, cedula):
-    if not root or not os.path.isdir(root):
+CASE_INDEX_DB_NAME = "seguimientos_casos_index.sqlite3"
+CASE_INDEX_SCHEMA_VERSION = 1
+# Tras un fallo en el indice, la carpeta raiz se vuelve a revisar completa
+# como maximo una vez por este intervalo.
+CASE_INDEX_RESCAN_SECONDS = 600
+_CASE_FOLDER_RE = re.compile(r"- (\d+)$")
+
+_CASE_INDEX_SCHEMA = """
+create table if not exists case_folders (
+    root text not null,
+    folder text not null,
+    cedula text not null,
+    workbook text,
+    primary key (root, folder)
+);
+create index if not exists idx_case_folders_cedula on case_folders (root, cedula);
+create table if not exists case_roots (
+    root text primary key,
+    mtime_ns integer not null default 0,
+    scanned_at real not null default 0
+);
+"""
+
+_CASE_INDEX_LOCK = threading.Lock()
+_CASE_INDEX_READY = set()
+
+
+def _case_index_connect():
+    path = os.path.join(_get_cache_dir(), CASE_INDEX_DB_NAME)
+    conn = sqlite3.connect(path, timeout=10)
+    if path not in _CASE_INDEX_READY:
+        conn.execute("pragma journal_mode = wal")
+        if conn.execute("pragma user_version").fetchone()[0] < CASE_INDEX_SCHEMA_VERSION:
+            conn.executescript(_CASE_INDEX_SCHEMA)
+            conn.execute(f"pragma user_version = {CASE_INDEX_SCHEMA_VERSION}")
+            conn.commit()
+        _CASE_INDEX_READY.add(path)
+    return conn
+
+
+def _root_key(root):
+    return os.path.normcase(os.path.abspath(root))
+
+
+def _root_mtime(root):
+    try:
+        return os.stat(root).st_mtime_ns
+    except OSError:
         return None
-    suffix = f"- {cedula}"
-    for name in os.listdir(root):
+
+
+def _index_folder_rows(root, names):
+    rows = []
+    for name in names:
+        match = _CASE_FOLDER_RE.search(name)
+        if not match:
+            continue
         full = os.path.join(root, name)
         if not os.path.isdir(full):
             continue
-        if name.endswith(suffix):
-            found = _find_excel_in_folder(full)
-            if found:
-                return found
+        rows.append((_root_key(root), name, match.group(1), _find_excel_in_folder(full)))
+    return rows
+
+
+def _index_lookup(conn, root, cedula):
+    """Libro del caso segun el indice; las entradas que ya no existen se corrigen."""
+    key = _root_key(root)
+    found = conn.execute(
+        "select folder, workbook from case_folders where root = ? and cedula = ? order by folder",
+        (key, cedula),
+    ).fetchall()
+    for folder, workbook in found:
+        if workbook and os.path.isfile(workbook):
+            return workbook
+        # Carpeta sin libro al indexarla o libro renombrado: se revisa solo esa carpeta.
+        full = os.path.join(root, folder)
+        if not os.path.isdir(full):
+            conn.execute("delete from case_folders where root = ? and folder = ?", (key, folder))
+            continue
+        workbook = _find_excel_in_folder(full)
+        conn.execute(
+            "update case_folders set workbook = ? where root = ? and folder = ?",
+            (workbook, key, folder),
+        )
+        if workbook:
+            return workbook
     return None
 
 
+def _index_refresh(conn, root, full=False):
+    """
+    Agrega las carpetas nuevas y quita las borradas. Con `full` vuelve a
+    revisar todas las carpetas del root.
+    """
+    key = _root_key(root)
+    mtime = _root_mtime(root)
+    names = set(os.listdir(root))
+    if full:
+        conn.execute("delete from case_folders where root = ?", (key,))
+        new_names = names
+    else:
+        known = {row[0] for row in conn.execute("select folder from case_folders where root = ?", (key,))}
+        new_names = names - known
+        conn.executemany(
+            "delete from case_folders where root = ? and folder = ?",
+            [(key, name) for name in known - names],
+        )
+    conn.executemany(
+        "insert or replace into case_folders (root, folder, cedula, workbook) values (?, ?, ?, ?)",
+        _index_folder_rows(root, sorted(new_names)),
+    )
+    scanned_at = time.time() if full else None
+    conn.execute(
+        "insert into case_roots (root, mtime_ns, scanned_at) values (?, ?, coalesce(?, 0)) "
+        "on conflict(root) do update set mtime_ns = excluded.mtime_ns, "
+        "scanned_at = coalesce(?, case_roots.scanned_at)",
+        (key, mtime or 0, scanned_at, scanned_at),
+    )
+
+
+def _find_case_in_root(root, cedula):
+    """
+    Busca el caso en el indice SQLite del root. Si la carpeta raiz cambio
+    (mtime) se indexan solo las carpetas nuevas; si aun asi no aparece, se
+    revisa el root completo (como maximo cada CASE_INDEX_RESCAN_SECONDS).
+    """
+    if not root or not os.path.isdir(root):
+        return None
+    key = _root_key(root)
+    with _CASE_INDEX_LOCK:
+        conn = _case_index_connect()
+        try:
+            with conn:
+                found = _index_lookup(conn, root, cedula)
+                if found:
+                    return found
+                state = conn.execute(
+                    "select mtime_ns, scanned_at from case_roots where root = ?", (key,)
+                ).fetchone()
+                if state is None:
+                    _index_refresh(conn, root, full=True)
+                    return _index_lookup(conn, root, cedula)
+                if state[0] != _root_mtime(root):
+                    _index_refresh(conn, root)
+                    found = _index_lookup(conn, root, cedula)
+                    if found:
+                        return found
+                if time.time() - state[1] >= CASE_INDEX_RESCAN_SECONDS:
+                    _index_refresh(conn, root, full=True)
+                    return _index_lookup(conn, root, cedula)
+                return None
+        finally:
+            conn.close()
+
+
+def _index_case(root, folder_name, workbook):
+    match = _CASE_FOLDER_RE.search(folder_name)
+    if not root or not match:
+        return
+    with _CASE_INDEX_LOCK:
+        conn = _case_index_connect()
+        try:
+            with conn:
+                conn.execute(
+                    "insert or replace into case_folders (root, folder, cedula, workbook) values (?, ?, ?, ?)",
+                    (_root_key(root), folder_name, match.group(1), workbook),
+                )
+        except sqlite3.Error:
+            pass
+        finally:
+            conn.close()
+
+
 def find_case_workbook(cedula, nombre_usuario=""):
     normalized = _normalize_cedula(cedula)
     if not normalized:
@@ -144,10 +311,14 @@ def find_case_workbook(cedula, nombre_usuario=""):
             continue
         direct = _find_excel_in_folder(os.path.join(root, folder_name))
         if direct:
+            _index_case(root, folder_name, direct)
             return direct
-        scanned = _scan_case_folder_by_cedula(root, normalized)
-        if scanned:
-            return scanned
+        try:
+            found = _find_case_in_root(root, normalized)
+        except (sqlite3.Error, OSError):
+            found = None
+        if found:
+            return found
     return None
 
 
@@ -157,6 +328,112 @@ def _get_str(value):
     return str(value).strip()
 
 
+CASE_SESSION_LIMIT = 4
+
+
+def _save_workbook_atomic(wb, path):
+    """
+    Guarda en un temporal y lo reemplaza de una vez: el hilo de replicacion
+    nunca copia un libro a medio escribir.
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        wb.save(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+class CaseSession:
+    """
+    Libro de un caso cargado una sola vez. Las lecturas salen de memoria y las
+    escrituras quedan pendientes por hoja hasta save(). Si el archivo cambia
+    afuera (mtime o tamano, p.ej. otro profesional en la unidad compartida) se
+    recarga y las celdas pendientes se vuelven a aplicar encima.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._wb = None
+        self._stamp = None
+        self._pending = {}
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self):
+        wb = load_workbook(self.path, data_only=False)
+        for sheet_name, cells in self._pending.items():
+            if sheet_name in wb.sheetnames:
+                ws = wb[sheet_name]
+                for address, value in cells.items():
+                    ws[address].value = value
+        self._wb = wb
+        self._stamp = self._file_stamp()
+
+    def workbook(self):
+        if self._wb is None or self._file_stamp() != self._stamp:
+            self._load()
+        return self._wb
+
+    def sheet(self, sheet_name):
+        return _ensure_sheet_exists(self.workbook(), sheet_name)
+
+    def set_value(self, sheet_name, address, value):
+        self.sheet(sheet_name)[address].value = value
+        self._pending.setdefault(sheet_name, {})[address] = value
+
+    @property
+    def dirty_sheets(self):
+        return set(self._pending)
+
+    def save(self):
+        """Guarda en la copia local y encola la replicacion; no espera a la red."""
+        if not self._pending:
+            return False
+        wb = self.workbook()
+        _save_workbook_atomic(wb, self.path)
+        self._stamp = self._file_stamp()
+        self._pending.clear()
+        _write_sidecar(self.path, _summary_from_workbook(wb))
+        _replicate_case(self.path)
+        return True
+
+    def discard(self):
+        """Descarta los cambios pendientes; la siguiente lectura vuelve al archivo."""
+        self._pending.clear()
+        self._wb = None
+
+
+_CASE_SESSIONS = OrderedDict()
+
+
+def get_case_session(workbook_path):
+    """Sesion del caso (una por archivo, se conservan las ultimas CASE_SESSION_LIMIT)."""
+    if isinstance(workbook_path, CaseSession):
+        return workbook_path
+    working = prepare_working_copy(workbook_path)
+    key = os.path.normcase(os.path.abspath(working))
+    session = _CASE_SESSIONS.pop(key, None)
+    if session is None:
+        session = CaseSession(working)
+    _CASE_SESSIONS[key] = session
+    while len(_CASE_SESSIONS) > CASE_SESSION_LIMIT:
+        _old_key, old = next(iter(_CASE_SESSIONS.items()))
+        if old.dirty_sheets:
+            break
+        _CASE_SESSIONS.popitem(last=False)
+    return session
+
+
 def _set_if_empty(ws, cell, value):
     if ws[cell].value in (None, "") and value not in (None, ""):
         ws[cell].value = value
@@ -220,25 +497,104 @@ def _apply_visibility(wb, max_seguimientos):
         ws.sheet_state = "visible" if i <= limit else "hidden"
 
 
-def _copy_to_secondary_roots(primary_path):
-    roots = _get_roots()
-    local = roots.get("local")
-    shared = roots.get("shared")
-    if not primary_path or not os.path.exists(primary_path):
-        return
-    folder_name = os.path.basename(os.path.dirname(primary_path))
-    filename = os.path.basename(primary_path)
-    targets = []
-    if shared and not os.path.normcase(primary_path).startswith(os.path.normcase(shared)):
-        targets.append(os.path.join(shared, folder_name, filename))
-    if local and not os.path.normcase(primary_path).startswith(os.path.normcase(local)):
-        targets.append(os.path.join(local, folder_name, filename))
-    for target in targets:
-        try:
-            _ensure_dir(os.path.dirname(target))
-            shutil.copy2(primary_path, target)
-        except Exception:
+def _case_locations(path):
+    """
+    (copia de trabajo, copias remotas) de un libro de caso. La copia de
+    trabajo vive en el root local; las remotas son la del root compartido y
+    la ruta original si esta fuera de ambos roots. No toca la red: si el
+    compartido no esta disponible la replicacion lo reintenta.
+    """
+    folder_name = os.path.basename(os.path.dirname(path))
+    filename = os.path.basename(path)
+    working = os.path.join(_get_local_root(), folder_name, filename)
+    remotes = [os.path.join(SHARED_ROOT, folder_name, filename)]
+    known = {os.path.normcase(os.path.abspath(item)) for item in [working, *remotes]}
+    if os.path.normcase(os.path.abspath(path)) not in known:
+        remotes.append(path)
+    return working, remotes
+
+
+def prepare_working_copy(path):
+    """
+    Devuelve la copia local del caso para leer y guardar. Si la copia remota
+    cambio (otro profesional) y no hay cambios locales sin replicar, se trae
+    antes; con cambios locales pendientes gana la copia local y el conflicto
+    se detecta al replicar.
+    """
+    working, remotes = _case_locations(path)
+    for remote in remotes:
+        if not os.path.exists(remote):
             continue
+        refresh = not os.path.exists(working) or (
+            not file_replication.has_pending(working) and file_replication.remote_changed(remote)
+        )
+        if refresh:
+            try:
+                _ensure_dir(os.path.dirname(working))
+                shutil.copy2(remote, working)
+            except OSError:
+                break
+            file_replication.remember_base(remote)
+            _copy_sidecar(remote, working)
+        break
+    if not os.path.exists(working):
+        return path
+    return working
+
+
+def _replicate_case(working):
+    _working, remotes = _case_locations(working)
+    file_replication.enqueue_file_replication(working, remotes)
+    if os.path.exists(_sidecar_path(working)):
+        file_replication.enqueue_file_replication(
+            _sidecar_path(working), [_sidecar_path(remote) for remote in remotes]
+        )
+
+
+def _readable_copy(path):
+    """La copia local si tiene cambios sin replicar; si no, `path`."""
+    working, _remotes = _case_locations(path)
+    if os.path.exists(working) and file_replication.has_pending(working):
+        return working
+    return path
+
+
+def get_case_conflicts(path):
+    """Copias en conflicto que dejo la replicacion para este caso."""
+    folder_name = os.path.basename(os.path.dirname(path))
+    return [
+        item
+        for item in file_replication.get_conflicts()
+        if os.path.basename(os.path.dirname(item.get("target") or "")) == folder_name
+    ]
+
+
+def resolve_case_conflict(path, keep_local):
+    """
+    Resuelve el conflicto del caso. Con `keep_local` la version local pisa la
+    compartida; sin el, la local se descarta (queda la copia en Conflictos) y
+    se trae la compartida. Devuelve la ruta de la copia de trabajo.
+    """
+    working, remotes = _case_locations(path)
+    for remote in remotes:
+        file_replication.resolve_conflicts(remote, keep_local)
+        file_replication.resolve_conflicts(_sidecar_path(remote), keep_local)
+    if keep_local:
+        return working
+    _CASE_SESSIONS.pop(os.path.normcase(os.path.abspath(working)), None)
+    for remote in remotes:
+        if not os.path.exists(remote):
+            continue
+        _ensure_dir(os.path.dirname(working))
+        shutil.copy2(remote, working)
+        file_replication.remember_base(remote)
+        _copy_sidecar(remote, working)
+        break
+    return working
+
+
+def resume_case_replication():
+    file_replication.start_replication()
 
 
 def ensure_case_workbook(cedula, user_row, is_compensar):
@@ -250,7 +606,8 @@ def ensure_case_workbook(cedula, user_row, is_compensar):
 
     existing = find_case_workbook(normalized, user_row.get("nombre_usuario"))
     if existing:
-        wb = load_workbook(existing)
+        working = prepare_working_copy(existing)
+        wb = load_workbook(working)
         meta = _read_meta(wb)
         if meta:
             max_seguimientos = int(meta.get("max_seguimientos") or (6 if is_compensar else 3))
@@ -267,13 +624,15 @@ def ensure_case_workbook(cedula, user_row, is_compensar):
             max_seguimientos,
         )
         _apply_visibility(wb, max_seguimientos)
-        wb.save(existing)
-        _copy_to_secondary_roots(existing)
+        _save_workbook_atomic(wb, working)
+        _write_sidecar(working, _summary_from_workbook(wb))
+        _replicate_case(working)
         return {"path": existing, "created": False, "max_seguimientos": max_seguimientos}
 
     template_path = _find_template_path()
     roots = _get_roots()
-    primary_root = roots.get("shared") or roots.get("local")
+    # El caso nuevo se crea en el root local; la cola lo replica al compartido.
+    primary_root = roots.get("local") or roots.get("shared")
     if not primary_root:
         raise RuntimeError("No hay ruta disponible para guardar seguimientos.")
 
@@ -281,6 +640,7 @@ def ensure_case_workbook(cedula, user_row, is_compensar):
     case_folder = _ensure_dir(os.path.join(primary_root, folder_name))
     output_path = os.path.join(case_folder, f"{folder_name}.xlsx")
     shutil.copy2(template_path, output_path)
+    _index_case(primary_root, folder_name, output_path)
 
     max_seguimientos = 6 if bool(is_compensar) else 3
     wb = load_workbook(output_path)
@@ -293,8 +653,9 @@ def ensure_case_workbook(cedula, user_row, is_compensar):
         max_seguimientos,
     )
     _apply_visibility(wb, max_seguimientos)
-    wb.save(output_path)
-    _copy_to_secondary_roots(output_path)
+    _save_workbook_atomic(wb, output_path)
+    _write_sidecar(output_path, _summary_from_workbook(wb))
+    _replicate_case(output_path)
     return {"path": output_path, "created": True, "max_seguimientos": max_seguimientos}
 
 
@@ -309,27 +670,33 @@ def _is_base_completed(wb):
     if SHEET_BASE not in wb.sheetnames:
         return False
     ws = wb[SHEET_BASE]
-    required = ["A16", "E16", "A18", "N18"]
-    return all(_cell_has_value(ws, c) for c in required)
+    return all(_cell_has_value(ws, c) for c in BASE_REQUIRED_CELLS)
 
 
 def _is_followup_completed(ws):
-    required = ["O12", "R12", "J31"]
-    return all(_cell_has_value(ws, c) for c in required)
+    return all(_cell_has_value(ws, c) for c in FOLLOWUP_REQUIRED_CELLS)
 
 
-def suggest_next_step(workbook_path):
-    if not workbook_path or not os.path.exists(workbook_path):
-        return {"sheet": SHEET_BASE, "message": "Inicia con la hoja base."}
-    wb = load_workbook(workbook_path, data_only=False)
-    meta = _read_meta(wb)
+def _max_seguimientos(meta):
     try:
-        max_seguimientos = int(meta.get("max_seguimientos") or 6)
+        max_seg = int(meta.get("max_seguimientos") or 6)
     except Exception:
-        max_seguimientos = 6
-    max_seguimientos = 6 if max_seguimientos >= 6 else 3
+        max_seg = 6
+    return 6 if max_seg >= 6 else 3
+
+
+def _case_meta(meta):
+    return {
+        "cedula": _get_str(meta.get("cedula")),
+        "nombre_usuario": _get_str(meta.get("nombre_usuario")),
+        "is_compensar": str(meta.get("is_compensar") or "0").strip() in ("1", "true", "True"),
+        "max_seguimientos": _max_seguimientos(meta),
+    }
+
 
-    if not _is_base_completed(wb):
+def _build_suggestion(max_seguimientos, base_completed, followups):
+    """`followups` es {indice: completo} solo con las hojas que existen."""
+    if not base_completed:
         return {
             "sheet": SHEET_BASE,
             "message": "Completa primero la hoja base del proceso.",
@@ -337,13 +704,11 @@ def suggest_next_step(workbook_path):
         }
 
     for i in range(1, max_seguimientos + 1):
-        name = f"{SHEET_PREFIX}{i}"
-        if name not in wb.sheetnames:
+        if i not in followups:
             continue
-        ws = wb[name]
-        if not _is_followup_completed(ws):
+        if not followups[i]:
             return {
-                "sheet": name,
+                "sheet": f"{SHEET_PREFIX}{i}",
                 "message": f"Siguiente sugerido: seguimiento {i}.",
                 "max_seguimientos": max_seguimientos,
             }
@@ -355,14 +720,289 @@ def suggest_next_step(workbook_path):
     }
 
 
-def get_usuarios_reca_cedulas(env_path=".env"):
-    params = {
-        "select": "cedula_usuario",
-        "cedula_usuario": "not.is.null",
-        "order": "cedula_usuario.asc",
+def _summary_from_workbook(wb):
+    """Mismo resultado que read_case_summary, desde un libro ya cargado."""
+    case_meta = _case_meta(_read_meta(wb))
+    base_completed = _is_base_completed(wb)
+    followups = {
+        i: _is_followup_completed(wb[f"{SHEET_PREFIX}{i}"])
+        for i in range(1, 7)
+        if f"{SHEET_PREFIX}{i}" in wb.sheetnames
     }
-    data = _supabase_get("usuarios_reca", params, env_path=env_path)
-    return [row.get("cedula_usuario") for row in data if row.get("cedula_usuario")]
+    base_info = {key: "" for key in BASE_SUMMARY_CELLS}
+    if SHEET_BASE in wb.sheetnames:
+        ws = wb[SHEET_BASE]
+        base_info = {key: _get_str(ws[cell].value) for key, cell in BASE_SUMMARY_CELLS.items()}
+    return {
+        "meta": case_meta,
+        "base_info": base_info,
+        "base_completed": base_completed,
+        "followups_completed": followups,
+        "suggestion": _build_suggestion(case_meta["max_seguimientos"], base_completed, followups),
+    }
+
+
+CASE_SIDECAR_SUFFIX = ".meta.json"
+CASE_SIDECAR_VERSION = 1
+# Margen para el mtime del libro: al copiar a la unidad compartida la fecha
+# puede perder precision.
+CASE_SIDECAR_MTIME_TOLERANCE_NS = 2_000_000_000
+
+
+def _sidecar_path(workbook_path):
+    return os.path.splitext(workbook_path)[0] + CASE_SIDECAR_SUFFIX
+
+
+def _write_sidecar(workbook_path, summary):
+    """
+    Guarda junto al libro un JSON con la meta de _META_IL, el estado de las
+    hojas y la sugerencia, atado al mtime y tamano del libro.
+    """
+    try:
+        stat = os.stat(workbook_path)
+        _atomic_write_json(
+            _sidecar_path(workbook_path),
+            {
+                "version": CASE_SIDECAR_VERSION,
+                "workbook": os.path.basename(workbook_path),
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "meta": summary["meta"],
+                "base_info": summary["base_info"],
+                "base_completed": summary["base_completed"],
+                "followups_completed": {str(i): done for i, done in summary["followups_completed"].items()},
+                "suggestion": summary["suggestion"],
+            },
+        )
+    except OSError:
+        pass
+
+
+def _read_sidecar(workbook_path):
+    """Resumen del sidecar, o None si falta o no corresponde al libro actual."""
+    try:
+        stat = os.stat(workbook_path)
+        with open(_sidecar_path(workbook_path), "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != CASE_SIDECAR_VERSION:
+        return None
+    try:
+        fresh = data["size"] == stat.st_size and (
+            abs(int(data["mtime_ns"]) - stat.st_mtime_ns) <= CASE_SIDECAR_MTIME_TOLERANCE_NS
+        )
+        if not fresh:
+            return None
+        return {
+            "meta": data["meta"],
+            "base_info": data["base_info"],
+            "base_completed": bool(data["base_completed"]),
+            "followups_completed": {int(i): bool(done) for i, done in data["followups_completed"].items()},
+            "suggestion": data["suggestion"],
+        }
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+
+
+def _copy_sidecar(source_workbook, target_workbook):
+    source = _sidecar_path(source_workbook)
+    if not os.path.exists(source):
+        return
+    try:
+        shutil.copy2(source, _sidecar_path(target_workbook))
+    except OSError:
+        pass
+
+
+def get_case_summary(workbook_path):
+    """
+    Resumen del caso (ver read_case_summary) desde el sidecar; si falta o esta
+    desactualizado se lee el xlsx y, en la copia local, se regenera el sidecar.
+    """
+    summary = _read_sidecar(workbook_path)
+    if summary is not None:
+        return summary
+    summary = read_case_summary(workbook_path)
+    working, _remotes = _case_locations(workbook_path)
+    if os.path.normcase(os.path.abspath(working)) == os.path.normcase(os.path.abspath(workbook_path)):
+        _write_sidecar(workbook_path, summary)
+    return summary
+
+
+def _loaded_session(workbook_path):
+    """Sesion con el libro ya en memoria y al dia con el archivo, o None."""
+    if isinstance(workbook_path, CaseSession):
+        return workbook_path
+    working, _remotes = _case_locations(workbook_path)
+    session = _CASE_SESSIONS.get(os.path.normcase(os.path.abspath(working)))
+    if session is None or session._wb is None or session._file_stamp() != session._stamp:
+        return None
+    return session
+
+
+def suggest_next_step(workbook_path):
+    path = workbook_path.path if isinstance(workbook_path, CaseSession) else workbook_path
+    if not path or not os.path.exists(path):
+        return {"sheet": SHEET_BASE, "message": "Inicia con la hoja base."}
+    session = _loaded_session(workbook_path)
+    if session is None:
+        return get_case_summary(_readable_copy(path))["suggestion"]
+    return _summary_from_workbook(session.workbook())["suggestion"]
+
+
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_DOC_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_ROW_RE = re.compile(r"(\d+)$")
+
+
+def _sheet_parts(zf):
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    targets = {}
+    for rel in rels.iter(f"{_NS_PKG_REL}Relationship"):
+        target = rel.get("Target") or ""
+        if target.startswith("/"):
+            targets[rel.get("Id")] = target.lstrip("/")
+        else:
+            targets[rel.get("Id")] = posixpath.normpath(posixpath.join("xl", target))
+    workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+    return {
+        sheet.get("name"): targets.get(sheet.get(f"{_NS_DOC_REL}id"))
+        for sheet in workbook.iter(f"{_NS_MAIN}sheet")
+    }
+
+
+def _stream_cells(zf, part, addresses):
+    """
+    Lee solo `addresses` de una hoja sin cargarla: recorre el XML fila por
+    fila y se detiene al pasar la ultima fila pedida.
+    """
+    wanted = set(addresses)
+    last_row = max(int(_ROW_RE.search(address).group(1)) for address in wanted)
+    found = {}
+    with zf.open(part) as handle:
+        for _event, elem in ET.iterparse(handle, events=("end",)):
+            if elem.tag == f"{_NS_MAIN}c":
+                ref = elem.get("r")
+                if ref in wanted:
+                    formula = elem.find(f"{_NS_MAIN}f")
+                    inline = elem.find(f"{_NS_MAIN}is")
+                    raw = elem.find(f"{_NS_MAIN}v")
+                    if inline is not None:
+                        text = "".join(node.text or "" for node in inline.iter(f"{_NS_MAIN}t"))
+                    else:
+                        text = raw.text if raw is not None else None
+                    found[ref] = (elem.get("t"), text, None if formula is None else (formula.text or ""))
+            elif elem.tag == f"{_NS_MAIN}row":
+                row = int(elem.get("r") or 0)
+                elem.clear()
+                if row >= last_row or len(found) == len(wanted):
+                    break
+    return found
+
+
+def _stream_shared_strings(zf, indexes):
+    if not indexes or "xl/sharedStrings.xml" not in zf.namelist():
+        return {}
+    last = max(indexes)
+    strings = {}
+    position = 0
+    with zf.open("xl/sharedStrings.xml") as handle:
+        for _event, elem in ET.iterparse(handle, events=("end",)):
+            if elem.tag != f"{_NS_MAIN}si":
+                continue
+            if position in indexes:
+                strings[position] = "".join(node.text or "" for node in elem.iter(f"{_NS_MAIN}t"))
+            elem.clear()
+            if position >= last:
+                break
+            position += 1
+    return strings
+
+
+def _xml_value(raw, strings):
+    # Igual que openpyxl con data_only=False: una formula vale "=<formula>".
+    if raw is None:
+        return None
+    cell_type, text, formula = raw
+    if formula is not None:
+        return f"={formula}"
+    if text is None:
+        return None
+    if cell_type == "s":
+        return strings.get(int(text), "")
+    if cell_type in ("inlineStr", "str", "e"):
+        return text
+    if cell_type == "b":
+        return text == "1"
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    return int(number) if number.is_integer() else number
+
+
+def _has_value(value):
+    return value is not None and str(value).strip() != ""
+
+
+def read_case_summary(workbook_path):
+    """
+    Meta del caso, estado de la hoja base y de cada seguimiento y el siguiente
+    paso sugerido, leyendo del xlsx solo las celdas necesarias en una pasada.
+    """
+    with zipfile.ZipFile(workbook_path) as zf:
+        parts = _sheet_parts(zf)
+        requests = {}
+        if parts.get(SHEET_META):
+            requests[SHEET_META] = [f"{col}{row}" for row in range(1, 15) for col in ("A", "B")]
+        if parts.get(SHEET_BASE):
+            requests[SHEET_BASE] = BASE_REQUIRED_CELLS + tuple(BASE_SUMMARY_CELLS.values())
+        for i in range(1, 7):
+            name = f"{SHEET_PREFIX}{i}"
+            if parts.get(name):
+                requests[name] = FOLLOWUP_REQUIRED_CELLS
+        raw = {name: _stream_cells(zf, parts[name], cells) for name, cells in requests.items()}
+        indexes = {
+            int(text)
+            for cells in raw.values()
+            for cell_type, text, formula in cells.values()
+            if cell_type == "s" and formula is None and text is not None
+        }
+        strings = _stream_shared_strings(zf, indexes)
+
+    values = {
+        name: {address: _xml_value(cells.get(address), strings) for address in requests[name]}
+        for name, cells in raw.items()
+    }
+    meta = {}
+    sheet_meta = values.get(SHEET_META) or {}
+    for row in range(1, 15):
+        key = _get_str(sheet_meta.get(f"A{row}"))
+        if key:
+            meta[key] = sheet_meta.get(f"B{row}")
+    base_completed = SHEET_BASE in values and all(
+        _has_value(values[SHEET_BASE][c]) for c in BASE_REQUIRED_CELLS
+    )
+    followups = {
+        i: all(_has_value(values[f"{SHEET_PREFIX}{i}"][c]) for c in FOLLOWUP_REQUIRED_CELLS)
+        for i in range(1, 7)
+        if f"{SHEET_PREFIX}{i}" in values
+    }
+    case_meta = _case_meta(meta)
+    base_values = values.get(SHEET_BASE) or {}
+    return {
+        "meta": case_meta,
+        "base_info": {key: _get_str(base_values.get(cell)) for key, cell in BASE_SUMMARY_CELLS.items()},
+        "base_completed": base_completed,
+        "followups_completed": followups,
+        "suggestion": _build_suggestion(case_meta["max_seguimientos"], base_completed, followups),
+    }
+
+
+def get_usuarios_reca_cedulas(env_path=".env"):
+    return get_cedula_catalog(env_path=env_path).values()
 
 
 def get_usuario_reca_by_cedula(cedula, env_path=".env"):
@@ -453,24 +1093,14 @@ def _cell_value(ws, address):
 
 
 def get_case_meta(workbook_path):
-    wb = load_workbook(workbook_path, data_only=False)
-    meta = _read_meta(wb)
-    try:
-        max_seg = int(meta.get("max_seguimientos") or 6)
-    except Exception:
-        max_seg = 6
-    max_seg = 6 if max_seg >= 6 else 3
-    return {
-        "cedula": _get_str(meta.get("cedula")),
-        "nombre_usuario": _get_str(meta.get("nombre_usuario")),
-        "is_compensar": str(meta.get("is_compensar") or "0").strip() in ("1", "true", "True"),
-        "max_seguimientos": max_seg,
-    }
+    session = _loaded_session(workbook_path)
+    if session is None:
+        return get_case_summary(_readable_copy(workbook_path))["meta"]
+    return _case_meta(_read_meta(session.workbook()))
 
 
 def get_base_payload(workbook_path):
-    wb = load_workbook(workbook_path, data_only=False)
-    ws = _ensure_sheet_exists(wb, SHEET_BASE)
+    ws = get_case_session(workbook_path).sheet(SHEET_BASE)
     payload = {
         "fecha_visita": _cell_value(ws, "D8"),
         "modalidad": _cell_value(ws, "R8"),
@@ -507,9 +1137,12 @@ def get_base_payload(workbook_path):
     return payload
 
 
-def save_base_payload(workbook_path, payload):
-    wb = load_workbook(workbook_path, data_only=False)
-    ws = _ensure_sheet_exists(wb, SHEET_BASE)
+def save_base_payload(workbook_path, payload, save=True):
+    session = get_case_session(workbook_path)
+
+    def _set(address, value):
+        session.set_value(SHEET_BASE, address, value)
+
     mapping = {
         "fecha_visita": "D8",
         "modalidad": "R8",
@@ -541,22 +1174,23 @@ def save_base_payload(workbook_path, payload):
     }
     for key, cell in mapping.items():
         if key in payload:
-            ws[cell].value = payload.get(key, "")
+            _set(cell, payload.get(key, ""))
     f1 = payload.get("funciones_1_5") or []
     f2 = payload.get("funciones_6_10") or []
     for i, row in enumerate(range(23, 28)):
         if i < len(f1):
-            ws[f"B{row}"].value = f1[i]
+            _set(f"B{row}", f1[i])
         if i < len(f2):
-            ws[f"N{row}"].value = f2[i]
+            _set(f"N{row}", f2[i])
     s1 = payload.get("seguimiento_fechas_1_3") or []
     s2 = payload.get("seguimiento_fechas_4_6") or []
     for i, row in enumerate(range(29, 32)):
         if i < len(s1):
-            ws[f"C{row}"].value = s1[i]
+            _set(f"C{row}", s1[i])
         if i < len(s2):
-            ws[f"P{row}"].value = s2[i]
-    wb.save(workbook_path)
+            _set(f"P{row}", s2[i])
+    if save:
+        session.save()
 
 
 def _get_followup_sheet_name(index):
@@ -567,8 +1201,7 @@ def _get_followup_sheet_name(index):
 
 
 def get_followup_payload(workbook_path, index):
-    wb = load_workbook(workbook_path, data_only=False)
-    ws = _ensure_sheet_exists(wb, _get_followup_sheet_name(index))
+    ws = get_case_session(workbook_path).sheet(_get_followup_sheet_name(index))
     item_labels = [_cell_value(ws, f"A{r}") for r in range(12, 31)]
     empresa_labels = [_cell_value(ws, f"A{r}") for r in range(34, 42)]
     payload = {
@@ -592,34 +1225,39 @@ def get_followup_payload(workbook_path, index):
     return payload
 
 
-def save_followup_payload(workbook_path, index, payload):
-    wb = load_workbook(workbook_path, data_only=False)
-    ws = _ensure_sheet_exists(wb, _get_followup_sheet_name(index))
-    ws["E8"].value = payload.get("modalidad", "")
-    ws["P8"].value = payload.get("seguimiento_numero", index)
+def save_followup_payload(workbook_path, index, payload, save=True):
+    session = get_case_session(workbook_path)
+    sheet_name = _get_followup_sheet_name(index)
+
+    def _set(address, value):
+        session.set_value(sheet_name, address, value)
+
+    _set("E8", payload.get("modalidad", ""))
+    _set("P8", payload.get("seguimiento_numero", index))
     item_obs = payload.get("item_observaciones") or []
     item_auto = payload.get("item_autoevaluacion") or []
     item_emp = payload.get("item_eval_empresa") or []
     for i, row in enumerate(range(12, 31)):
         if i < len(item_obs):
-            ws[f"G{row}"].value = item_obs[i]
+            _set(f"G{row}", item_obs[i])
         if i < len(item_auto):
-            ws[f"O{row}"].value = item_auto[i]
+            _set(f"O{row}", item_auto[i])
         if i < len(item_emp):
-            ws[f"R{row}"].value = item_emp[i]
-    ws["J31"].value = payload.get("tipo_apoyo", "")
+            _set(f"R{row}", item_emp[i])
+    _set("J31", payload.get("tipo_apoyo", ""))
     emp_eval = payload.get("empresa_eval") or []
     emp_obs = payload.get("empresa_observacion") or []
     for i, row in enumerate(range(34, 42)):
         if i < len(emp_eval):
-            ws[f"J{row}"].value = emp_eval[i]
+            _set(f"J{row}", emp_eval[i])
         if i < len(emp_obs):
-            ws[f"L{row}"].value = emp_obs[i]
-    ws["A43"].value = payload.get("situacion_encontrada", "")
-    ws["A45"].value = payload.get("estrategias_ajustes", "")
+            _set(f"L{row}", emp_obs[i])
+    _set("A43", payload.get("situacion_encontrada", ""))
+    _set("A45", payload.get("estrategias_ajustes", ""))
     asistentes = payload.get("asistentes") or []
     for i, row in enumerate(range(47, 51)):
         entry = asistentes[i] if i < len(asistentes) else {}
-        ws[f"D{row}"].value = entry.get("nombre", "")
-        ws[f"N{row}"].value = entry.get("cargo", "")
-    wb.save(workbook_path)
+        _set(f"D{row}", entry.get("nombre", ""))
+        _set(f"N{row}", entry.get("cargo", ""))
+    if save:
+        session.save()
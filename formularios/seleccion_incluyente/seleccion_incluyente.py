@@ -1,7 +1,10 @@
-﻿import json
+﻿import glob
+import json
 import os
 import shutil
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from formularios.evaluacion_programa import evaluacion_accesibilidad
 from formularios.common import (
@@ -10,13 +13,34 @@ from formularios.common import (
     _normalize_text,
     _parse_date_value,
     _sanitize_filename,
+    _supabase_enqueue_upsert,
     _supabase_get,
     _supabase_upsert_with_queue,
+    _cancel_cache_write,
+    _flush_cache_writes,
+    _schedule_cache_write,
 )
+from formularios.excel_backend import com_thread, expand_row_block, load_config, open_workbook
+from formularios.export_log import get_log
+from formularios.form_records import record_export
+from formularios.template_registry import (
+    bound_sheet,
+    find_anchor_row,
+    get_template_path,
+)
+from formularios.cedula_catalog import get_cedula_catalog, register_cedulas
 
 FORM_ID = "seleccion_incluyente"
 FORM_NAME = "Proceso de Seleccion Incluyente"
 
+# Procesos grupales grandes se dividen en varios libros de hasta este numero
+# de oferentes (el encabezado de la plantilla llega a 8-10 oferentes).
+SHARD_SIZE_ENV = "RECA_SELECCION_OFERENTES_POR_ARCHIVO"
+SHARD_SIZE_CONFIG_KEY = "seleccion_oferentes_por_archivo"
+DEFAULT_SHARD_SIZE = 10
+MAX_SHARD_WORKERS = 4
+GROUP_TABLE = "procesos_grupales_il"
+
 SECTION_1 = {
     "title": "1. DATOS DE LA EMPRESA",
     "fields": [
@@ -1041,7 +1065,9 @@ def _get_cache_path():
 
 
 def cache_file_exists():
-    return os.path.exists(_get_cache_path())
+    path = _get_cache_path()
+    _flush_cache_writes(path)
+    return os.path.exists(path)
 
 
 def save_cache_to_file():
@@ -1050,12 +1076,12 @@ def save_cache_to_file():
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
         "data": FORM_CACHE,
     }
-    with open(_get_cache_path(), "w", encoding="utf-8") as handle:
-        json.dump(payload, handle, ensure_ascii=False, indent=2)
+    _schedule_cache_write(_get_cache_path(), payload)
 
 
 def load_cache_from_file():
     path = _get_cache_path()
+    _flush_cache_writes(path)
     if not os.path.exists(path):
         return False
     with open(path, "r", encoding="utf-8") as handle:
@@ -1071,6 +1097,7 @@ def load_cache_from_file():
 
 def clear_cache_file():
     path = _get_cache_path()
+    _cancel_cache_write(path)
     if os.path.exists(path):
         os.remove(path)
 
@@ -1093,17 +1120,10 @@ def get_form_cache():
 
 
 def _find_template_path():
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-    templates_dir = os.path.join(base_dir, "templates")
-    if not os.path.isdir(templates_dir):
-        raise FileNotFoundError("No existe la carpeta templates.")
-    for name in os.listdir(templates_dir):
-        if name.startswith("~$"):
-            continue
-        normalized = _normalize_text(name).replace("_", "")
-        if "seleccion" in normalized and "incluyente" in normalized and normalized.endswith(".xlsx"):
-            return os.path.join(templates_dir, name)
-    raise FileNotFoundError("No se encontró el template de seleccion incluyente.")
+    return get_template_path(FORM_ID)
+
+
+_EXCEL_LOG = get_log("excel_log.txt")
 
 
 def _get_log_dir():
@@ -1113,33 +1133,14 @@ def _get_log_dir():
     else:
         base_dir = os.getcwd()
     log_dir = os.path.join(base_dir, "logs")
-    os.makedirs(log_dir, exist_ok=True)
     return log_dir
 
 
 def _log_excel(message):
-    try:
-        log_dir = _get_log_dir()
-        log_path = os.path.join(log_dir, "excel_log.txt")
-        reset_log = False
-        if os.path.exists(log_path):
-            try:
-                if os.path.getsize(log_path) >= 5 * 1024 * 1024:
-                    reset_log = True
-            except OSError:
-                reset_log = True
-        if reset_log:
-            with open(log_path, "w", encoding="utf-8") as log_file:
-                log_file.write("")
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        with open(log_path, "a", encoding="utf-8") as log_file:
-            log_file.write(f"[{timestamp}] {message}\n")
-    except OSError:
-        return
+    _EXCEL_LOG.log(message, _get_log_dir())
 
 
-def _ensure_output_path():
-    template_path = _find_template_path()
+def _build_output_path(suffix=""):
     desktop = _get_desktop_dir()
     empresa_nombre = SECTION_1_CACHE.get("nombre_empresa") or "Empresa"
     safe_company = _sanitize_filename(empresa_nombre)
@@ -1148,9 +1149,28 @@ def _ensure_output_path():
     output_dir = os.path.join(desktop, "Formatos Inclusion Laboral", safe_company)
     os.makedirs(output_dir, exist_ok=True)
     process_name = "Proceso de Seleccion Incluyente"
-    output_name = f"{process_name} - {safe_company}.xlsx"
-    output_path = os.path.join(output_dir, output_name)
-    shutil.copy2(template_path, output_path)
+    output_name = f"{process_name} - {safe_company}{suffix}.xlsx"
+    return os.path.join(output_dir, output_name)
+
+
+def _remove_output_files(paths):
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError as exc:
+            _log_excel(f"WARN no se pudo borrar {path} error={exc!r}")
+
+
+def _remove_group_files():
+    """Borra los libros "(Grupo k de N)" de una exportacion anterior de la empresa."""
+    stem = os.path.splitext(_build_output_path())[0]
+    _remove_output_files(glob.glob(glob.escape(stem) + " (Grupo * de *).xlsx"))
+
+
+def _ensure_output_path():
+    output_path = _build_output_path()
+    shutil.copy2(_find_template_path(), output_path)
     FORM_CACHE["_output_path"] = output_path
     return output_path
 
@@ -1168,6 +1188,9 @@ def _get_sheet_by_name(workbook):
 
 
 def _find_row_by_text(ws, text):
+    row = find_anchor_row(ws, text, prefix_only=('2.', '5.'))
+    if row is not None:
+        return row
     cell = ws.Columns("A").Find(What=text, LookAt=1)
     if cell is not None:
         return cell.Row
@@ -1200,13 +1223,7 @@ def _find_row_by_text(ws, text):
 
 
 def get_usuarios_reca_cedulas(env_path=".env"):
-    params = {
-        "select": "cedula_usuario",
-        "cedula_usuario": "not.is.null",
-        "order": "cedula_usuario.asc",
-    }
-    data = _supabase_get("usuarios_reca", params, env_path=env_path)
-    return [row.get("cedula_usuario") for row in data if row.get("cedula_usuario")]
+    return get_cedula_catalog(env_path=env_path).values()
 
 
 def get_usuario_reca_by_cedula(cedula, env_path=".env"):
@@ -1249,8 +1266,8 @@ def get_empresa_by_nombre(nombre, env_path=".env"):
     return evaluacion_accesibilidad.get_empresa_by_nombre(nombre, env_path=env_path)
 
 
-def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10):
-    return evaluacion_accesibilidad.get_empresas_by_nombre_prefix(prefix, env_path=env_path, limit=limit)
+def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10, with_truncated=False):
+    return evaluacion_accesibilidad.get_empresas_by_nombre_prefix(prefix, env_path=env_path, limit=limit, with_truncated=with_truncated)
 
 
 def confirm_section_1(company_data, user_inputs):
@@ -1339,6 +1356,7 @@ def sync_usuarios_reca(env_path=".env"):
             on_conflict="cedula_usuario",
         )
         cedulas = [row.get("cedula_usuario") for row in rows if row.get("cedula_usuario")]
+        register_cedulas(cedulas)
         preview = ", ".join(cedulas[:10])
         extra = "" if len(cedulas) <= 10 else f" (+{len(cedulas) - 10} mas)"
         status = sync_result.get("status") or "synced"
@@ -1365,18 +1383,6 @@ def _write_section_1(ws, payload):
             )
 
 
-def _insert_person_block(ws, start_row, block_height, insert_at):
-    start_end = start_row + block_height - 1
-    dest_end = insert_at + block_height - 1
-    source = ws.Range(f"A{start_row}:{SECTION_2_LAST_COLUMN}{start_end}")
-    dest = ws.Range(f"A{insert_at}:{SECTION_2_LAST_COLUMN}{dest_end}")
-    source.Copy()
-    dest.Insert(Shift=-4121)
-    for row_offset in range(block_height):
-        ws.Rows(insert_at + row_offset).RowHeight = ws.Rows(start_row + row_offset).RowHeight
-    ws.Application.CutCopyMode = False
-
-
 def _write_section_2(ws, oferentes):
     if not oferentes:
         return
@@ -1395,11 +1401,13 @@ def _write_section_2(ws, oferentes):
         ws.Range("G1").Value = "PROCESO DE SELECCION INCLUYENTE GRUPAL - 5 A 7 OFERENTES"
     elif 8 <= total_oferentes <= 10:
         ws.Range("G1").Value = "PROCESO DE SELECCION INCLUYENTE GRUPAL - 8 A 10 OFERENTES"
-    for idx in range(1, len(oferentes)):
-        insert_at = start_row + (block_height * idx)
-        _insert_person_block(ws, start_row, block_height, insert_at)
+    if total_oferentes > 1:
+        insert_at = start_row + block_height
+        inserted = expand_row_block(
+            ws, start_row, block_height, insert_at, total_oferentes - 1, last_column=SECTION_2_LAST_COLUMN
+        )
         _log_excel(
-            f"INSERT section=section_2 rows={block_height} at={insert_at}"
+            f"INSERT section=section_2 rows={inserted} at={insert_at}"
         )
 
     for idx, entry in enumerate(oferentes):
@@ -1446,12 +1454,7 @@ def _write_section_6(ws, payload):
     cargo_col = mapping.get("cargo_col", "M")
     total = len(payload)
     if total > base_rows:
-        insert_at = start_row + base_rows
-        template_row = start_row + base_rows - 1
-        for _ in range(total - base_rows):
-            ws.Rows(insert_at).Insert()
-            ws.Rows(template_row).Copy(ws.Rows(insert_at))
-            insert_at += 1
+        expand_row_block(ws, start_row + base_rows - 1, 1, start_row + base_rows, total - base_rows)
     for idx, entry in enumerate(payload):
         row = start_row + idx
         nombre = entry.get("nombre", "")
@@ -1466,34 +1469,177 @@ def _write_section_6(ws, payload):
         ws.Range(f"{cargo_col}{row}").Value = cargo
 
 
-def export_to_excel(clear_cache=True):
-    output_path = _ensure_output_path()
-    _log_excel(f"START export_all output={output_path}")
-    try:
-        import win32com.client as win32
-    except ImportError as exc:
-        _log_excel("ERROR export_all error=pywin32_not_installed")
-        raise RuntimeError("pywin32 no esta instalado. Instala con pip install pywin32.") from exc
-    excel = win32.DispatchEx("Excel.Application")
-    excel.Visible = False
-    excel.DisplayAlerts = False
-    wb = None
+_SECTION_WRITERS = (
+    ("section_1", _write_section_1, {}),
+    ("section_2", _write_section_2, []),
+    ("section_5", _write_section_5, {}),
+    ("section_6", _write_section_6, []),
+)
+EXPORT_SECTIONS = tuple(section_id for section_id, _writer, _default in _SECTION_WRITERS)
+
+
+def get_shard_size():
+    value = os.getenv(SHARD_SIZE_ENV) or load_config().get(SHARD_SIZE_CONFIG_KEY)
     try:
-        wb = excel.Workbooks.Open(output_path)
+        size = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_SHARD_SIZE
+    return size if size > 0 else DEFAULT_SHARD_SIZE
+
+
+def split_oferentes(oferentes, shard_size=None):
+    """Reparte los oferentes en grupos parejos de maximo `shard_size`."""
+    oferentes = list(oferentes or [])
+    size = shard_size or get_shard_size()
+    if len(oferentes) <= size:
+        return [oferentes]
+    count = -(-len(oferentes) // size)
+    base, extra = divmod(len(oferentes), count)
+    shards = []
+    start = 0
+    for idx in range(count):
+        end = start + base + (1 if idx < extra else 0)
+        shards.append(oferentes[start:end])
+        start = end
+    return shards
+
+
+def _write_workbook(output_path, cache, backend=None, progress_callback=None):
+    with open_workbook(output_path, backend=backend) as wb:
         ws = _get_sheet_by_name(wb)
-        _write_section_1(ws, FORM_CACHE.get("section_1", {}))
-        _write_section_2(ws, FORM_CACHE.get("section_2", []))
-        _write_section_5(ws, FORM_CACHE.get("section_5", {}))
-        _write_section_6(ws, FORM_CACHE.get("section_6", []))
+        with bound_sheet(ws, FORM_ID):
+            for section_id, writer, default in _SECTION_WRITERS:
+                if progress_callback:
+                    progress_callback(section_id)
+                writer(ws, cache.get(section_id, default))
         wb.Save()
-        _log_excel("SUCCESS export_all")
+
+
+def _register_group(group_id, parts):
+    section_1 = FORM_CACHE.get("section_1") or {}
+    rows = [
+        {
+            "grupo_id": group_id,
+            "form_id": FORM_ID,
+            "parte": idx,
+            "total_partes": len(parts),
+            "nit_empresa": str(section_1.get("nit_empresa") or "").strip(),
+            "nombre_empresa": str(section_1.get("nombre_empresa") or "").strip(),
+            "archivo": os.path.basename(output_path),
+            "cedulas": [
+                _normalize_cedula(entry.get("cedula"))
+                for entry in cache.get("section_2") or []
+                if _normalize_cedula(entry.get("cedula"))
+            ],
+        }
+        for idx, cache, output_path in parts
+    ]
+    try:
+        _supabase_enqueue_upsert(GROUP_TABLE, rows, on_conflict="grupo_id,parte")
     except Exception as exc:
-        _log_excel(f"ERROR export_all error={exc!r}")
+        _log_excel(f"ERROR supabase {GROUP_TABLE} grupo={group_id} error={exc!r}")
+
+
+def _write_shard(output_path, cache, backend):
+    """Escribe un grupo en un hilo del pool, con COM inicializado en ese hilo."""
+    error = None
+    with com_thread():
+        try:
+            _write_workbook(output_path, cache, backend)
+        except Exception as exc:
+            error = exc
+            # Soltar el traceback antes de CoUninitialize: sus frames guardan hojas.
+            error.__traceback__ = None
+    if error is not None:
+        raise error
+
+
+def _export_shards(shards, progress_callback=None, backend=None):
+    """
+    Genera un libro por grupo de oferentes en paralelo. Cada libro repite las
+    secciones 1, 5 y 6; todos quedan ligados por un grupo_id en Supabase.
+    """
+    group_id = str(uuid.uuid4())
+    total = len(shards)
+    template_path = _find_template_path()
+    parts = []
+    try:
+        for idx, oferentes in enumerate(shards, start=1):
+            cache = dict(FORM_CACHE)
+            cache["section_2"] = oferentes
+            output_path = _build_output_path(f" (Grupo {idx} de {total})")
+            shutil.copy2(template_path, output_path)
+            parts.append((idx, cache, output_path))
+    except Exception:
+        _remove_output_files(output_path for _idx, _cache, output_path in parts)
         raise
-    finally:
-        if wb is not None:
-            wb.Close(SaveChanges=True)
-        excel.Quit()
+    _log_excel(
+        f"START export_shards grupo={group_id} partes={total} oferentes={sum(len(item) for item in shards)}"
+    )
+
+    # Cada hilo abre su propio libro (y su propia instancia de Excel con COM).
+    # Se usan hilos y no procesos porque cada parte lleva su copia del cache
+    # en memoria y, con COM, el trabajo corre en el proceso de Excel; con
+    # openpyxl el GIL limita la ganancia.
+    errors = []
+    done = 0
+    with ThreadPoolExecutor(max_workers=min(total, MAX_SHARD_WORKERS)) as pool:
+        futures = {
+            pool.submit(_write_shard, output_path, cache, backend): idx
+            for idx, cache, output_path in parts
+        }
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                future.result()
+            except Exception as exc:
+                _log_excel(f"ERROR export_shards grupo={group_id} parte={idx} error={exc!r}")
+                errors.append(exc)
+                continue
+            done += 1
+            if progress_callback:
+                progress_callback(f"grupo_{done}_de_{total}")
+    if errors:
+        # Un grupo incompleto no se registra: se borran tambien las partes que si salieron.
+        _remove_output_files(output_path for _idx, _cache, output_path in parts)
+        raise RuntimeError(
+            f"No se pudieron generar {len(errors)} de {total} archivos del grupo: {errors[0]}"
+        ) from errors[0]
+
+    output_paths = [output_path for _idx, _cache, output_path in parts]
+    FORM_CACHE["_output_path"] = output_paths[0]
+    FORM_CACHE["_output_paths"] = output_paths
+    FORM_CACHE["_grupo_id"] = group_id
+    for _idx, cache, output_path in parts:
+        record_export(FORM_ID, cache, output_path)
+    _register_group(group_id, parts)
+    _log_excel(f"SUCCESS export_shards grupo={group_id} partes={total}")
+    return output_paths[0]
+
+
+def export_to_excel(clear_cache=True, progress_callback=None, backend=None):
+    """
+    Exporta el formulario y devuelve la ruta del libro. Si los oferentes pasan
+    de get_shard_size() se generan varios libros; FORM_CACHE["_output_paths"]
+    trae todas las rutas y la devuelta es la primera.
+    """
+    FORM_CACHE.pop("_output_paths", None)
+    FORM_CACHE.pop("_grupo_id", None)
+    # Los grupos de una exportacion anterior ya no corresponden a esta.
+    _remove_group_files()
+    shards = split_oferentes(FORM_CACHE.get("section_2") or [])
+    if len(shards) > 1:
+        output_path = _export_shards(shards, progress_callback=progress_callback, backend=backend)
+    else:
+        output_path = _ensure_output_path()
+        _log_excel(f"START export_all output={output_path}")
+        try:
+            _write_workbook(output_path, FORM_CACHE, backend=backend, progress_callback=progress_callback)
+            _log_excel("SUCCESS export_all")
+        except Exception as exc:
+            _log_excel(f"ERROR export_all error={exc!r}")
+            raise
+        record_export(FORM_ID, FORM_CACHE, output_path)
     if clear_cache:
         clear_cache_file()
         clear_form_cache()
@@ -4,7 +4,21 @@ import shutil
 import time
 
 from formularios.evaluacion_programa import evaluacion_accesibilidad
-from formularios.common import _get_desktop_dir, _normalize_text, _sanitize_filename
+from formularios.common import (
+    _get_desktop_dir,
+    _normalize_text,
+    _sanitize_filename,
+    _cancel_cache_write,
+    _flush_cache_writes,
+    _schedule_cache_write,
+)
+from formularios.excel_backend import expand_row_block, open_workbook
+from formularios.form_records import record_export
+from formularios.template_registry import (
+    bound_sheet,
+    find_anchor_row,
+    get_template_path,
+)
 
 
 FORM_ID = "sensibilizacion"
@@ -139,7 +153,9 @@ def _get_cache_path():
 
 
 def cache_file_exists():
-    return os.path.exists(_get_cache_path())
+    path = _get_cache_path()
+    _flush_cache_writes(path)
+    return os.path.exists(path)
 
 
 def save_cache_to_file():
@@ -148,12 +164,12 @@ def save_cache_to_file():
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
         "data": FORM_CACHE,
     }
-    with open(_get_cache_path(), "w", encoding="utf-8") as handle:
-        json.dump(payload, handle, ensure_ascii=False, indent=2)
+    _schedule_cache_write(_get_cache_path(), payload)
 
 
 def load_cache_from_file():
     path = _get_cache_path()
+    _flush_cache_writes(path)
     if not os.path.exists(path):
         return False
     with open(path, "r", encoding="utf-8") as handle:
@@ -169,6 +185,7 @@ def load_cache_from_file():
 
 def clear_cache_file():
     path = _get_cache_path()
+    _cancel_cache_write(path)
     if os.path.exists(path):
         os.remove(path)
 
@@ -196,9 +213,9 @@ def get_empresa_by_nombre(nombre, env_path=".env"):
     return evaluacion_accesibilidad.get_empresa_by_nombre(nombre, env_path=env_path)
 
 
-def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10):
+def get_empresas_by_nombre_prefix(prefix, env_path=".env", limit=10, with_truncated=False):
     return evaluacion_accesibilidad.get_empresas_by_nombre_prefix(
-        prefix, env_path=env_path, limit=limit
+        prefix, env_path=env_path, limit=limit, with_truncated=with_truncated
     )
 
 
@@ -252,17 +269,7 @@ def confirm_section_5(payload):
 
 
 def _find_template_path():
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-    templates_dir = os.path.join(base_dir, "templates")
-    if not os.path.isdir(templates_dir):
-        raise FileNotFoundError("No existe la carpeta templates.")
-    for name in os.listdir(templates_dir):
-        if name.startswith("~$"):
-            continue
-        normalized = _normalize_text(name).replace("_", "")
-        if "sensibilizacion" in normalized and normalized.endswith(".xlsx"):
-            return os.path.join(templates_dir, name)
-    raise FileNotFoundError("No se encontró el template de sensibilizacion.")
+    return get_template_path(FORM_ID)
 
 
 def _ensure_output_path():
@@ -290,6 +297,9 @@ def _get_sheet_by_name(workbook):
 
 
 def _find_row_by_text(ws, text):
+    row = find_anchor_row(ws, text)
+    if row is not None:
+        return row
     cell = ws.Columns("A").Find(What=text, LookAt=1)
     if cell is not None:
         return cell.Row
@@ -339,13 +349,7 @@ def _write_section_5(ws, payload):
     total = len(payload)
 
     if total > base_rows:
-        insert_at = start_row + base_rows
-        template_row = start_row + base_rows - 1
-        for _ in range(total - base_rows):
-            ws.Rows(insert_at).Insert()
-            ws.Rows(template_row).Copy(ws.Rows(insert_at))
-            ws.Rows(insert_at).RowHeight = ws.Rows(template_row).RowHeight
-            insert_at += 1
+        expand_row_block(ws, start_row + base_rows - 1, 1, start_row + base_rows, total - base_rows)
 
     for idx, entry in enumerate(payload):
         row = start_row + idx
@@ -357,29 +361,27 @@ def _write_section_5(ws, payload):
             ws.Range(f"K{row}").Value = cargo
 
 
-def export_to_excel(clear_cache=True):
+_SECTION_WRITERS = (
+    ("section_1", _write_section_1, {}),
+    ("section_3", _write_section_3, {}),
+    ("section_5", _write_section_5, []),
+)
+EXPORT_SECTIONS = tuple(section_id for section_id, _writer, _default in _SECTION_WRITERS)
+
+
+def export_to_excel(clear_cache=True, progress_callback=None, backend=None):
     output_path = _ensure_output_path()
     if not FORM_CACHE.get("section_1") and cache_file_exists():
         load_cache_from_file()
-    try:
-        import win32com.client as win32
-    except ImportError as exc:
-        raise RuntimeError("pywin32 no esta instalado. Instala con pip install pywin32.") from exc
-    excel = win32.DispatchEx("Excel.Application")
-    excel.Visible = False
-    excel.DisplayAlerts = False
-    wb = None
-    try:
-        wb = excel.Workbooks.Open(output_path)
+    with open_workbook(output_path, backend=backend) as wb:
         ws = _get_sheet_by_name(wb)
-        _write_section_1(ws, FORM_CACHE.get("section_1", {}))
-        _write_section_3(ws, FORM_CACHE.get("section_3", {}))
-        _write_section_5(ws, FORM_CACHE.get("section_5", []))
+        with bound_sheet(ws, FORM_ID):
+            for section_id, writer, default in _SECTION_WRITERS:
+                if progress_callback:
+                    progress_callback(section_id)
+                writer(ws, FORM_CACHE.get(section_id, default))
         wb.Save()
-    finally:
-        if wb is not None:
-            wb.Close(SaveChanges=True)
-        excel.Quit()
+    record_export(FORM_ID, FORM_CACHE, output_path)
     if clear_cache:
         clear_cache_file()
         clear_form_cache()
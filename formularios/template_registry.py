@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+from formularios.common import _atomic_write_json, _get_cache_dir, _normalize_text
+
+
+TEMPLATES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "templates"))
+INDEX_FILE_NAME = ".template_index.json"
+INDEX_VERSION = 1
+
+# form_id -> (palabras que debe contener el nombre normalizado, nombre para mensajes)
+TEMPLATE_KEYWORDS = {
+    "presentacion_programa": (("presentacion",), "presentacion del programa"),
+    "reactivacion_programa": (("reactivacion",), "reactivacion del programa"),
+    "evaluacion_accesibilidad": (("evaluacion", "accesibilidad"), "evaluacion"),
+    "condiciones_vacante": (("revision", "condicion"), "revision de condiciones"),
+    "seleccion_incluyente": (("seleccion", "incluyente"), "seleccion incluyente"),
+    "contratacion_incluyente": (("contratacion", "incluyente"), "contratacion incluyente"),
+    "induccion_organizacional": (("induccion", "organizacional"), "induccion organizacional"),
+    "induccion_operativa": (("induccion", "operativa"), "induccion operativa"),
+    "sensibilizacion": (("sensibilizacion",), "sensibilizacion"),
+    "seguimientos": (("seguimiento",), "seguimientos"),
+}
+
+_SECTION_RE = re.compile(r"^\d+(\.\d+)*\.?\s")
+
+_LOCK = threading.RLock()
+_PATHS = {}
+_LISTING = {"mtime": None, "names": []}
+_INDEX = None
+_BOUND = {}
+
+
+def _list_templates():
+    """Lista templates/ solo cuando cambia la carpeta."""
+    if not os.path.isdir(TEMPLATES_DIR):
+        raise FileNotFoundError("No existe la carpeta templates.")
+    mtime = os.stat(TEMPLATES_DIR).st_mtime
+    if _LISTING["mtime"] != mtime:
+        names = []
+        for name in sorted(os.listdir(TEMPLATES_DIR)):
+            if name.startswith("~$") or name.startswith("."):
+                continue
+            normalized = _normalize_text(name).replace("_", "")
+            if normalized.endswith(".xlsx"):
+                names.append((name, normalized))
+        _LISTING["mtime"] = mtime
+        _LISTING["names"] = names
+        _PATHS.clear()
+    return _LISTING["names"]
+
+
+def get_template_path(form_id):
+    """Devuelve la ruta del template de `form_id` (resuelta una vez por proceso)."""
+    keywords, label = TEMPLATE_KEYWORDS[form_id]
+    with _LOCK:
+        names = _list_templates()
+        path = _PATHS.get(form_id)
+        if path and os.path.exists(path):
+            return path
+        for name, normalized in names:
+            if all(keyword in normalized for keyword in keywords):
+                path = os.path.join(TEMPLATES_DIR, name)
+                _PATHS[form_id] = path
+                return path
+    raise FileNotFoundError(f"No se encontró el template de {label}.")
+
+
+def _get_index_path():
+    # Junto a los templates si la carpeta es escribible; si no (instalacion en
+    # Program Files), en el cache local.
+    if os.access(TEMPLATES_DIR, os.W_OK):
+        return os.path.join(TEMPLATES_DIR, INDEX_FILE_NAME)
+    return os.path.join(_get_cache_dir(), INDEX_FILE_NAME)
+
+
+def _load_index():
+    global _INDEX
+    if _INDEX is not None:
+        return _INDEX
+    path = _get_index_path()
+    data = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                data = json.load(handle) or {}
+        except (OSError, json.JSONDecodeError):
+            data = {}
+    if data.get("version") != INDEX_VERSION:
+        data = {"version": INDEX_VERSION, "templates": {}}
+    _INDEX = data
+    return _INDEX
+
+
+def _save_index():
+    try:
+        _atomic_write_json(_get_index_path(), _INDEX)
+    except OSError:
+        pass
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _scan_template(path):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path)
+    sheets = {}
+    try:
+        for ws in wb.worksheets:
+            column_a = []
+            for (cell,) in ws.iter_rows(min_col=1, max_col=1):
+                value = cell.value
+                if value is None or str(value).strip() == "":
+                    continue
+                column_a.append([cell.row, str(value)])
+            sections = [[row, text] for row, text in column_a if _SECTION_RE.match(text.strip())]
+            for idx, section in enumerate(sections):
+                next_row = sections[idx + 1][0] if idx + 1 < len(sections) else ws.max_row + 1
+                section.append(next_row - section[0])
+            sheets[ws.title] = {
+                "max_row": ws.max_row,
+                "column_a": column_a,
+                "sections": sections,
+                "merged": sorted(str(rng) for rng in ws.merged_cells.ranges),
+                "row_heights": {
+                    str(row): dim.height for row, dim in ws.row_dimensions.items() if dim.height is not None
+                },
+            }
+    finally:
+        wb.close()
+    return sheets
+
+
+def get_template_info(form_id):
+    """
+    Indice del template: filas de columna A, secciones numeradas con su alto,
+    rangos combinados y altos de fila por hoja. Se recalcula solo cuando cambia
+    el hash del archivo y se guarda en INDEX_FILE_NAME.
+    """
+    path = get_template_path(form_id)
+    name = os.path.basename(path)
+    stat = os.stat(path)
+    with _LOCK:
+        index = _load_index()
+        entry = index["templates"].get(name)
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime:
+            return entry
+        sha = _file_sha256(path)
+        if not entry or entry.get("sha256") != sha:
+            entry = {"sha256": sha, "sheets": _scan_template(path)}
+        entry["size"] = stat.st_size
+        entry["mtime"] = stat.st_mtime
+        index["templates"][name] = entry
+        _save_index()
+        return entry
+
+
+def _sheet_key(name):
+    return _normalize_text(name).replace(" ", "")
+
+
+def _find_sheet(info, sheet_name):
+    sheets = info.get("sheets") or {}
+    if sheet_name in sheets:
+        return sheets[sheet_name]
+    target = _sheet_key(sheet_name)
+    for title, sheet in sheets.items():
+        if _sheet_key(title) == target:
+            return sheet
+    return None
+
+
+def bind_sheet(ws, form_id, sheet_name=None):
+    """
+    Asocia la hoja abierta con el indice de su template para que
+    find_anchor_row no tenga que recorrer la columna A.
+    """
+    try:
+        info = get_template_info(form_id)
+        sheet = _find_sheet(info, sheet_name or ws.Name)
+    except Exception:
+        sheet = None
+    with _LOCK:
+        if sheet is None:
+            _BOUND.pop(id(ws), None)
+            return False
+        _BOUND[id(ws)] = {"sheet": sheet, "inserts": []}
+    return True
+
+
+def release_sheet(ws):
+    with _LOCK:
+        _BOUND.pop(id(ws), None)
+
+
+@contextmanager
+def bound_sheet(ws, form_id, sheet_name=None):
+    """bind_sheet mientras dura el bloque; la hoja se libera aunque falle un escritor."""
+    bind_sheet(ws, form_id, sheet_name)
+    try:
+        yield ws
+    finally:
+        release_sheet(ws)
+
+
+def note_rows_inserted(ws, at_row, amount=1):
+    """Registra filas insertadas para desplazar las anclas que quedan debajo."""
+    with _LOCK:
+        bound = _BOUND.get(id(ws))
+        if bound is not None and amount > 0:
+            bound["inserts"].append((at_row, amount))
+
+
+def _template_row(sheet, text, prefix_only):
+    raw_target = str(text).strip().lower()
+    target = _normalize_text(text)
+    column_a = sheet["column_a"]
+    for row, value in column_a:
+        if value.strip().lower() == raw_target:
+            return row
+    for row, value in column_a:
+        if raw_target in value.lower():
+            return row
+    normalized = [(row, _normalize_text(value)) for row, value in column_a]
+    for row, value in normalized:
+        if value == target:
+            return row
+    strict = any(target.startswith(prefix) for prefix in prefix_only)
+    for row, value in normalized:
+        if target in value and (not strict or value.startswith(target)):
+            return row
+    return None
+
+
+def find_anchor_row(ws, text, prefix_only=()):
+    """
+    Fila actual del ancla `text` en una hoja asociada con bind_sheet, o None
+    si no hay indice o la celda ya no coincide (el llamador recorre la hoja).
+    """
+    with _LOCK:
+        bound = _BOUND.get(id(ws))
+        if bound is None:
+            return None
+        row = _template_row(bound["sheet"], text, prefix_only)
+        if row is None:
+            return None
+        for at_row, amount in bound["inserts"]:
+            if row >= at_row:
+                row += amount
+    value = ws.Cells(row, 1).Value
+    if not value or _normalize_text(text) not in _normalize_text(str(value)):
+        return None
+    return row
+
+
+def get_section_blocks(form_id, sheet_name):
+    """[(fila, titulo, alto)] de las secciones numeradas del template."""
+    sheet = _find_sheet(get_template_info(form_id), sheet_name)
+    if sheet is None:
+        return []
+    return [tuple(section) for section in sheet["sections"]]
+
+
+def get_merged_ranges(form_id, sheet_name):
+    sheet = _find_sheet(get_template_info(form_id), sheet_name)
+    return list(sheet["merged"]) if sheet else []
@@ -0,0 +1,311 @@
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from formularios.excel_backend import BACKEND_COM, BACKEND_OPENPYXL, EXCEL_BACKEND_ENV, com_thread
+
+
+FORM_MODULES = {
+    "presentacion_programa": "formularios.presentacion_programa.presentacion_programa",
+    "evaluacion_accesibilidad": "formularios.evaluacion_programa.evaluacion_accesibilidad",
+    "condiciones_vacante": "formularios.condiciones_vacante.condiciones_vacante",
+    "seleccion_incluyente": "formularios.seleccion_incluyente.seleccion_incluyente",
+    "contratacion_incluyente": "formularios.contratacion_incluyente.contratacion_incluyente",
+    "induccion_organizacional": "formularios.induccion_organizacional.induccion_organizacional",
+    "induccion_operativa": "formularios.induccion_operativa.induccion_operativa",
+    "sensibilizacion": "formularios.sensibilizacion.sensibilizacion",
+}
+# Estos formularios reutilizan el Excel de salida si ya existe; en un lote se
+# regeneran siempre desde la plantilla.
+REUSES_OUTPUT = {"condiciones_vacante", "evaluacion_accesibilidad"}
+
+
+def _company_name(data):
+    section_1 = data.get("section_1") or {}
+    return str(section_1.get("nombre_empresa") or "").strip()
+
+
+def _job(source, form_id, data):
+    return {"source": source, "form_id": form_id, "data": data}
+
+
+def _jobs_from_json(path, user=None):
+    """
+    Acepta el JSON de save_cache_to_file ({"form_id", "data"}) o el store de
+    borradores del HUB anterior ({"users": {login: [{"form_id", "cache"}...]}}).
+    """
+    with open(path, "r", encoding="utf-8") as handle:
+        payload = json.load(handle) or {}
+    if not isinstance(payload, dict):
+        return [], [f"{path}: formato no reconocido"]
+    if isinstance(payload.get("users"), dict):
+        jobs = []
+        for login, drafts in payload["users"].items():
+            if user and login != user:
+                continue
+            for draft in drafts if isinstance(drafts, list) else []:
+                if not isinstance(draft, dict) or not isinstance(draft.get("cache"), dict):
+                    continue
+                source = f"{path}#{login}/{draft.get('draft_id') or draft.get('form_id')}"
+                jobs.append(_job(source, str(draft.get("form_id") or ""), draft["cache"]))
+        return jobs, []
+    if payload.get("form_id") and isinstance(payload.get("data"), dict):
+        return [_job(str(path), str(payload["form_id"]), payload["data"])], []
+    return [], [f"{path}: formato no reconocido"]
+
+
+def _jobs_from_sqlite(path, user=None):
+    """Store de borradores del HUB en SQLite (form_drafts_il.sqlite3)."""
+    from formularios.draft_store import read_all_drafts
+
+    jobs = []
+    for draft in read_all_drafts(str(path), user_login=user):
+        if not isinstance(draft.get("cache"), dict) or not draft["cache"]:
+            continue
+        source = f"{path}#{draft['user_login']}/{draft['draft_id']}"
+        jobs.append(_job(source, str(draft.get("form_id") or ""), draft["cache"]))
+    return jobs, []
+
+
+def collect_jobs(paths, user=None, only=None):
+    """Devuelve (jobs, omitidos) a partir de archivos JSON o carpetas."""
+    files = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            files.extend(sorted(path.glob("*.json")))
+            files.extend(sorted(path.glob("*.sqlite3")))
+        else:
+            files.append(path)
+
+    jobs = []
+    skipped = []
+    for path in files:
+        try:
+            if path.suffix == ".sqlite3":
+                found, errors = _jobs_from_sqlite(path, user=user)
+            else:
+                found, errors = _jobs_from_json(path, user=user)
+        except (OSError, json.JSONDecodeError, sqlite3.Error) as exc:
+            skipped.append(f"{path}: {exc}")
+            continue
+        jobs.extend(found)
+        skipped.extend(errors)
+
+    selected = []
+    seen = {}
+    for job in jobs:
+        form_id = job["form_id"]
+        if form_id not in FORM_MODULES:
+            skipped.append(f"{job['source']}: formulario sin exportacion ({form_id or 'sin form_id'})")
+            continue
+        if only and form_id not in only:
+            continue
+        # Dos payloads del mismo formulario y empresa escribirian el mismo archivo.
+        key = (form_id, _company_name(job["data"]).lower())
+        if key in seen:
+            skipped.append(f"{job['source']}: duplicado de {seen[key]}")
+            continue
+        seen[key] = job["source"]
+        selected.append(job)
+    return selected, skipped
+
+
+def _init_worker(backend, output_root):
+    # Cada proceso usa su propio cache local: los export_to_excel borran el
+    # archivo de cache del formulario al terminar y no deben tocar el real.
+    os.environ["LOCALAPPDATA"] = tempfile.mkdtemp(prefix="reca_batch_")
+    os.environ[EXCEL_BACKEND_ENV] = backend
+    if output_root:
+        os.environ.pop("OneDrive", None)
+        os.environ.pop("OneDriveConsumer", None)
+        os.environ["USERPROFILE"] = output_root
+
+
+def _load_payload(module, data):
+    module.FORM_CACHE.clear()
+    module.FORM_CACHE.update(data)
+    section_1_cache = getattr(module, "SECTION_1_CACHE", None)
+    if section_1_cache is not None:
+        section_1_cache.clear()
+        section_1_cache.update(data.get("section_1") or {})
+
+
+def run_job(job):
+    """Exporta un payload en el proceso actual. Nunca lanza: el error va en el resultado."""
+    import importlib
+
+    started = time.perf_counter()
+    result = {
+        "source": job["source"],
+        "form_id": job["form_id"],
+        "empresa": _company_name(job["data"]),
+        "status": "OK",
+        "excel": None,
+        "detail": "",
+        "pid": os.getpid(),
+    }
+    # COM se inicializa por job, fuera del libro; el error se atrapa dentro.
+    with com_thread():
+        try:
+            module = importlib.import_module(FORM_MODULES[job["form_id"]])
+            data = dict(job["data"])
+            data.pop("_output_path", None)
+            _load_payload(module, data)
+            if job["form_id"] in REUSES_OUTPUT:
+                stale_path = module._ensure_output_path()
+                module.FORM_CACHE.pop("_output_path", None)
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+            if job["form_id"] == "presentacion_programa":
+                output_path = module.export_to_excel(cache=data)
+            elif job["form_id"] in REUSES_OUTPUT:
+                output_path = module.export_to_excel()
+            else:
+                output_path = module.export_to_excel(clear_cache=False)
+            if not output_path:
+                raise RuntimeError("export_to_excel no devolvio ruta")
+            result["excel"] = output_path
+        except Exception as exc:
+            result["status"] = "FAIL"
+            result["detail"] = f"{exc}\n{traceback.format_exc(limit=2)}".strip()
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def run_batch(jobs, workers=None, backend=BACKEND_OPENPYXL, output_root=None, on_result=None):
+    results = []
+    if not jobs:
+        return results
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    if output_root:
+        output_root = os.path.abspath(output_root)
+        os.makedirs(os.path.join(output_root, "Desktop"), exist_ok=True)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(backend, output_root),
+    ) as pool:
+        futures = {pool.submit(run_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+            except Exception as exc:
+                # El proceso murio (p.ej. BrokenProcessPool): solo falla este job.
+                result = {
+                    "source": job["source"],
+                    "form_id": job["form_id"],
+                    "empresa": _company_name(job["data"]),
+                    "status": "FAIL",
+                    "excel": None,
+                    "detail": f"El proceso de exportacion termino: {exc!r}",
+                    "pid": None,
+                    "seconds": 0.0,
+                }
+            results.append(result)
+            if on_result:
+                on_result(result)
+    return results
+
+
+def _print_result(result):
+    print(f"[{result['status']}] {result['seconds']:7.2f}s {result['form_id']} - {result['empresa'] or 'Sin empresa'}")
+    if result.get("excel"):
+        print(f"  Excel: {result['excel']}")
+    if result["status"] != "OK":
+        print(f"  Detalle: {result['detail']}")
+
+
+def print_report(started, ended, wall_seconds, workers, results, skipped):
+    ok = sum(1 for row in results if row["status"] == "OK")
+    fail = len(results) - ok
+    timings = sorted(row["seconds"] for row in results)
+    print("=" * 100)
+    print("EXPORTACION EN LOTE")
+    print(f"Inicio: {started:%Y-%m-%d %H:%M:%S}")
+    print(f"Fin:    {ended:%Y-%m-%d %H:%M:%S}")
+    print("=" * 100)
+    for line in skipped:
+        print(f"[SKIP] {line}")
+    if timings:
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        busy = sum(timings)
+        print(
+            f"Por job: media={statistics.mean(timings):.2f}s  p95={p95:.2f}s  max={timings[-1]:.2f}s  "
+            f"(suma={busy:.1f}s, pared={wall_seconds:.1f}s, x{busy / wall_seconds if wall_seconds else 0:.1f} con {workers} procesos)"
+        )
+    print("-" * 100)
+    print(f"Resumen -> OK: {ok} | FAIL: {fail} | SKIP: {len(skipped)} | Total: {len(results) + len(skipped)}")
+    print("=" * 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exporta en paralelo formularios guardados (cache JSON o borradores del HUB, JSON o SQLite)."
+    )
+    parser.add_argument("paths", nargs="+", help="Archivos JSON/SQLite o carpetas que los contengan.")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (por defecto, CPUs).")
+    parser.add_argument(
+        "--backend",
+        default=BACKEND_OPENPYXL,
+        choices=[BACKEND_OPENPYXL, BACKEND_COM],
+        help="Motor de Excel para llenar las plantillas.",
+    )
+    parser.add_argument("--only", nargs="*", help="Lista de form_id a exportar.")
+    parser.add_argument("--user", help="En el store de borradores, exportar solo los de este usuario.")
+    parser.add_argument(
+        "--output-root",
+        help="Carpeta base de salida (se escribe en <carpeta>/Desktop/Formatos Inclusion Laboral).",
+    )
+    parser.add_argument("--report", help="Guarda el resultado de cada job en este archivo JSON.")
+    args = parser.parse_args()
+
+    jobs, skipped = collect_jobs(args.paths, user=args.user, only=set(args.only) if args.only else None)
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(jobs) or 1))
+    started = datetime.now()
+    clock = time.perf_counter()
+    results = run_batch(
+        jobs,
+        workers=workers,
+        backend=args.backend,
+        output_root=args.output_root,
+        on_result=_print_result,
+    )
+    wall_seconds = time.perf_counter() - clock
+    ended = datetime.now()
+    print_report(started, ended, wall_seconds, workers, results, skipped)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as handle:
+            json.dump(
+                {
+                    "started": started.isoformat(timespec="seconds"),
+                    "ended": ended.isoformat(timespec="seconds"),
+                    "wall_seconds": round(wall_seconds, 3),
+                    "workers": workers,
+                    "results": results,
+                    "skipped": skipped,
+                },
+                handle,
+                ensure_ascii=False,
+                indent=2,
+            )
+    sys.exit(1 if any(row["status"] != "OK" for row in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
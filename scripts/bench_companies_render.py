@@ -0,0 +1,165 @@
+import argparse
+import random
+import statistics
+import string
+import sys
+import time
+import tkinter as tk
+from pathlib import Path
+from tkinter import ttk
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import (
+    COMPANIES_SORT_MODES,
+    CompanySearchIndex,
+    VirtualTreeList,
+    _normalize_ascii_text,
+)
+
+
+PROFESIONALES = [
+    "Laura Alejandra Pérez",
+    "Juan Carlos Díaz",
+    "María José Gómez",
+    "Andrés Felipe Rojas",
+    "Sandra Pachón",
+]
+LEGACY_SORT_KEYS = {
+    "Empresa A-Z": ("nombre_empresa", False),
+    "Empresa Z-A": ("nombre_empresa", True),
+    "NIT menor-mayor": ("nit_empresa", False),
+    "NIT mayor-menor": ("nit_empresa", True),
+}
+
+
+def _norm(value):
+    return _normalize_ascii_text(value).lower()
+
+
+def _random_company(idx):
+    words = ["".join(random.choice(string.ascii_lowercase) for _ in range(random.randint(3, 9))) for _ in range(3)]
+    return {
+        "id": idx,
+        "nit_empresa": f"{random.randint(800000000, 999999999)}-{random.randint(0, 9)}",
+        "nombre_empresa": " ".join(words).upper(),
+        "profesional_asignado": random.choice(PROFESIONALES),
+    }
+
+
+def _build_keystrokes(rows, count):
+    # Simula escribir nombres reales letra por letra y luego borrar.
+    strokes = []
+    while len(strokes) < count:
+        name = _norm(random.choice(rows)["nombre_empresa"])[:8]
+        for size in range(1, len(name) + 1):
+            strokes.append(name[:size])
+        for size in range(len(name) - 1, -1, -1):
+            strokes.append(name[:size])
+    return strokes[:count]
+
+
+def _make_tree(root):
+    box = tk.Frame(root)
+    box.pack(fill="both", expand=True)
+    scrollbar = tk.Scrollbar(box, orient="vertical")
+    scrollbar.pack(side="right", fill="y")
+    tree = ttk.Treeview(box, columns=("nit", "empresa", "profesional"), show="headings", yscrollcommand=scrollbar.set)
+    tree.pack(side="left", fill="both", expand=True)
+    scrollbar.config(command=tree.yview)
+    return tree, scrollbar
+
+
+def _bench_legacy(root, rows, strokes, mode):
+    tree, _scrollbar = _make_tree(root)
+    root.update()
+    timings = []
+    for term in strokes:
+        started = time.perf_counter()
+        for item in tree.get_children():
+            tree.delete(item)
+        items = []
+        for row in rows:
+            haystack = _norm(f"{row['nit_empresa']} {row['nombre_empresa']} {row['profesional_asignado']}")
+            if term and term not in haystack:
+                continue
+            items.append(row)
+        field, reverse = LEGACY_SORT_KEYS[mode]
+        items.sort(key=lambda r: _norm(r.get(field) or ""), reverse=reverse)
+        for row in items:
+            tree.insert("", "end", iid=str(row["id"]), values=(row["nit_empresa"], row["nombre_empresa"], row["profesional_asignado"]))
+        root.update_idletasks()
+        timings.append(time.perf_counter() - started)
+    tree.master.destroy()
+    return timings
+
+
+def _bench_virtual(root, rows, strokes, mode):
+    tree, scrollbar = _make_tree(root)
+    root.update()
+    started = time.perf_counter()
+    index = CompanySearchIndex(rows, _norm)
+    build_seconds = time.perf_counter() - started
+    virtual = VirtualTreeList(tree, scrollbar, empty_values=("-", "No hay empresas para mostrar.", "-"))
+
+    def _values_for(iid):
+        row = index.rows_by_iid[iid]
+        return (row["nit_empresa"], row["nombre_empresa"], row["profesional_asignado"])
+
+    timings = []
+    for term in strokes:
+        started = time.perf_counter()
+        iids = index.iids
+        virtual.set_items([iids[idx] for idx in index.search(term, mode)], _values_for)
+        root.update_idletasks()
+        timings.append(time.perf_counter() - started)
+    tree.master.destroy()
+    return build_seconds, timings
+
+
+def _summary(label, timings):
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{label:<10} media={statistics.mean(timings) * 1000:8.2f} ms  "
+        f"p95={p95 * 1000:8.2f} ms  max={ordered[-1] * 1000:8.2f} ms  (n={len(timings)})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark de latencia tecla-a-pintado de la lista de empresas del HUB."
+    )
+    parser.add_argument("--rows", type=int, default=20000, help="Cantidad de empresas sinteticas.")
+    parser.add_argument("--keystrokes", type=int, default=60, help="Cantidad de pulsaciones simuladas.")
+    parser.add_argument("--mode", default=COMPANIES_SORT_MODES[0], choices=COMPANIES_SORT_MODES)
+    parser.add_argument("--skip-legacy", action="store_true", help="No medir el render anterior (lento).")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    rows = [_random_company(idx) for idx in range(1, args.rows + 1)]
+    strokes = _build_keystrokes(rows, args.keystrokes)
+
+    root = tk.Tk()
+    root.geometry("900x600")
+    try:
+        build_seconds, virtual_timings = _bench_virtual(root, rows, strokes, args.mode)
+        legacy_timings = None if args.skip_legacy else _bench_legacy(root, rows, strokes, args.mode)
+    finally:
+        root.destroy()
+
+    print("=" * 100)
+    print(f"BENCHMARK LISTA DE EMPRESAS - {args.rows} filas, {len(strokes)} pulsaciones, orden '{args.mode}'")
+    print("=" * 100)
+    print(f"Construccion del indice: {build_seconds * 1000:.1f} ms (una vez por carga)")
+    _summary("virtual", virtual_timings)
+    if legacy_timings:
+        _summary("anterior", legacy_timings)
+    print("=" * 100)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from openpyxl import load_workbook
+
+from formularios.seguimientos import seguimientos
+
+
+def _build_case(folder, completed):
+    """Caso Compensar (6 seguimientos) con la hoja base y `completed` seguimientos llenos."""
+    path = os.path.join(folder, "Usuario Prueba - 1000000001.xlsx")
+    shutil.copy2(seguimientos._find_template_path(), path)
+    wb = load_workbook(path)
+    seguimientos._ensure_meta_sheet(wb, "1000000001", "Usuario Prueba", True, 6)
+    seguimientos._apply_visibility(wb, 6)
+    base = wb[seguimientos.SHEET_BASE]
+    for cell in seguimientos.BASE_REQUIRED_CELLS:
+        base[cell] = f"valor {cell}"
+    for i in range(1, completed + 1):
+        ws = wb[f"{seguimientos.SHEET_PREFIX}{i}"]
+        for cell in seguimientos.FOLLOWUP_REQUIRED_CELLS:
+            ws[cell] = f"valor {cell}"
+    wb.save(path)
+    return path
+
+
+def _legacy_open(path):
+    # Lo que hacia abrir un caso: tres load_workbook completos.
+    meta = seguimientos._case_meta(seguimientos._read_meta(load_workbook(path, data_only=False)))
+    wb = load_workbook(path, data_only=False)
+    followups = {
+        i: seguimientos._is_followup_completed(wb[f"{seguimientos.SHEET_PREFIX}{i}"])
+        for i in range(1, 7)
+        if f"{seguimientos.SHEET_PREFIX}{i}" in wb.sheetnames
+    }
+    suggestion = seguimientos._build_suggestion(
+        seguimientos._max_seguimientos(seguimientos._read_meta(wb)),
+        seguimientos._is_base_completed(wb),
+        followups,
+    )
+    load_workbook(path, data_only=False)[seguimientos.SHEET_BASE]
+    return meta, suggestion
+
+
+def _summary_open(path):
+    summary = seguimientos.read_case_summary(path)
+    return summary["meta"], summary["suggestion"]
+
+
+def _bench(fn, path, runs):
+    timings = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn(path)
+        timings.append(time.perf_counter() - started)
+    return result, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara la lectura de resumen de seguimientos con load_workbook.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--completed", type=int, default=3, help="Seguimientos diligenciados en el caso (0-6).")
+    parser.add_argument("--case", help="Usar un archivo de caso existente en vez de generarlo.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="reca_seg_bench_") as folder:
+        path = args.case or _build_case(folder, max(0, min(6, args.completed)))
+        size_kb = os.path.getsize(path) / 1024
+        legacy, legacy_times = _bench(_legacy_open, path, args.runs)
+        summary, summary_times = _bench(_summary_open, path, args.runs)
+
+    print("=" * 80)
+    print(f"Caso: {os.path.basename(path)} ({size_kb:.0f} KB), {args.runs} corridas")
+    for label, timings in (("load_workbook x3", legacy_times), ("read_case_summary", summary_times)):
+        print(
+            f"{label:<20} media={statistics.mean(timings) * 1000:8.1f} ms  "
+            f"min={min(timings) * 1000:8.1f} ms  max={max(timings) * 1000:8.1f} ms"
+        )
+    speedup = statistics.mean(legacy_times) / statistics.mean(summary_times)
+    print(f"Mejora: x{speedup:.1f}")
+    print(f"Sugerencia: {summary[1]['sheet']} - {summary[1]['message']}")
+    if legacy != summary:
+        print("ADVERTENCIA: los resultados no coinciden")
+        print(f"  load_workbook:     {legacy}")
+        print(f"  read_case_summary: {summary}")
+        sys.exit(1)
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+-- Registro estructurado de formularios exportados (RECA Inclusion Laboral)
+-- Una fila por formulario finalizado con el FORM_CACHE normalizado por seccion.
+-- Se llena desde la cola de escritura cuando RECA_FORM_RECORDS_SUPABASE=1
+-- o "form_records_supabase": true en config.json.
+
+create table if not exists public.formatos_registros_il (
+  record_id uuid primary key,
+  form_id text not null,
+  nit_empresa text not null default '',
+  nombre_empresa text not null default '',
+  profesional text not null default '',
+  fecha_visita text not null default '',
+  exported_at timestamp with time zone not null,
+  secciones jsonb not null default '{}'::jsonb,
+  created_at timestamp with time zone not null default now()
+);
+
+create index if not exists idx_formatos_registros_il_form
+  on public.formatos_registros_il (form_id, exported_at desc);
+
+create index if not exists idx_formatos_registros_il_nit
+  on public.formatos_registros_il (nit_empresa, exported_at desc);
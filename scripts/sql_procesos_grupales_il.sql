@@ -0,0 +1,20 @@
+-- Procesos grupales divididos en varios archivos (RECA Inclusion Laboral)
+-- Una fila por archivo; todas las partes de un mismo proceso comparten grupo_id.
+-- Se llena desde la cola de escritura al exportar una seleccion con mas
+-- oferentes que RECA_SELECCION_OFERENTES_POR_ARCHIVO (por defecto 10).
+
+create table if not exists public.procesos_grupales_il (
+  grupo_id uuid not null,
+  parte integer not null,
+  total_partes integer not null,
+  form_id text not null,
+  nit_empresa text not null default '',
+  nombre_empresa text not null default '',
+  archivo text not null default '',
+  cedulas jsonb not null default '[]'::jsonb,
+  created_at timestamp with time zone not null default now(),
+  primary key (grupo_id, parte)
+);
+
+create index if not exists idx_procesos_grupales_il_nit
+  on public.procesos_grupales_il (nit_empresa, created_at desc);